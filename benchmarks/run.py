@@ -0,0 +1,224 @@
+"""Times each of CoilSnake's modules in isolation.
+
+For each module which is compatible with the ROM, the four phases of decompiling and compiling are timed separately:
+read_from_rom, write_to_project, read_from_project and write_to_rom. The project which a module is read from is the one
+which it was just written to, and each write_to_rom is given a fresh copy of the ROM, so every module's timings are
+independent of the other modules'. The results are written as JSON, and can be compared against the results of an
+earlier run in order to catch regressions."""
+
+import argparse
+from collections import OrderedDict
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from coilsnake.model.common.blocks import Rom
+from coilsnake.ui.common import load_modules
+from coilsnake.util.common.project import Project, PROJECT_FILENAME
+
+
+log = logging.getLogger(__name__)
+
+PHASES = ["read_from_rom", "write_to_project", "read_from_project", "write_to_rom"]
+
+# Timings shorter than this many seconds are never considered to be regressions, since they are mostly noise
+DEFAULT_MIN_REGRESSION_TIME = 0.05
+
+
+def benchmark_modules(rom_filename, module_names=None, repeat=3):
+    """Times each phase of each module which is compatible with a ROM.
+    :param rom_filename: the ROM to benchmark the modules with
+    :param module_names: the names of the modules to benchmark, such as "eb.MapModule", or None for all of them
+    :param repeat: how many times to time each phase
+    :return: a dict of each module's name to a dict of each phase's name to a list of the phase's times in seconds"""
+    rom = Rom()
+    rom.from_file(rom_filename)
+
+    compatible_modules = [(name, clazz) for name, clazz in load_modules() if clazz.is_compatible_with_romtype(rom.type)]
+    if module_names is not None:
+        unknown_module_names = set(module_names) - set([name for name, _ in compatible_modules])
+        if unknown_module_names:
+            raise ValueError("Unknown or incompatible modules: {}".format(", ".join(sorted(unknown_module_names))))
+    # Modules which provide project state are benchmarked first, like they are compiled first, since other modules
+    # depend on the state they set up while reading from the project
+    compatible_modules.sort(key=lambda x: not x[1].PROVIDES_PROJECT_STATE)
+
+    project_path = tempfile.mkdtemp(prefix="coilsnake-benchmark-")
+    try:
+        project = Project()
+        project.load(os.path.join(project_path, PROJECT_FILENAME), rom.type)
+
+        results = OrderedDict()
+        for module_name, module_class in compatible_modules:
+            if module_names is not None and module_name not in module_names and \
+                    not module_class.PROVIDES_PROJECT_STATE:
+                continue
+
+            log.info("Benchmarking {}...".format(module_class.NAME))
+            results[module_name] = _benchmark_module(module_name, module_class, rom_filename, rom, project,
+                                                     [clazz for _, clazz in compatible_modules], repeat)
+    finally:
+        shutil.rmtree(project_path, ignore_errors=True)
+
+    if module_names is not None:
+        results = OrderedDict([(name, times) for name, times in results.items() if name in module_names])
+    return results
+
+
+def _benchmark_module(module_name, module_class, rom_filename, rom, project, compatible_module_classes, repeat):
+    def resource_open_w(x, y, astext=False):
+        return project.get_resource(module_name, x, y, 'wt' if astext else 'wb', 'utf-8' if astext else None,
+                                    '\n' if astext else None)
+
+    def resource_open_r(x, y, astext=False):
+        return project.get_resource(module_name, x, y, 'rt' if astext else 'rb', 'utf-8' if astext else None)
+
+    times = OrderedDict([(phase, []) for phase in PHASES])
+    for _ in range(repeat):
+        with module_class() as module:
+            times["read_from_rom"].append(_time(module.read_from_rom, rom))
+            times["write_to_project"].append(_time(module.write_to_project, resource_open_w))
+
+        # Set up the output ROM the same way compile_project does
+        output_rom = Rom()
+        output_rom.from_file(rom_filename)
+        for clazz in compatible_module_classes:
+            for free_range in clazz.FREE_RANGES:
+                output_rom.deallocate(free_range)
+
+        with module_class() as module:
+            times["read_from_project"].append(_time(module.read_from_project, resource_open_r))
+            times["write_to_rom"].append(_time(module.write_to_rom, output_rom))
+        del output_rom
+
+    return times
+
+
+def _time(function, *args):
+    start_time = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start_time
+
+
+def _median(values):
+    values = sorted(values)
+    middle = len(values) // 2
+    if len(values) % 2 == 1:
+        return values[middle]
+    return (values[middle - 1] + values[middle]) / 2
+
+
+def summarize(results):
+    """Returns a JSON-serializable summary of the results of benchmark_modules, with the minimum and median time of each
+    phase of each module, and the total of the minimum times of each phase."""
+    modules = OrderedDict()
+    totals = OrderedDict([(phase, 0.0) for phase in PHASES])
+    for module_name, times in results.items():
+        modules[module_name] = OrderedDict()
+        for phase in PHASES:
+            modules[module_name][phase] = OrderedDict([("min", min(times[phase])),
+                                                       ("median", _median(times[phase])),
+                                                       ("times", times[phase])])
+            totals[phase] += min(times[phase])
+    return OrderedDict([("modules", modules), ("totals", totals)])
+
+
+def find_regressions(summary, baseline_summary, threshold, min_time=DEFAULT_MIN_REGRESSION_TIME):
+    """Compares a summary against a baseline summary, returning a list of (module_name, phase, baseline_time, time)
+    tuples for each phase whose minimum time grew by more than the threshold.
+    :param threshold: the allowed relative slowdown, such as 0.2 for 20%
+    :param min_time: the time in seconds below which a phase is never considered to have regressed"""
+    regressions = []
+    for module_name, phases in summary["modules"].items():
+        if module_name not in baseline_summary["modules"]:
+            continue
+        for phase, timing in phases.items():
+            if phase not in baseline_summary["modules"][module_name]:
+                continue
+            baseline_time = baseline_summary["modules"][module_name][phase]["min"]
+            if timing["min"] >= min_time and timing["min"] > baseline_time * (1 + threshold):
+                regressions.append((module_name, phase, baseline_time, timing["min"]))
+    return regressions
+
+
+def write_report(summary, f=None):
+    if f is None:
+        f = sys.stderr
+
+    f.write("{:<32}".format("module") + "".join(["{:>18}".format(phase) for phase in PHASES]) + "\n")
+    for module_name, phases in summary["modules"].items():
+        f.write("{:<32}".format(module_name) +
+                "".join(["{:>17.1f}ms".format(1000 * phases[phase]["min"]) for phase in PHASES]) + "\n")
+    f.write("{:<32}".format("total") +
+            "".join(["{:>17.1f}ms".format(1000 * summary["totals"][phase]) for phase in PHASES]) + "\n")
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Times each of CoilSnake's modules in isolation")
+    parser.add_argument("--rom", metavar="ROM",
+                        help="the ROM to benchmark with, instead of a generated synthetic ROM")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="the random seed with which to generate the synthetic ROM")
+    parser.add_argument("--modules", nargs="+", metavar="MODULE",
+                        help="the modules to benchmark, such as eb.MapModule")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="how many times to time each phase of each module")
+    parser.add_argument("--output", metavar="FILE",
+                        help="the file to write the JSON results to, instead of stdout")
+    parser.add_argument("--compare", metavar="FILE",
+                        help="JSON results of an earlier run to check for regressions against")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="the relative slowdown of a phase which counts as a regression")
+    parser.add_argument("-v", "--verbose", action="store_true",
+                        help="log the modules' own output")
+    args = parser.parse_args(args)
+
+    logging.basicConfig(format="%(message)s", level=logging.INFO)
+    if not args.verbose:
+        logging.getLogger("coilsnake").setLevel(logging.WARNING)
+
+    temporary_directory = None
+    try:
+        if args.rom:
+            rom_filename = args.rom
+        else:
+            # Only import the generator when it's needed, since it imports every module
+            from benchmarks.synthetic_rom import create_synthetic_rom
+
+            temporary_directory = tempfile.mkdtemp(prefix="coilsnake-benchmark-")
+            rom_filename = os.path.join(temporary_directory, "synthetic.smc")
+            log.info("Generating a synthetic ROM with seed {}".format(args.seed))
+            create_synthetic_rom(rom_filename, seed=args.seed)
+
+        summary = summarize(benchmark_modules(rom_filename, module_names=args.modules, repeat=args.repeat))
+    finally:
+        if temporary_directory:
+            shutil.rmtree(temporary_directory, ignore_errors=True)
+
+    write_report(summary)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(summary, f, indent=2)
+    else:
+        json.dump(summary, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+
+    if args.compare:
+        with open(args.compare, "r") as f:
+            baseline_summary = json.load(f)
+        regressions = find_regressions(summary, baseline_summary, args.threshold)
+        for module_name, phase, baseline_time, current_time in regressions:
+            log.error("{} {} regressed from {:.1f}ms to {:.1f}ms".format(module_name, phase, 1000 * baseline_time,
+                                                                         1000 * current_time))
+        if regressions:
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
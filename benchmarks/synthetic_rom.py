@@ -0,0 +1,398 @@
+"""Generates synthetic ROMs which have the shape of EarthBound's data, so that CoilSnake's modules can be benchmarked
+without a copy of the real game.
+
+The generated ROM starts out empty, apart from a valid EarthBound header. Each module whose data can't be read from an
+empty ROM, or whose data would be unrealistically small if it were, is given random state of realistic size, which the
+module itself then writes to the ROM. This way every pointer and compressed block in the ROM is laid out exactly as the
+module expects to find it. The tables which are defined in eb.yml are left full-size but zeroed."""
+
+import logging
+import random
+
+from coilsnake.model.common.blocks import Block, Rom
+from coilsnake.model.eb.graphics import EbGraphicTileset, EbTileArrangement
+from coilsnake.model.eb.map_tilesets import EbMapPalette
+from coilsnake.model.eb.palettes import EbPalette
+from coilsnake.model.eb.sprites import EbBattleSprite, EbRegularSprite, SpriteGroup, SPRITE_SIZES, \
+    BATTLE_SPRITE_SIZES
+from coilsnake.model.eb.swirls import Swirl, SwirlFrame
+from coilsnake.model.eb.title_screen import TitleScreenLayoutEntry
+from coilsnake.modules.eb import BattleBgModule, EnemyModule, MapModule, SpriteGroupModule, TitleScreenModule, \
+    WindowGraphicsModule
+from coilsnake.ui.common import load_modules
+from coilsnake.util.eb.pointer import from_snes_address, to_snes_address
+
+
+log = logging.getLogger(__name__)
+
+# Synthetic ROMs are expanded like most hacks' ROMs are, so that there is room for all of the synthetic data
+SYNTHETIC_ROM_SIZE = 0x600000
+
+_HEADER_TITLE_OFFSET = 0xffc0
+_HEADER_TITLE = b"EARTH BOUND"
+# The ROM's checksum complement and checksum, which must add up to 0xffff for the ROM's type to be detected
+_HEADER_CHECKSUM_OFFSET = 0xffdc
+_HEADER_CHECKSUM = b"\xb7\xbf\x48\x40"
+
+# Where the map's eight sections are stored. This is outside of every free range, so nothing is allocated on top of it.
+_MAP_SECTIONS_OFFSET = 0x160000
+_MAP_SECTION_SIZE = 0x2800
+_MAP_SECTION_POINTERS_OFFSET = 0x174000
+
+# The sprite group sizes to choose from, weighted by roughly how often EarthBound uses them
+_SPRITE_GROUP_SIZES = ["16x24"] * 12 + ["16x16"] * 4 + ["24x24", "32x32", "32x48", "48x48", "64x64"]
+# The number of map tilesets, each of which uses one of the drawing tilesets
+_NUM_MAP_TILESETS = 32
+
+
+def create_synthetic_rom(filename, seed=0):
+    """Writes a synthetic EarthBound ROM which every module can decompile.
+    :param filename: the file to write the ROM to
+    :param seed: the seed for the random data, so that the same ROM is generated every time"""
+    data = bytearray(0x300000)
+    data[_HEADER_TITLE_OFFSET:_HEADER_TITLE_OFFSET + len(_HEADER_TITLE)] = _HEADER_TITLE
+    data[_HEADER_CHECKSUM_OFFSET:_HEADER_CHECKSUM_OFFSET + len(_HEADER_CHECKSUM)] = _HEADER_CHECKSUM
+    with open(filename, "wb") as f:
+        f.write(data)
+
+    rom = Rom()
+    rom.from_file(filename)
+    rom.expand(SYNTHETIC_ROM_SIZE)
+    rom.to_file(filename)
+    # Load the expanded ROM again so that its expanded area is known to be free
+    rom.from_file(filename)
+    compatible_modules = [(name, clazz) for name, clazz in load_modules() if clazz.is_compatible_with_romtype(rom.type)]
+    for module_name, module_class in compatible_modules:
+        for free_range in module_class.FREE_RANGES:
+            rom.deallocate(free_range)
+
+    rng = random.Random(seed)
+    for module_name, module_class in compatible_modules:
+        try:
+            synthesize = _SYNTHESIZERS[module_name]
+        except KeyError:
+            continue
+
+        with module_class() as module:
+            synthesize(module, rom, rng)
+            module.write_to_rom(rom)
+        log.debug("Synthesized {}, leaving {} bytes unallocated".format(
+            module_class.NAME, sum([end - begin + 1 for begin, end in rom.unallocated_ranges])))
+
+    rom.to_file(filename)
+
+
+def _random_data(rng, size):
+    """Returns random bytes made up of short runs, which compress about as well as real graphics do."""
+    data = bytearray()
+    while len(data) < size:
+        data += bytes([rng.randrange(256)]) * rng.randint(1, 8)
+    del data[size:]
+    return data
+
+
+def _randomize_tileset(rng, tileset, bpp, num_tiles=None):
+    """Fills the first num_tiles tiles of a tileset with random data, and clears the rest."""
+    if num_tiles is None:
+        num_tiles = tileset.num_tiles_maximum
+    with Block(tileset.block_size(bpp=bpp)) as block:
+        size = tileset.block_size(bpp=bpp) * num_tiles // tileset.num_tiles_maximum
+        block[0:size] = _random_data(rng, size)
+        tileset.from_block(block=block, offset=0, bpp=bpp)
+
+
+def _randomize_palette(rng, palette):
+    # Every color is distinct, so that images drawn with the palette can be mapped back to it unambiguously
+    colors = iter(rng.sample(range(0x8000), palette.num_colors()))
+    for subpalette in palette.subpalettes:
+        for color in subpalette:
+            color.from_int(next(colors))
+
+
+def _randomize_arrangement(rng, arrangement, num_tiles, num_subpalettes=1):
+    for y in range(arrangement.height):
+        for x in range(arrangement.width):
+            item = arrangement[x, y]
+            item.tile = rng.randrange(num_tiles)
+            item.subpalette = rng.randrange(num_subpalettes)
+            item.is_horizontally_flipped = rng.random() < 0.1
+            item.is_vertically_flipped = rng.random() < 0.1
+
+
+def _randomize_compressed_graphic(rng, graphic):
+    _randomize_tileset(rng, graphic.graphics, bpp=graphic.bpp)
+    if graphic.arrangement:
+        _randomize_arrangement(rng, graphic.arrangement, num_tiles=graphic.graphics.num_tiles_maximum,
+                               num_subpalettes=graphic.palettes[0].num_subpalettes)
+    for palette in graphic.palettes:
+        _randomize_palette(rng, palette)
+
+
+def _synthesize_sprite_groups(module, rom, rng):
+    module.palette_table.from_block(rom, from_snes_address(SpriteGroupModule.PALETTE_TABLE_OFFSET))
+
+    module.groups = []
+    for i in range(module.group_pointer_table.num_rows):
+        size = rng.choice(_SPRITE_GROUP_SIZES)
+        width, height = [int(x) // 8 for x in size.split("x")]
+        group = SpriteGroup(rng.choice([8, 8, 8, 16]))
+        group.width = width
+        group.height = height
+        group.size = SPRITE_SIZES.index(size)
+        group.palette = rng.randrange(8)
+        group.collision_ns_w, group.collision_ns_h, group.collision_ew_w, group.collision_ew_h = [
+            rng.randrange(width * 8) for _ in range(4)]
+
+        # Like in EarthBound, every other sprite is a mirror image of the sprite before it
+        group.sprites = []
+        for j in range(0, group.num_sprites, 2):
+            sprite = EbRegularSprite()
+            with Block(width * height * 32) as block:
+                block[0:block.size] = _random_data(rng, block.size)
+                sprite.from_block(block, width * 8, height * 8)
+            mirrored_sprite = EbRegularSprite()
+            mirrored_sprite.width, mirrored_sprite.height = sprite.width, sprite.height
+            mirrored_sprite.data = [row[::-1] for row in sprite.data]
+            group.sprites += [[sprite, False], [mirrored_sprite, False]]
+        module.groups.append(group)
+
+
+def _synthesize_swirls(module, rom, rng):
+    module.swirls = []
+    for i in range(module.swirl_table.num_rows):
+        swirl = Swirl(speed=rng.randint(1, 8))
+        # Each swirl is a disc or a ring which grows over the course of its animation
+        is_ring = rng.random() < 0.5
+        num_frames = rng.randint(8, 32)
+        for j in range(num_frames):
+            frame = SwirlFrame()
+            radius = 8 + (j * 100) // num_frames
+            for y, row in enumerate(frame.rows):
+                dy = y - 112
+                if abs(dy) >= radius:
+                    row.set(0xff, 0, 0xff, 0)
+                    continue
+                half_width = max(int((radius * radius - dy * dy) ** 0.5), 2)
+                if is_ring and half_width > 8:
+                    row.set(128 - half_width, 128 - half_width + 4, 128 + half_width - 4, 128 + half_width)
+                else:
+                    row.set(128 - half_width, 128 + half_width, 0xff, 0)
+            swirl.frames.append(frame)
+        module.swirls.append(swirl)
+
+
+def _synthesize_death_screen(module, rom, rng):
+    _randomize_tileset(rng, module.tileset, bpp=4)
+    _randomize_arrangement(rng, module.arrangement, num_tiles=module.arrangement.width * module.arrangement.height,
+                           num_subpalettes=module.palette.num_subpalettes)
+    _randomize_palette(rng, module.palette)
+
+
+def _synthesize_sound_stone(module, rom, rng):
+    _randomize_tileset(rng, module.tileset, bpp=4)
+    _randomize_palette(rng, module.palette)
+
+
+def _synthesize_map(module, rom, rng):
+    # The empty ROM doesn't point the map's sections anywhere, so point them at an unused part of it
+    rom.write_multi(MapModule.MAP_POINTERS_OFFSET, to_snes_address(_MAP_SECTION_POINTERS_OFFSET), 3)
+    for i in range(8):
+        rom.write_multi(_MAP_SECTION_POINTERS_OFFSET + i * 4,
+                        to_snes_address(_MAP_SECTIONS_OFFSET + i * _MAP_SECTION_SIZE), 4)
+    module.read_from_rom(rom)
+
+    # Like real maps, the map is made up of runs of the same tile
+    module.tiles = []
+    for y in range(MapModule.MAP_HEIGHT):
+        row = []
+        while len(row) < MapModule.MAP_WIDTH:
+            row += [rng.randrange(0x400)] * rng.randint(1, 16)
+        module.tiles.append(row[:MapModule.MAP_WIDTH])
+
+
+def _synthesize_map_events(module, rom, rng):
+    for i in range(module.pointer_table.num_rows):
+        module.pointer_table[i] = [
+            (rng.randrange(1, 0x400),
+             [[rng.randrange(0x400), rng.randrange(0x400)] for _ in range(rng.randint(1, 16))])
+            for _ in range(rng.randint(0, 3))]
+
+
+def _synthesize_fonts(module, rom, rng):
+    for font in module.fonts:
+        _randomize_tileset(rng, font.tileset, bpp=1)
+        for i in range(96, font.num_characters):
+            font.tileset.clear_tile(i, color=1)
+        font.character_widths = [rng.randint(1, font.tileset.tile_width) for _ in range(font.num_characters)]
+    _randomize_tileset(rng, module.credits_font.tileset, bpp=2)
+    _randomize_palette(rng, module.credits_font.palette)
+
+
+def _synthesize_window_graphics(module, rom, rng):
+    _randomize_tileset(rng, module.graphics_1, bpp=2)
+    _randomize_tileset(rng, module.graphics_2, bpp=2)
+    for palette in module.flavor_palettes:
+        _randomize_palette(rng, palette)
+    for i, asm_pointer_offset in enumerate(WindowGraphicsModule.FLAVOR_NAME_ASM_POINTER_OFFSETS):
+        module.flavor_names[asm_pointer_offset] = "Flavor {}".format(i + 1)
+
+
+def _synthesize_battle_bgs(module, rom, rng):
+    module.bg_table.from_block(block=rom, offset=from_snes_address(BattleBgModule.BACKGROUND_TABLE_OFFSET))
+    module.scroll_table.from_block(block=rom, offset=from_snes_address(BattleBgModule.SCROLL_TABLE_OFFSET))
+    module.distortion_table.from_block(block=rom, offset=from_snes_address(BattleBgModule.DISTORTION_TABLE_OFFSET))
+
+    num_backgrounds = module.graphics_pointer_table.num_rows
+    num_palettes = module.palette_pointer_table.num_rows
+    color_depths = [rng.choice([2, 2, 4]) for _ in range(num_backgrounds)]
+    for i in range(module.bg_table.num_rows):
+        module.bg_table[i][0] = i % num_backgrounds
+        module.bg_table[i][1] = i % num_palettes
+        module.bg_table[i][2] = color_depths[i % num_backgrounds]
+
+    module.backgrounds = []
+    for color_depth in color_depths:
+        num_tiles = rng.randint(32, 256)
+        tileset = EbGraphicTileset(num_tiles=512, tile_width=8, tile_height=8)
+        _randomize_tileset(rng, tileset, bpp=color_depth, num_tiles=num_tiles)
+        arrangement = EbTileArrangement(width=32, height=32)
+        _randomize_arrangement(rng, arrangement, num_tiles=num_tiles)
+        module.backgrounds.append((tileset, color_depth, arrangement))
+
+    module.palettes = []
+    for i in range(num_palettes):
+        palette = EbPalette(num_subpalettes=1, subpalette_length=16)
+        _randomize_palette(rng, palette)
+        module.palettes.append(palette)
+
+
+def _synthesize_compressed_graphics(module, rom, rng):
+    for graphic in module.town_maps + [module.town_map_icons] + module.company_logos + module.attract_mode_logos \
+            + [module.gas_station_logo]:
+        _randomize_compressed_graphic(rng, graphic)
+
+
+def _synthesize_enemies(module, rom, rng):
+    module.enemy_config_table.from_block(
+        block=rom, offset=from_snes_address(EnemyModule.ENEMY_CONFIGURATION_TABLE_DEFAULT_OFFSET))
+    module.enemy_group_bg_table.from_block(
+        block=rom, offset=from_snes_address(EnemyModule.ENEMY_GROUP_BACKGROUND_TABLE_DEFAULT_OFFSET))
+    module.enemy_group_table.from_block(
+        block=rom, offset=from_snes_address(EnemyModule.ENEMY_GROUP_TABLE_DEFAULT_OFFSET))
+
+    module.battle_sprites = []
+    for i in range(module.graphics_pointer_table.num_rows):
+        sprite = EbBattleSprite()
+        size = rng.randint(1, len(BATTLE_SPRITE_SIZES) - 1)
+        width, height = BATTLE_SPRITE_SIZES[size]
+        with Block((width // 32) * (height // 32) * 512) as block:
+            block[0:block.size] = _random_data(rng, block.size)
+            sprite.from_block(block=block, offset=0, size=size)
+        module.battle_sprites.append(sprite)
+
+    module.palettes = []
+    for i in range(module.graphics_pointer_table.num_rows):
+        palette = EbPalette(num_subpalettes=1, subpalette_length=16)
+        _randomize_palette(rng, palette)
+        module.palettes.append(palette)
+
+    # Like in the real game, every battle sprite is used by at least one enemy, since the project only keeps the battle
+    # sprites which are used
+    for i in range(module.enemy_config_table.num_rows):
+        if i < len(module.battle_sprites):
+            module.enemy_config_table[i][4] = i + 1
+        else:
+            module.enemy_config_table[i][4] = rng.randint(1, len(module.battle_sprites))
+        module.enemy_config_table[i][14] = rng.randrange(len(module.palettes))
+
+    module.enemy_groups = [[[rng.randint(1, 3), rng.randrange(module.enemy_config_table.num_rows)]
+                            for _ in range(rng.randint(1, 4))]
+                           for _ in range(module.enemy_group_table.num_rows)]
+
+
+def _synthesize_title_screen(module, rom, rng):
+    _randomize_tileset(rng, module.bg_tileset, bpp=TitleScreenModule.BG_TILESET_BPP)
+    _randomize_arrangement(rng, module.bg_arrangement, num_tiles=TitleScreenModule.BG_NUM_TILES)
+    _randomize_palette(rng, module.bg_palette)
+    _randomize_palette(rng, module.bg_anim_palette)
+    _randomize_tileset(rng, module.chars_tileset, bpp=TitleScreenModule.CHARS_TILESET_BPP)
+    _randomize_palette(rng, module.chars_palette)
+    _randomize_palette(rng, module.chars_anim_palette)
+    module.bg_palette[0, TitleScreenModule.CHARS_ANIM_SLICE] = module.chars_anim_palette.get_subpalette(
+        TitleScreenModule.CHARS_NUM_ANIM_SUBPALETTES - 1)[0, :]
+
+    # Each character is three tiles wide and six tiles tall. Like in the game, each character is made up of 2x2 tile
+    # entries where it can be, and single tile entries along its right edge.
+    multi_tiles = iter([row * 32 + column * 2 for row in range(8) for column in range(8)])
+    single_tiles = iter(range(256, 512))
+    module.chars_layouts = []
+    for c in range(TitleScreenModule.NUM_CHARS):
+        layout = []
+        for j in range(0, 6, 2):
+            entry = TitleScreenLayoutEntry(x=-16, y=j * 8 - 24, tile=next(multi_tiles))
+            entry.set_single(True)
+            layout.append(entry)
+        for j in range(6):
+            layout.append(TitleScreenLayoutEntry(x=0, y=j * 8 - 24, tile=next(single_tiles)))
+        layout[-1].set_final(True)
+        module.chars_layouts.append(layout)
+
+
+def _synthesize_tilesets(module, rom, rng):
+    for tileset in module.tilesets:
+        _randomize_tileset(rng, tileset.minitiles, bpp=4)
+
+        # Tilesets reuse a limited number of collision patterns, and leave some of their arrangements empty
+        collisions = [[rng.choice([0x00, 0x00, 0x00, 0x80, 0x10, 0x08, 0x04]) for _ in range(16)]
+                      for _ in range(64)]
+        num_arrangements = rng.randint(600, 900)
+        for i in range(num_arrangements, len(tileset.arrangements)):
+            tileset.arrangements[i] = [[0] * 4 for y in range(4)]
+            tileset.collisions[i] = [0] * 16
+        for i in range(num_arrangements):
+            tileset.arrangements[i] = [[rng.randrange(tileset.minitiles.num_tiles_maximum)
+                                        | (rng.randrange(2, 8) << 10)
+                                        | (rng.random() < 0.1) << 14
+                                        | (rng.random() < 0.1) << 15
+                                        for x in range(4)]
+                                       for y in range(4)]
+            tileset.collisions[i] = rng.choice(collisions)
+
+    # Every map tileset uses one of the drawing tilesets, and has a few palettes. The game assumes that the last map
+    # tileset has eight palettes.
+    for map_tileset in range(_NUM_MAP_TILESETS):
+        tileset = module.tilesets[map_tileset % len(module.tilesets)]
+        num_palettes = 8 if map_tileset == _NUM_MAP_TILESETS - 1 else rng.randint(1, 6)
+        for map_palette in range(num_palettes):
+            palette = _random_map_palette(rng)
+            if rng.random() < 0.1:
+                palette.flag = rng.randrange(1, 0x400)
+                palette.flag_palette = _random_map_palette(rng)
+            tileset.add_palette(map_tileset, map_palette, palette)
+
+
+def _random_map_palette(rng):
+    palette = EbMapPalette()
+    _randomize_palette(rng, palette)
+    # The first color of each of a map palette's subpalettes is always black
+    for subpalette in palette.subpalettes:
+        subpalette[0].from_int(0)
+    palette.sprite_palette_id = rng.randrange(8)
+    return palette
+
+
+_SYNTHESIZERS = {
+    "eb.SpriteGroupModule": _synthesize_sprite_groups,
+    "eb.SwirlModule": _synthesize_swirls,
+    "eb.DeathScreenModule": _synthesize_death_screen,
+    "eb.SoundStoneModule": _synthesize_sound_stone,
+    "eb.MapModule": _synthesize_map,
+    "eb.MapEventModule": _synthesize_map_events,
+    "eb.FontModule": _synthesize_fonts,
+    "eb.WindowGraphicsModule": _synthesize_window_graphics,
+    "eb.BattleBgModule": _synthesize_battle_bgs,
+    "eb.CompressedGraphicsModule": _synthesize_compressed_graphics,
+    "eb.EnemyModule": _synthesize_enemies,
+    "eb.TitleScreenModule": _synthesize_title_screen,
+    "eb.TilesetModule": _synthesize_tilesets,
+}
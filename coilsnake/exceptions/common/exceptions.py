@@ -103,6 +103,9 @@ class TableSchemaError(EqualityMixin, StringRepresentationMixin, CoilSnakeError)
     def __str__(self):
         return "{}: Error while parsing \"{}\":\n{}".format(self.__class__.__name__, self.field, str(self.cause))
 
+    def __reduce__(self):
+        return self.__class__, (self.field, self.cause)
+
 
 class TableError(EqualityMixin, StringRepresentationMixin, CoilSnakeError):
     def __init__(self, table_name=None, entry=None, field=None, cause=None):
@@ -121,4 +124,7 @@ class TableError(EqualityMixin, StringRepresentationMixin, CoilSnakeError):
             str_rep += " in table \"{}\"".format(self.table_name)
         str_rep += ":\n" + str(self.cause)
 
-        return str_rep
\ No newline at end of file
+        return str_rep
+
+    def __reduce__(self):
+        return self.__class__, (self.table_name, self.entry, self.field, self.cause)
\ No newline at end of file
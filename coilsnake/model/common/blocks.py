@@ -1,11 +1,18 @@
 import array
+from bisect import bisect_left
 import copy
+from itertools import islice
+import mmap
 import os
+import struct
+from weakref import WeakValueDictionary
 from zlib import crc32
 
 from coilsnake.exceptions.common.exceptions import OutOfBoundsError, InvalidArgumentError, \
     NotEnoughUnallocatedSpaceError, FileAccessError, CouldNotAllocateError
 from coilsnake.util.common.assets import open_asset
+from coilsnake.util.common.import_profile import setup_step
+from coilsnake.util.common.profile import count, COUNTER_ALLOCATE_CALLS, COUNTER_ALLOCATED_BYTES
 from coilsnake.util.common.yml import yml_load
 
 
@@ -17,7 +24,34 @@ def check_range_validity(range, size):
         raise OutOfBoundsError("Invalid range[(%#x,%#x)] provided" % (begin, end))
 
 
+# The struct formats for reading and writing little-endian integers of each size
+_MULTI_STRUCT_FORMATS = {1: "B", 2: "H", 4: "I", 8: "Q"}
+
+
 class Block(object):
+    """A mutable sequence of bytes.
+    Slicing a Block returns a view Block whose data is a memoryview over this Block's data, so no bytes are copied.
+    Views behave like copies: a view copies its bytes into its own array the first time it is written to, and a Block
+    which is about to be written to first does the same for each of its views which are still alive.
+
+    A Block loaded with from_file(filename, mapped=True) memory-maps the file instead of reading it into an array. Writes
+    to the Block go directly to the mapped file, resizing the Block resizes the file, and saving the Block back to the
+    same file only needs to flush the pages which were written to. With read_only=True as well, the file is mapped
+    read-only, so several processes can share one copy of it, and writing to the Block raises TypeError."""
+
+    # The live views of this Block keyed by their ids, which is only created once the first view is made. Views are not
+    # kept in a WeakSet because Blocks are hashed and compared by their contents, not by their identities.
+    # Every view is registered with the Block which owns the buffer it is over, even when it is a view of a view, so
+    # that the owner can still find it after any intermediate views are gone.
+    _views = None
+
+    # The Block which owns the buffer this view is over, if this Block is a view
+    _base = None
+
+    # Values computed from this Block's data, such as decompressed data, which is only created once the first value is
+    # cached. It is discarded whenever this Block's data is modified or replaced, so it never holds stale values.
+    _data_cache = None
+
     def __init__(self, size=0):
         self.reset(size)
 
@@ -28,49 +62,182 @@ class Block(object):
         del self.data
 
     def reset(self, size=0):
+        self._data_cache = None
         self.data = array.array('B', [0] * size)
         self.size = size
+        self.mapped_filename = None
 
-    def from_file(self, filename):
+    def from_file(self, filename, mapped=False, read_only=False):
         self.reset()
 
         try:
             self.size = int(os.path.getsize(filename))
             del self.data
-            self.data = array.array('B')
-            with open(filename, 'rb') as file:
-                self.data.fromfile(file, self.size)
+            if mapped and self.size > 0:
+                if read_only:
+                    with open(filename, 'rb') as file:
+                        self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+                else:
+                    with open(filename, 'r+b') as file:
+                        self.data = mmap.mmap(file.fileno(), 0)
+                self.mapped_filename = filename
+            else:
+                self.data = array.array('B')
+                with open(filename, 'rb') as file:
+                    self.data.fromfile(file, self.size)
         except (IOError, OSError):
             raise FileAccessError("Could not access file[%s]" % filename)
 
     def from_list(self, data_list):
+        self._data_cache = None
         self.size = len(data_list)
         del self.data
         self.data = array.array('B')
         self.data.fromlist(data_list)
 
     def from_array(self, data_array):
+        self._data_cache = None
         self.size = len(data_array)
         del self.data
         self.data = copy.copy(data_array)
 
+    def from_bytes(self, data):
+        """Sets this Block's data to a copy of a bytes-like object."""
+        self._data_cache = None
+        self.data = array.array('B', data)
+        self.size = len(self.data)
+
     def from_block(self, block, offset=0, size=None):
+        self._data_cache = None
         if size is None:
             size = block.size - offset
         with block[offset:offset + size] as sub_block:
             self.size = sub_block.size
-            self.data = sub_block.data
+            self._set_view_data(sub_block._base, sub_block.data)
 
     def to_file(self, filename):
+        if self.is_mapped() and os.path.exists(filename) and os.path.samefile(filename, self.mapped_filename):
+            # The file already contains this Block's data, so only the pages which were written to need to be saved
+            self.data.flush()
+            return
+
         with open(filename, 'wb') as f:
-            self.data.tofile(f)
+            f.write(self.data)
+
+    def to_bytes(self):
+        """Returns a copy of this Block's data as bytes."""
+        return bytes(self.data)
 
     def to_list(self):
+        if self.is_mapped():
+            return memoryview(self.data).tolist()
         return self.data.tolist()
 
     def to_array(self):
+        self._prepare_for_write()
         return self.data
 
+    def is_view(self):
+        return isinstance(self.data, memoryview)
+
+    def is_mapped(self):
+        return isinstance(self.data, mmap.mmap)
+
+    def _resize(self, size):
+        """Adds zeroes to or removes bytes from the end of this Block's data so that it is of the given size."""
+        self._data_cache = None
+        if self.is_mapped():
+            self._prepare_for_write()
+            self.data.resize(size)
+        elif size > self.size:
+            self._prepare_for_write()
+            self.data.frombytes(bytes(size - self.size))
+        elif self.is_view():
+            self._set_view_data(self._base, self.data[:size])
+        else:
+            self.data = self.data[:size]
+        self.size = size
+
+    def _insert_leading_bytes(self, size):
+        """Adds the given number of zeroes to the beginning of this Block's data."""
+        if self.is_mapped():
+            old_size = self.size
+            self._resize(old_size + size)
+            self.data.move(size, 0, old_size)
+            self.data[0:size] = bytes(size)
+        else:
+            self._prepare_for_write()
+            self.data[0:0] = array.array('B', bytes(size))
+            self.size += size
+
+    def _remove_leading_bytes(self, size):
+        """Removes the given number of bytes from the beginning of this Block's data."""
+        self._data_cache = None
+        if self.is_mapped():
+            new_size = self.size - size
+            self._prepare_for_write()
+            self.data.move(0, size, new_size)
+            self._resize(new_size)
+        elif self.is_view():
+            self._set_view_data(self._base, self.data[size:])
+            self.size -= size
+        else:
+            self.data = self.data[size:]
+            self.size -= size
+
+    def data_cache(self):
+        """Returns a dict in which values computed from this Block's data can be cached. The dict is emptied whenever
+        this Block's data is modified through this Block, so callers which write to the array returned by to_array()
+        directly must not rely on it."""
+        if self._data_cache is None:
+            self._data_cache = dict()
+        return self._data_cache
+
+    def _view_base(self):
+        """Returns the Block which owns the buffer that this Block's data is in."""
+        if self.is_view() and self._base is not None:
+            return self._base
+        return self
+
+    def _set_view_data(self, base, data):
+        """Makes this Block a view whose data is a memoryview over the buffer owned by another Block."""
+        self._base = base
+        self.data = data
+        if base._views is None:
+            base._views = WeakValueDictionary()
+        base._views[id(self)] = self
+
+    def _copy_view_data(self):
+        self.data = array.array('B', self.data)
+        self._base = None
+
+    def _detach_views(self):
+        if self._views:
+            for view in list(self._views.values()):
+                if view._base is self and isinstance(getattr(view, "data", None), memoryview):
+                    view._copy_view_data()
+            self._views.clear()
+
+    def _prepare_for_write(self):
+        """Must be called before this Block's data is modified in place."""
+        self._data_cache = None
+        if isinstance(self.data, memoryview):
+            self._copy_view_data()
+        else:
+            self._detach_views()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop("_views", None)
+        state.pop("_base", None)
+        state.pop("_data_cache", None)
+        if isinstance(state.get("data"), (memoryview, mmap.mmap)):
+            data = array.array('B')
+            data.frombytes(state["data"])
+            state["data"] = data
+            state["mapped_filename"] = None
+        return state
+
     def to_block(self, block, offset=0):
         self[offset:offset + block.size] = block
 
@@ -83,12 +250,7 @@ class Block(object):
             raise OutOfBoundsError("Attempted to read size[%d] bytes from offset[%#x], which is out of bounds in this "
                                    "block of size[%#x]" % (size, key, self.size))
         else:
-            out = 0
-            bit_offset = 0
-            for byte in self.data[key:key + size]:
-                out |= byte << bit_offset
-                bit_offset += 8
-            return out
+            return int.from_bytes(self.data[key:key + size], "little")
 
     def write_multi(self, key, item, size):
         if size < 0:
@@ -99,10 +261,58 @@ class Block(object):
         elif size == 0:
             return
         else:
+            self._prepare_for_write()
             for i in range(key, key+size):
                 self.data[i] = item & 0xff
                 item >>= 8
 
+    def read_multi_list(self, key, size, count):
+        """Reads a sequence of little-endian integers from this Block.
+        :param key: the offset of the first integer
+        :param size: the size of each integer in bytes
+        :param count: the number of integers to read
+        :return: a list of the integers"""
+        if size <= 0:
+            raise InvalidArgumentError("Attempted to read data of invalid length[%d]" % size)
+        elif count < 0:
+            raise InvalidArgumentError("Attempted to read a negative number[%d] of values" % count)
+        elif count == 0:
+            return []
+        elif (key < 0) or (key + size * count > self.size):
+            raise OutOfBoundsError("Attempted to read %d values of size[%d] bytes from offset[%#x], which is out of "
+                                   "bounds in this block of size[%#x]" % (count, size, key, self.size))
+
+        struct_format = _MULTI_STRUCT_FORMATS.get(size)
+        if struct_format is not None:
+            return list(struct.unpack_from("<%d%s" % (count, struct_format), self.data, key))
+        else:
+            data = bytes(self.data[key:key + size * count])
+            return [int.from_bytes(data[i:i + size], "little") for i in range(0, len(data), size)]
+
+    def write_multi_list(self, key, items, size):
+        """Writes a sequence of little-endian integers to this Block.
+        :param key: the offset at which to write the first integer
+        :param items: the integers to write
+        :param size: the size of each integer in bytes"""
+        count = len(items)
+        if size <= 0:
+            raise InvalidArgumentError("Attempted to write data of invalid length[%d]" % size)
+        elif count == 0:
+            return
+        elif (key < 0) or (key + size * count > self.size):
+            raise OutOfBoundsError("Attempted to write %d values of size[%d] bytes to offset[%#x], which is out of "
+                                   "bounds in this block of size[%#x]" % (count, size, key, self.size))
+
+        self._prepare_for_write()
+        # Like write_multi, only the lowest size bytes of each item are written
+        mask = (1 << (size * 8)) - 1
+        struct_format = _MULTI_STRUCT_FORMATS.get(size)
+        if struct_format is not None:
+            struct.pack_into("<%d%s" % (count, struct_format), self.data, key, *[item & mask for item in items])
+        else:
+            memoryview(self.data)[key:key + size * count] = b"".join([(item & mask).to_bytes(size, "little")
+                                                                     for item in items])
+
     def __getitem__(self, key):
         if isinstance(key, slice):
             if key.start > key.stop:
@@ -112,7 +322,8 @@ class Block(object):
                                                                                                           key.stop - 1))
             else:
                 out = Block()
-                out.from_array(self.data[key])
+                out.size = key.stop - key.start
+                out._set_view_data(self._view_base(), memoryview(self.data)[key])
                 return out
         elif isinstance(key, int):
             if key >= self.size:
@@ -129,9 +340,9 @@ class Block(object):
             if key >= self.size:
                 raise OutOfBoundsError("Attempted to write to offset[%#x] which is out of bounds" % key)
             else:
+                self._prepare_for_write()
                 self.data[key] = item
-        elif isinstance(key, slice) and \
-                (isinstance(item, list) or isinstance(item, array.array) or isinstance(item, Block)):
+        elif isinstance(key, slice) and isinstance(item, (list, array.array, Block, bytes, bytearray)):
             if key.start > key.stop:
                 raise InvalidArgumentError("Second argument of slice %s must be greater than  the first" % key)
             elif (key.start < 0) or (key.stop - 1 >= self.size):
@@ -143,12 +354,19 @@ class Block(object):
             elif (key.stop - key.start) == 0:
                 raise InvalidArgumentError("Attempted to write data of size 0")
             else:
+                self._prepare_for_write()
                 if isinstance(item, list):
                     self.data[key] = array.array('B', item)
                 elif isinstance(item, array.array):
                     self.data[key] = item
+                elif isinstance(item, (bytes, bytearray)):
+                    memoryview(self.data)[key] = item
                 elif isinstance(item, Block):
-                    self.data[key] = item.data
+                    if isinstance(item.data, memoryview):
+                        # Slice assignment of an array only accepts another array
+                        memoryview(self.data)[key] = item.data
+                    else:
+                        self.data[key] = item.data
                 else:
                     raise InvalidArgumentError("Can not write value of type[{}]".format(type(item)))
         else:
@@ -159,6 +377,8 @@ class Block(object):
         return self.size
 
     def __eq__(self, other):
+        if self.is_mapped() or (isinstance(other, Block) and other.is_mapped()):
+            return (isinstance(other, type(self))) and (memoryview(self.data) == memoryview(other.data))
         return (isinstance(other, type(self))) and (self.data == other.data)
 
     def __ne__(self, other):
@@ -168,70 +388,94 @@ class Block(object):
         return crc32(self.data)
 
 
+ALLOCATION_STRATEGY_FIRST_FIT = "first-fit"
+ALLOCATION_STRATEGY_BEST_FIT = "best-fit"
+ALLOCATION_STRATEGIES = [ALLOCATION_STRATEGY_FIRST_FIT, ALLOCATION_STRATEGY_BEST_FIT]
+
+
 class AllocatableBlock(Block):
+    """A Block which keeps track of which of its ranges are unallocated.
+    The unallocated ranges are stored in unallocated_ranges as a sorted list of non-overlapping (begin, end) tuples, so
+    ranges can be looked up by address with bisect instead of by scanning the entire list. Adjacent unallocated ranges
+    are merged automatically, unless doing so would create a range which spans two banks.
+
+    allocation_strategy decides where allocations are placed:
+    - first-fit uses the lowest-addressed range which is large enough
+    - best-fit uses the range which would have the least space left over, keeping larger ranges intact for later
+
+    If allocation_journal is set, every allocation, deallocation and range which is marked as allocated is recorded in
+    it, including allocations which fail."""
+
+    allocation_strategy = ALLOCATION_STRATEGY_FIRST_FIT
+    allocation_journal = None
+
     def reset(self, size=0):
         super(AllocatableBlock, self).reset(size)
         self.unallocated_ranges = []
+        # Every range which was deallocated, in order, so that the space which was ever allocatable can be found
+        self.deallocated_ranges = []
+
+    def _index_of_first_range_ending_at_or_after(self, offset):
+        # Since the ranges don't overlap, they are sorted both by their beginnings and by their ends
+        i = bisect_left(self.unallocated_ranges, (offset, offset))
+        if i > 0 and self.unallocated_ranges[i - 1][1] >= offset:
+            return i - 1
+        return i
 
     def get_unallocated_portions_of_range(self, input_range):
         check_range_validity(input_range, self.size)
 
         input_begin, input_end = input_range
-
-        for unallocated_begin, unallocated_end in self.unallocated_ranges:
-            if unallocated_begin <= input_begin <= unallocated_end:
-                if unallocated_end >= input_end:
-                    return [input_range]
-                else:
-                    return ([(input_begin, unallocated_end)] +
-                            self.get_unallocated_portions_of_range((unallocated_end + 1, input_end)))
-            elif input_begin <= unallocated_begin <= input_end:
-                if input_end <= unallocated_end:
-                    return (self.get_unallocated_portions_of_range((input_begin, unallocated_begin - 1)) +
-                            [(unallocated_begin, input_end)])
-                else:
-                    return (self.get_unallocated_portions_of_range((input_begin, unallocated_begin - 1)) +
-                            [(unallocated_begin, unallocated_end)] +
-                            self.get_unallocated_portions_of_range((unallocated_end + 1, input_end)))
-        return []
+        portions = []
+        for i in range(self._index_of_first_range_ending_at_or_after(input_begin), len(self.unallocated_ranges)):
+            unallocated_begin, unallocated_end = self.unallocated_ranges[i]
+            if unallocated_begin > input_end:
+                break
+            portions.append((max(input_begin, unallocated_begin), min(input_end, unallocated_end)))
+        return portions
 
     def mark_allocated(self, used_range):
+        self._mark_allocated(used_range)
+        if self.allocation_journal is not None:
+            self.allocation_journal.record_mark_allocated(used_range)
+
+    def _mark_allocated(self, used_range):
         check_range_validity(used_range, self.size)
 
         allocated_begin, allocated_end = used_range
-        for i in range(len(self.unallocated_ranges)):
-            a = self.unallocated_ranges[i]
-            begin, end = a
-            if allocated_begin == begin:
-                if allocated_end < end:
-                    self.unallocated_ranges[i] = (allocated_end + 1, end)
-                elif allocated_end == end:
-                    del (self.unallocated_ranges[i])
-                else:  # allocated_end > end
-                    del (self.unallocated_ranges[i])
-                    self.mark_allocated((end + 1, allocated_end))
-                return
-            elif (allocated_begin > begin) and (allocated_end <= end):
-                self.unallocated_ranges[i] = (begin, allocated_begin - 1)
-                if allocated_end != end:
-                    self.unallocated_ranges.insert(i, (allocated_end + 1, end))
-                    self.unallocated_ranges.sort()
-                return
-            elif (allocated_begin > begin) and (allocated_begin < end) and (allocated_end > end):
-                self.unallocated_ranges[i] = (begin, allocated_begin - 1)
-                self.mark_allocated((end + 1, allocated_end))
-                return
-        raise CouldNotAllocateError("Couldn't mark range (%#x,%#x) as allocated because it is at least "
-                                    "partially already allocated" % (allocated_begin, allocated_end))
+
+        # Find all the unallocated ranges which the used range covers, and make sure they are contiguous
+        first = self._index_of_first_range_ending_at_or_after(allocated_begin)
+        last = first
+        position = allocated_begin
+        while True:
+            if last >= len(self.unallocated_ranges) or self.unallocated_ranges[last][0] > position:
+                raise CouldNotAllocateError("Couldn't mark range (%#x,%#x) as allocated because it is at least "
+                                            "partially already allocated" % (allocated_begin, allocated_end))
+            position = self.unallocated_ranges[last][1] + 1
+            if position > allocated_end:
+                break
+            last += 1
+
+        # Replace the covered ranges with whatever is left of them on either side of the used range
+        remaining_ranges = []
+        first_begin = self.unallocated_ranges[first][0]
+        last_end = self.unallocated_ranges[last][1]
+        if first_begin < allocated_begin:
+            remaining_ranges.append((first_begin, allocated_begin - 1))
+        if last_end > allocated_end:
+            remaining_ranges.append((allocated_end + 1, last_end))
+        self.unallocated_ranges[first:last + 1] = remaining_ranges
 
     def is_unallocated(self, range):
         check_range_validity(range, self.size)
 
         search_begin, search_end = range
-        for begin, end in self.unallocated_ranges:
-            if (search_begin >= begin) and (search_end <= end):
-                return True
-        return False
+        i = self._index_of_first_range_ending_at_or_after(search_begin)
+        if i >= len(self.unallocated_ranges):
+            return False
+        begin, end = self.unallocated_ranges[i]
+        return (search_begin >= begin) and (search_end <= end)
 
     def is_allocated(self, range):
         return not self.is_unallocated(range)
@@ -239,13 +483,66 @@ class AllocatableBlock(Block):
     def deallocate(self, range):
         check_range_validity(range, self.size)
 
-        # TODO do some check so that unallocated ranges don't overlap
-        # TODO attach contiguous unallocated ranges if possible
+        begin, end = range
 
-        self.unallocated_ranges.append(range)
-        self.unallocated_ranges.sort()
-
-    def allocate(self, data=None, size=None, can_write_to=None):
+        # Absorb any ranges which overlap this range, or which are adjacent to it within the same bank
+        first = self._index_of_first_range_ending_at_or_after(begin - 1 if _bank(begin) == _bank(begin - 1) else begin)
+        last = first
+        while last < len(self.unallocated_ranges):
+            other_begin, other_end = self.unallocated_ranges[last]
+            if other_begin > end + 1 or (other_begin == end + 1 and _bank(other_begin) != _bank(end)):
+                break
+            begin = min(begin, other_begin)
+            end = max(end, other_end)
+            last += 1
+
+        self.unallocated_ranges[first:last] = [(begin, end)]
+        self.deallocated_ranges.append(tuple(range))
+
+        if self.allocation_journal is not None:
+            self.allocation_journal.record_deallocate(range)
+
+    def _candidate_offsets(self, size, bank=None, not_bank=None, alignment=1):
+        """Yields the offset at which an allocation of the given size could begin in each unallocated range which
+        satisfies the given constraints, along with the end of that range, in order of address.
+        :param bank: if provided, the allocation must lie entirely within this bank
+        :param not_bank: if provided, the allocation must lie entirely outside of this bank
+        :param alignment: the allocation's offset must be a multiple of this value"""
+        if bank is not None:
+            bank_begin, bank_end = bank << 16, (bank << 16) | 0xffff
+            i = self._index_of_first_range_ending_at_or_after(bank_begin)
+        else:
+            i = 0
+
+        for begin, end in islice(self.unallocated_ranges, i, None):
+            if bank is not None:
+                if begin > bank_end:
+                    break
+                pieces = [(max(begin, bank_begin), min(end, bank_end))]
+            elif not_bank is not None and _bank(begin) <= not_bank <= _bank(end):
+                pieces = [(begin, min(end, (not_bank << 16) - 1)), (max(begin, (not_bank + 1) << 16), end)]
+            else:
+                pieces = [(begin, end)]
+
+            for piece_begin, piece_end in pieces:
+                offset = piece_begin
+                if offset % alignment != 0:
+                    offset += alignment - (offset % alignment)
+                if offset + size - 1 <= piece_end:
+                    yield offset, piece_end
+
+    def allocate(self, data=None, size=None, can_write_to=None, bank=None, not_bank=None, alignment=1, strategy=None):
+        """Allocates a range of unallocated space in this block, and optionally writes data to it.
+        :param data: data to write to the allocated range
+        :param size: size of the range to allocate, which defaults to the size of data
+        :param can_write_to: an optional function which is given a possible offset for the allocation and returns
+                             whether the allocation may be placed there. Prefer the bank, not_bank, and alignment
+                             parameters, which do not require every unallocated range to be checked.
+        :param bank: if provided, the allocation must lie entirely within this bank
+        :param not_bank: if provided, the allocation must lie entirely outside of this bank
+        :param alignment: the allocation's offset must be a multiple of this value
+        :param strategy: the allocation strategy to use, which defaults to this block's allocation_strategy
+        :return: the offset of the allocated range"""
         if data is None and size is None:
             raise InvalidArgumentError("Insufficient parameters provided")
 
@@ -257,30 +554,65 @@ class AllocatableBlock(Block):
         if size <= 0:
             raise InvalidArgumentError("Cannot allocate a range of size[%d]" % size)
 
-        # First find a free range
-        allocated_range = None
-        for i in range(0, len(self.unallocated_ranges)):
-            begin, end = self.unallocated_ranges[i]
-            if size <= end - begin + 1:
-                if (can_write_to is not None) and (not can_write_to(begin)):
-                    continue
-
-                if begin + size - 1 == end:
-                    # Used up the entire free range
-                    del (self.unallocated_ranges[i])
-                else:
-                    self.unallocated_ranges[i] = (begin + size, end)
-
-                allocated_range = (begin, begin + size - 1)
+        if strategy is None:
+            strategy = self.allocation_strategy
+        if strategy not in ALLOCATION_STRATEGIES:
+            raise InvalidArgumentError("Unknown allocation strategy[%s]" % strategy)
+
+        offset = None
+        best_leftover_size = None
+        for candidate_offset, range_end in self._candidate_offsets(size, bank=bank, not_bank=not_bank,
+                                                                   alignment=alignment):
+            if (can_write_to is not None) and not can_write_to(candidate_offset):
+                continue
+            if strategy == ALLOCATION_STRATEGY_FIRST_FIT:
+                offset = candidate_offset
                 break
-
-        if allocated_range is None:
+            leftover_size = range_end - (candidate_offset + size - 1)
+            if (best_leftover_size is None) or (leftover_size < best_leftover_size):
+                offset, best_leftover_size = candidate_offset, leftover_size
+                if leftover_size == 0:
+                    break
+
+        if self.allocation_journal is not None:
+            self.allocation_journal.record_allocate(offset, size, bank=bank, not_bank=not_bank, alignment=alignment)
+        if offset is None:
             raise NotEnoughUnallocatedSpaceError("Not enough free space left")
 
+        self._mark_allocated((offset, offset + size - 1))
+        count(COUNTER_ALLOCATE_CALLS)
+        count(COUNTER_ALLOCATED_BYTES, size)
+
         if data is not None:
-            self[allocated_range[0]:allocated_range[1] + 1] = data
+            self[offset:offset + size] = data
+
+        return offset
+
+    def get_unallocated_space_by_bank(self):
+        """Returns a dict mapping each bank which contains unallocated space to a tuple of the number of unallocated
+        bytes in the bank, the number of unallocated ranges in the bank, and the size of the largest of those ranges."""
+        space = dict()
+        for bank, piece_size in _range_sizes_by_bank(self.unallocated_ranges):
+            total_size, num_ranges, largest_size = space.get(bank, (0, 0, 0))
+            space[bank] = (total_size + piece_size, num_ranges + 1, max(largest_size, piece_size))
+        return space
+
+    def get_allocatable_space_by_bank(self, initial_ranges=()):
+        """Returns a dict mapping each bank to the number of bytes in it which were ever unallocated: the bytes which are
+        unallocated now, which have ever been deallocated, or which are in any of the given initial ranges.
+        :param initial_ranges: the ranges which were unallocated before any of the ranges in this block's
+                               deallocated_ranges were deallocated, such as the ROM type's free ranges"""
+        merged_ranges = []
+        for begin, end in sorted(list(initial_ranges) + self.deallocated_ranges + self.unallocated_ranges):
+            if merged_ranges and begin <= merged_ranges[-1][1] + 1:
+                merged_ranges[-1] = (merged_ranges[-1][0], max(end, merged_ranges[-1][1]))
+            else:
+                merged_ranges.append((begin, end))
 
-        return allocated_range[0]
+        space = dict()
+        for bank, piece_size in _range_sizes_by_bank(merged_ranges):
+            space[bank] = space.get(bank, 0) + piece_size
+        return space
 
     def get_largest_unallocated_range(self):
         largest_begin, largest_end = 1, 0
@@ -293,30 +625,94 @@ class AllocatableBlock(Block):
         return largest_begin, largest_end
 
 
-with open_asset("romtypes.yml") as f:
-    ROM_TYPE_MAP = yml_load(f)
+def _bank(offset):
+    return offset >> 16
+
+
+def _range_sizes_by_bank(ranges):
+    """Yields the bank and size of each piece of each range, after splitting any ranges which span multiple banks."""
+    for begin, end in ranges:
+        while begin <= end:
+            piece_end = min(end, begin | 0xffff)
+            yield _bank(begin), piece_end - begin + 1
+            begin = piece_end + 1
+
+
+_ROM_TYPE_MAP = None
+
+
+def get_rom_type_map():
+    """Returns the map of known ROM types, which is loaded the first time it is needed."""
+    global _ROM_TYPE_MAP
+    if _ROM_TYPE_MAP is None:
+        with setup_step("romtypes.yml"):
+            with open_asset("romtypes.yml") as f:
+                _ROM_TYPE_MAP = yml_load(f)
+    return _ROM_TYPE_MAP
 
 ROM_TYPE_NAME_UNKNOWN = "Unknown"
 
+# The size of the header which some SNES ROMs are dumped with
+SNES_HEADER_SIZE = 0x200
+
+
+def detect_rom_type(filename):
+    """Returns the type of the ROM in a file, without modifying the file. Loading a ROM which has a header removes the
+    header, and a ROM which is memory-mapped has it removed from the file itself, so this is useful for checking a ROM
+    before mapping it."""
+    try:
+        with open(filename, "rb") as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except ValueError:
+        # Empty files can't be mapped
+        return ROM_TYPE_NAME_UNKNOWN
+    except (IOError, OSError):
+        raise FileAccessError("Could not access file[%s]" % filename)
+
+    try:
+        rom = Rom()
+        rom.data = data
+        rom.size = len(data)
+        rom_type, _ = rom._detect_type()
+        del rom
+    finally:
+        data.close()
+    return rom_type
+
+
+def check_can_add_header(rom_type):
+    if rom_type != 'Earthbound':
+        raise NotImplementedError("Don't know how to add header to ROM of type[%s]" % rom_type)
+
 
 class Rom(AllocatableBlock):
     def reset(self, size=0):
         super(Rom, self).reset(size)
         self.type = ROM_TYPE_NAME_UNKNOWN
 
-    def from_file(self, filename):
-        super(Rom, self).from_file(filename)
+    def from_file(self, filename, mapped=False, read_only=False):
+        super(Rom, self).from_file(filename, mapped=mapped, read_only=read_only)
         self._setup_rom_post_load()
 
     def _setup_rom_post_load(self):
-        self.type = self._detect_type()
-        if self.type != ROM_TYPE_NAME_UNKNOWN and 'free ranges' in ROM_TYPE_MAP[self.type]:
-            self.unallocated_ranges = [tuple([int(z, 0) for z in y[1:-1].split(',')]) for y in ROM_TYPE_MAP[self.type]['free ranges']]
+        self.type, header_size = self._detect_type()
+        if header_size:
+            if self.is_mapped() and memoryview(self.data).readonly:
+                # The header can't be removed from a file which is mapped read-only, so the ROM is copied instead
+                data = array.array('B')
+                data.frombytes(self.data)
+                self.data = data
+                self.mapped_filename = None
+            self._remove_leading_bytes(header_size)
+        rom_type_map = get_rom_type_map()
+        if self.type != ROM_TYPE_NAME_UNKNOWN and 'free ranges' in rom_type_map[self.type]:
+            self.unallocated_ranges = [tuple([int(z, 0) for z in y[1:-1].split(',')]) for y in rom_type_map[self.type]['free ranges']]
             self.unallocated_ranges = [begin_end for begin_end in self.unallocated_ranges if begin_end[1] < self.size]
             self.unallocated_ranges.sort()
 
     def _detect_type(self):
-        for type_name, d in ROM_TYPE_MAP.items():
+        """Returns the type of this ROM and the size of its header, without modifying this ROM."""
+        for type_name, d in get_rom_type_map().items():
             offset, data, platform = d['offset'], d['data'], d['platform']
 
             if platform == "SNES":
@@ -327,7 +723,7 @@ class Rom(AllocatableBlock):
                     if (~self[0xffdc] & 0xff == self[0xffde]) \
                             and (~self[0xffdd] & 0xff == self[0xffdf]) \
                             and (self[offset:offset + len(data)].to_list() == data):
-                        return type_name
+                        return type_name, 0
                 except OutOfBoundsError:
                     pass
 
@@ -336,7 +732,7 @@ class Rom(AllocatableBlock):
                     if (~self[0x7fdc] & 0xff == self[0x7fde]) \
                             and (~self[0x7fdd] & 0xff == self[0x7fdf]) \
                             and (self[offset:offset + len(data)].to_list() == data):
-                        return type_name
+                        return type_name, 0
                 except OutOfBoundsError:
                     pass
 
@@ -345,10 +741,7 @@ class Rom(AllocatableBlock):
                     if (~self[0x101dc] & 0xff == self[0x101de]) \
                             and (~self[0x101dd] & 0xff == self[0x101df]) \
                             and (self[offset + 0x200:offset + 0x200 + len(data)].to_list() == data):
-                        # Remove header
-                        self.data = self.data[0x200:]
-                        self.size -= 0x200
-                        return type_name
+                        return type_name, SNES_HEADER_SIZE
                 except OutOfBoundsError:
                     pass
 
@@ -357,28 +750,21 @@ class Rom(AllocatableBlock):
                     if (~self[0x81dc] & 0xff == self[0x81de]) \
                             and (~self[0x81dd] & 0xff == self[0x81df]) \
                             and (self[offset + 0x200:offset + 0x200 + len(data)].to_list() == data):
-                        # Remove header
-                        self.data = self.data[0x200:]
-                        self.size -= 0x200
-                        return type_name
+                        return type_name, SNES_HEADER_SIZE
                 except OutOfBoundsError:
                     pass
             else:
                 try:
                     if self[offset:offset + len(data)].to_list() == data:
-                        return type_name
+                        return type_name, 0
                 except OutOfBoundsError:
                     pass
         else:
-            return ROM_TYPE_NAME_UNKNOWN
+            return ROM_TYPE_NAME_UNKNOWN, 0
 
     def add_header(self):
-        if self.type == 'Earthbound':
-            for i in range(0x200):
-                self.data.insert(0, 0)
-            self.size += 0x200
-        else:
-            raise NotImplementedError("Don't know how to add header to ROM of type[%s]" % self.type)
+        check_can_add_header(self.type)
+        self._insert_leading_bytes(SNES_HEADER_SIZE)
 
     def expand(self, desired_size):
         if self.type == 'Earthbound':
@@ -386,16 +772,13 @@ class Rom(AllocatableBlock):
                 raise InvalidArgumentError("Cannot expand an %s ROM to size[%#x]" % (self.type, self.size))
             else:
                 if self.size == 0x300000:
-                    self.data.fromlist([0] * 0x100000)
-                    self.size += 0x100000
+                    self._resize(0x400000)
                 if desired_size == 0x600000 and self.size == 0x400000:
                     self[0x00ffd5] = 0x25
                     self[0x00ffd7] = 0x0d
-                    self.data.fromlist([0] * 0x200000)
-                    self.size += 0x200000
+                    self._resize(0x600000)
                     # The data range written below is already marked as used in romtypes.yml
                     for i in range(0x8000, 0x8000 + 0x8000):
                         self[0x400000 + i] = self[i]
         else:
             raise NotImplementedError("Don't know how to expand ROM of type[%s]" % self.type)
-
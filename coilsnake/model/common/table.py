@@ -1,14 +1,39 @@
 from abc import abstractmethod
 import logging
+import struct
 
 from coilsnake.exceptions.common.exceptions import InvalidArgumentError, IndexOutOfRangeError, \
     TableEntryInvalidYmlRepresentationError, TableError, TableEntryMissingDataError, TableEntryError, TableSchemaError
 from coilsnake.util.common.helper import getitem_with_default, not_in_inclusive_range
 from coilsnake.util.common.type import GenericEnum
-from coilsnake.util.common.yml import convert_values_to_hex_repr, yml_load, yml_dump
+from coilsnake.util.common.yml import yml_load, yml_dump_items
 
 log = logging.getLogger(__name__)
 
+# The struct formats of little-endian integers which struct can pack directly, keyed by their size
+_INTEGER_STRUCT_FORMATS = {1: "B", 2: "H", 4: "I", 8: "Q"}
+
+
+def _integer_struct_codec(size):
+    """Returns the struct format of a little-endian integer of the given size, along with the functions which convert
+    between the integer and the unpacked struct value, or None if no conversion is needed."""
+    try:
+        return _INTEGER_STRUCT_FORMATS[size], None, None
+    except KeyError:
+        mask = (1 << (8 * size)) - 1
+        return ("{}s".format(size),
+                lambda struct_value: int.from_bytes(struct_value, "little"),
+                lambda value: (value & mask).to_bytes(size, "little"))
+
+
+def _compose(f, g):
+    """Returns a function which applies f and then g, where either may be None if it does nothing."""
+    if f is None:
+        return g
+    elif g is None:
+        return f
+    return lambda x: g(f(x))
+
 
 class TableEntry(object):
     name = "Unnamed TableEntry"
@@ -39,6 +64,32 @@ class TableEntry(object):
         to_yml_rep."""
         return []
 
+    @classmethod
+    def struct_read_codec(cls):
+        """Returns a (format, from_struct_value) tuple which lets this entry be read as part of a struct.Struct, where
+        from_struct_value converts the unpacked value to what from_block would return, or is None if no conversion is
+        needed. Returns None if this entry can only be read with from_block."""
+        return None
+
+    @classmethod
+    def struct_write_codec(cls):
+        """Returns a (format, to_struct_value) tuple which lets this entry be written as part of a struct.Struct, where
+        to_struct_value converts a value to what should be packed, or is None if no conversion is needed. Returns None
+        if this entry can only be written with to_block."""
+        return None
+
+    @classmethod
+    def from_block_rows(cls, block, offset, num_rows):
+        """Reads consecutive entries all at once, or returns None if they need to be read one at a time with
+        from_block."""
+        return None
+
+    @classmethod
+    def to_block_rows(cls, block, offset, values):
+        """Writes consecutive entries all at once, and returns whether it did so. Returns False without writing
+        anything if they need to be written one at a time with to_block."""
+        return False
+
 
 class BooleanTableEntry(TableEntry):
     @classmethod
@@ -64,6 +115,16 @@ class BooleanTableEntry(TableEntry):
     def to_yml_rep(cls, value):
         return value
 
+    @classmethod
+    def struct_read_codec(cls):
+        struct_format, from_struct_value, _ = _integer_struct_codec(cls.size)
+        return struct_format, _compose(from_struct_value, lambda x: x != 0)
+
+    @classmethod
+    def struct_write_codec(cls):
+        struct_format, _, to_struct_value = _integer_struct_codec(cls.size)
+        return struct_format, _compose(lambda x: 1 if x else 0, to_struct_value)
+
 
 class LittleEndianIntegerTableEntry(TableEntry):
     @staticmethod
@@ -81,6 +142,16 @@ class LittleEndianIntegerTableEntry(TableEntry):
     def to_block(cls, block, offset, value):
         block.write_multi(offset, value, cls.size)
 
+    @classmethod
+    def struct_read_codec(cls):
+        struct_format, from_struct_value, _ = _integer_struct_codec(cls.size)
+        return struct_format, from_struct_value
+
+    @classmethod
+    def struct_write_codec(cls):
+        struct_format, _, to_struct_value = _integer_struct_codec(cls.size)
+        return struct_format, to_struct_value
+
     @classmethod
     def from_yml_rep(cls, yml_rep):
         if not isinstance(yml_rep, int):
@@ -112,6 +183,16 @@ class LittleEndianOneBasedIntegerTableEntry(LittleEndianIntegerTableEntry):
     def to_block(cls, block, offset, value):
         super(LittleEndianOneBasedIntegerTableEntry, cls).to_block(block, offset, value + 1)
 
+    @classmethod
+    def struct_read_codec(cls):
+        struct_format, from_struct_value = super(LittleEndianOneBasedIntegerTableEntry, cls).struct_read_codec()
+        return struct_format, _compose(from_struct_value, lambda x: x - 1)
+
+    @classmethod
+    def struct_write_codec(cls):
+        struct_format, to_struct_value = super(LittleEndianOneBasedIntegerTableEntry, cls).struct_write_codec()
+        return struct_format, _compose(lambda x: x + 1, to_struct_value)
+
     @classmethod
     def from_yml_rep(cls, yml_rep):
         if yml_rep is None:
@@ -176,6 +257,25 @@ class ByteListTableEntry(TableEntry):
     def to_block(cls, block, offset, value):
         block[offset:offset + cls.size] = value
 
+    @classmethod
+    def struct_read_codec(cls):
+        if cls.size == 0:
+            return None
+        return "{}s".format(cls.size), list
+
+    @classmethod
+    def struct_write_codec(cls):
+        if cls.size == 0:
+            return None
+
+        def to_struct_value(value):
+            if not isinstance(value, list) or len(value) != cls.size:
+                raise InvalidArgumentError("Could not pack value[{}] as a byte list of size[{}]".format(
+                    value, cls.size))
+            return bytes(value)
+
+        return "{}s".format(cls.size), to_struct_value
+
     @classmethod
     def from_yml_rep(cls, yml_rep):
         if not (isinstance(yml_rep, list) and all(isinstance(x, int) for x in yml_rep)):
@@ -212,10 +312,24 @@ class BitfieldTableEntry(TableEntry):
 
     @classmethod
     def to_block(cls, block, offset, value):
-        block_value = 0
+        block.write_multi(offset, cls._to_int(value), cls.size)
+
+    @classmethod
+    def _to_int(cls, value):
+        int_value = 0
         for i in value:
-            block_value |= (1 << i)
-        block.write_multi(offset, block_value, cls.size)
+            int_value |= (1 << i)
+        return int_value
+
+    @classmethod
+    def struct_read_codec(cls):
+        struct_format, from_struct_value, _ = _integer_struct_codec(cls.size)
+        return struct_format, _compose(from_struct_value, cls._from_int)
+
+    @classmethod
+    def struct_write_codec(cls):
+        struct_format, _, to_struct_value = _integer_struct_codec(cls.size)
+        return struct_format, _compose(cls._to_int, to_struct_value)
 
     @classmethod
     def from_yml_rep(cls, yml_rep):
@@ -262,7 +376,118 @@ class BitfieldTableEntry(TableEntry):
         return yml_rep
 
 
+class RowCodec(object):
+    """Reads and writes whole tables of rows at once, using a struct.Struct compiled from the rows' schema.
+    Columns which can't be unpacked with struct are skipped over by the struct and read and written with their own
+    from_block and to_block methods instead."""
+
+    def __init__(self, schema):
+        self.schema = schema
+        self.row_size = sum([x.size for x in schema])
+
+        # When reading, the struct contains every column, with the columns which can't be unpacked as padding
+        read_format = "<"
+        self.read_converters = []
+        self.read_block_columns = []
+        # When writing, each run of consecutive packable columns gets its own struct, so that the bytes belonging to
+        # the other columns are left untouched
+        write_runs = []
+        write_run = None
+        self.write_block_columns = []
+
+        column_offset = 0
+        for i, column in enumerate(schema):
+            read_codec = column.struct_read_codec()
+            if read_codec is None:
+                read_format += "{}x".format(column.size)
+                self.read_block_columns.append((i, column_offset, column))
+            else:
+                read_format += read_codec[0]
+                if read_codec[1] is not None:
+                    self.read_converters.append((i, read_codec[1]))
+
+            write_codec = column.struct_write_codec()
+            if write_codec is None:
+                self.write_block_columns.append((i, column_offset, column))
+                write_run = None
+            else:
+                if write_run is None:
+                    write_run = [column_offset, "<", []]
+                    write_runs.append(write_run)
+                write_run[1] += write_codec[0]
+                write_run[2].append((i, write_codec[1]))
+
+            column_offset += column.size
+
+        self.read_struct = struct.Struct(read_format)
+        self.write_runs = [(run_offset, struct.Struct(run_format), run_converters)
+                           for run_offset, run_format, run_converters in write_runs]
+
+    def __reduce__(self):
+        # struct.Struct can't be pickled, so compile the codec again when unpickling
+        return RowCodec, (self.schema,)
+
+    def read_rows(self, block, offset, num_rows):
+        """Returns num_rows rows read from the block starting at offset, or None if the rows couldn't be read all at
+        once, in which case they should be read one at a time to find out why."""
+        size = self.row_size * num_rows
+        if self.row_size == 0 or offset < 0 or offset + size > block.size:
+            return None
+
+        read_converters = self.read_converters
+        read_block_columns = self.read_block_columns
+        rows = []
+        try:
+            with memoryview(block.data) as data:
+                with data[offset:offset + size] as table_data:
+                    for row_offset, values in zip(range(offset, offset + size, self.row_size),
+                                                  self.read_struct.iter_unpack(table_data)):
+                        row = list(values)
+                        for i, column_offset, column in read_block_columns:
+                            row.insert(i, column.from_block(block, row_offset + column_offset))
+                        for i, from_struct_value in read_converters:
+                            row[i] = from_struct_value(row[i])
+                        rows.append(row)
+        except Exception:
+            return None
+        return rows
+
+    def write_rows(self, block, offset, rows):
+        """Writes rows to the block starting at offset, and returns whether they were written. If the rows couldn't be
+        packed then nothing is written and False is returned, in which case the rows should be written one at a time
+        to find out why."""
+        size = self.row_size * len(rows)
+        if size == 0 or offset < 0 or offset + size > block.size:
+            return False
+
+        if self.write_block_columns:
+            with memoryview(block.data) as data:
+                table_data = bytearray(data[offset:offset + size])
+        else:
+            table_data = bytearray(size)
+        try:
+            for row_offset, row in zip(range(0, size, self.row_size), rows):
+                for run_offset, run_struct, run_converters in self.write_runs:
+                    run_struct.pack_into(table_data, row_offset + run_offset,
+                                         *[row[i] if to_struct_value is None else to_struct_value(row[i])
+                                           for i, to_struct_value in run_converters])
+        except Exception:
+            return False
+        block[offset:offset + size] = table_data
+
+        for row_offset, row in zip(range(offset, offset + size, self.row_size), rows):
+            for i, column_offset, column in self.write_block_columns:
+                try:
+                    column.to_block(block, row_offset + column_offset, row[i])
+                except Exception as e:
+                    log.debug("Error while writing column[{}]".format(column.name))
+                    raise TableError(field=column.name, cause=e)
+        return True
+
+
 class RowTableEntry(TableEntry):
+    row_codec = None
+
     @classmethod
     def from_schema(cls, schema, name="CustomRowTableEntry", hidden_columns=set()):
         if type(hidden_columns) == list:
@@ -274,7 +499,8 @@ class RowTableEntry(TableEntry):
         return type(name, (cls,), {"name": name,
                                    "size": sum([x.size for x in schema]),
                                    "schema": schema,
-                                   "hidden_columns": hidden_columns})
+                                   "hidden_columns": hidden_columns,
+                                   "row_codec": RowCodec(schema)})
 
     @classmethod
     def from_schema_specification(cls, schema_specification, name="CustomRowTableEntry", hidden_columns=set()):
@@ -343,6 +569,18 @@ class RowTableEntry(TableEntry):
                 raise TableError(field=column.name, cause=e)
             offset += column.size
 
+    @classmethod
+    def from_block_rows(cls, block, offset, num_rows):
+        if cls.row_codec is None:
+            return None
+        return cls.row_codec.read_rows(block, offset, num_rows)
+
+    @classmethod
+    def to_block_rows(cls, block, offset, values):
+        if cls.row_codec is None:
+            return False
+        return cls.row_codec.write_rows(block, offset, values)
+
     @classmethod
     def yml_rep_hex_labels(cls):
         return [inner
@@ -413,6 +651,11 @@ class Table(object):
         self.values = [None for i in range(self.num_rows)]
 
     def from_block(self, block, offset):
+        values = self.schema.from_block_rows(block, offset, self.num_rows)
+        if values is not None:
+            self.values[:] = values
+            return
+
         for i in range(self.num_rows):
             try:
                 self.values[i] = self.schema.from_block(block, offset)
@@ -423,6 +666,9 @@ class Table(object):
 
     def to_block(self, block, offset):
         original_offset = offset
+        if self.schema.to_block_rows(block, offset, self.values):
+            return original_offset
+
         for i, row in enumerate(self.values):
             try:
                 self.schema.to_block(block, offset, row)
@@ -449,28 +695,29 @@ class Table(object):
             except TableSchemaError as e:
                 raise TableError(table_name=self.name, entry=i, field=e.field, cause=e)
 
+    def _row_to_yml_rep(self, i):
+        try:
+            return self.schema.to_yml_rep(self.values[i])
+        except TableSchemaError as e:
+            raise TableError(table_name=self.name, entry=i, field=e.field, cause=e)
+
+    def yml_rep_items(self):
+        """Yields the (key, value) items of this table's yml representation in order, one at a time."""
+        for i in range(len(self.values)):
+            yield i, self._row_to_yml_rep(i)
+
     def to_yml_rep(self):
-        yml_rep = {}
-        for i, row in enumerate(self.values):
-            try:
-                yml_rep[i] = self.schema.to_yml_rep(row)
-            except TableSchemaError as e:
-                raise TableError(table_name=self.name, entry=i, field=e.field, cause=e)
-        return yml_rep
+        return dict(self.yml_rep_items())
 
     def from_yml_file(self, f):
         yml_rep = yml_load(f)
         self.from_yml_rep(yml_rep)
 
     def to_yml_file(self, f, default_flow_style=False):
-        yml_str_rep = yml_dump(self.to_yml_rep(), default_flow_style=default_flow_style)
-
-        # Rewrite hexints in hexidecimal
-        # The YAML parser does not offer this option, so this has to be done with a regex
-        for hex_label in self.schema.yml_rep_hex_labels():
-            yml_str_rep = convert_values_to_hex_repr(yml_str_rep, hex_label)
-
-        f.write(yml_str_rep)
+        # Write the table one row at a time, with hexints written in hexadecimal as they are dumped
+        yml_dump_items(self.yml_rep_items(), f,
+                       hex_labels=self.schema.yml_rep_hex_labels(),
+                       default_flow_style=default_flow_style)
 
     def __getitem__(self, index):
         row = index
@@ -504,12 +751,9 @@ class MatrixTable(Table):
                 yml_rep_unmatrixed[y * self.matrix_width + x] = yml_rep[y][x]
         super(MatrixTable, self).from_yml_rep(yml_rep_unmatrixed)
 
-    def to_yml_rep(self):
-        yml_rep_unmatrixed = super(MatrixTable, self).to_yml_rep()
-        yml_rep = dict()
+    def yml_rep_items(self):
         for y in range(self.matrix_height):
             yml_rep_matrix_row = dict()
             for x in range(self.matrix_width):
-                yml_rep_matrix_row[x] = yml_rep_unmatrixed[y * self.matrix_width + x]
-            yml_rep[y] = yml_rep_matrix_row
-        return yml_rep
\ No newline at end of file
+                yml_rep_matrix_row[x] = self._row_to_yml_rep(y * self.matrix_width + x)
+            yield y, yml_rep_matrix_row
\ No newline at end of file
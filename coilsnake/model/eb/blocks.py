@@ -4,21 +4,63 @@ import os
 from coilsnake.exceptions.common.exceptions import CoilSnakeError
 from coilsnake.model.common.blocks import Block, Rom
 from coilsnake.model.common.ips import IpsPatch
-from coilsnake.modules.eb.EbModule import comp, decomp
+from coilsnake.modules.eb.EbModule import comp_many, decomp_bytes_with_size
 from coilsnake.exceptions.eb.exceptions import InvalidEbCompressedDataError
 from coilsnake.root import ASSET_PATH
+from coilsnake.util.common.profile import count, COUNTER_COMPRESSED_BYTES, COUNTER_COMPRESSION_CALLS, \
+    COUNTER_DECOMPRESSION_CALLS
+
+# The key under which decompressed data is cached in a Block's data cache, along with the offset of the compressed data
+_DECOMPRESSED_DATA_CACHE_KEY = "eb_decompressed_data"
 
 
 class EbCompressibleBlock(Block):
+    # A CompressionCache in which to look up compressed data before compressing it, if any
+    compression_cache = None
+
+    # The size of the compressed data which this block was last read from or compressed to, if any
+    compressed_size = None
+
     def from_compressed_block(self, block, offset=0):
-        self.data = decomp(block, offset)
-        if self.data[0] < 0:
+        """Reads and decompresses the compressed data at an offset in a block. The decompressed data is cached in the
+        block until the block is next written to, so reading the same compressed data again doesn't decompress it again.
+        Afterwards, compressed_size is the size of the compressed data which was read."""
+        data_cache = block.data_cache()
+        try:
+            data, compressed_size = data_cache[(_DECOMPRESSED_DATA_CACHE_KEY, offset)]
+        except KeyError:
+            data, compressed_size = decomp_bytes_with_size(block.data, offset)
+            count(COUNTER_DECOMPRESSION_CALLS)
+            data_cache[(_DECOMPRESSED_DATA_CACHE_KEY, offset)] = (data, compressed_size)
+
+        if not data:
             raise InvalidEbCompressedDataError("Couldn't decompress invalid data")
-        self.size = len(self.data)
+        self.from_bytes(data)
+        self.compressed_size = compressed_size
 
     def compress(self):
-        compressed_data = comp(self.to_list())
-        self.from_list(compressed_data)
+        self.compress_many([self])
+
+    @classmethod
+    def compress_many(cls, blocks):
+        """Compresses each of the blocks. Blocks which are not in the compression cache are compressed concurrently."""
+        cache = cls.compression_cache
+        if cache is None:
+            compressed_datas = [None] * len(blocks)
+        else:
+            compressed_datas = [cache.get(block.data) for block in blocks]
+
+        uncached_indexes = [i for i, compressed_data in enumerate(compressed_datas) if compressed_data is None]
+        count(COUNTER_COMPRESSION_CALLS, len(uncached_indexes))
+        count(COUNTER_COMPRESSED_BYTES, sum([blocks[i].size for i in uncached_indexes]))
+        for i, compressed_data in zip(uncached_indexes, comp_many([blocks[i].data for i in uncached_indexes])):
+            if cache is not None:
+                cache.put(blocks[i].data, compressed_data)
+            compressed_datas[i] = compressed_data
+
+        for block, compressed_data in zip(blocks, compressed_datas):
+            block.from_bytes(compressed_data)
+            block.compressed_size = block.size
 
 
 class EbRom(Rom):
@@ -54,8 +96,7 @@ class EbRom(Rom):
             self[0x00ffd7] = 0x0c
 
             # Truncate the data
-            self.size = 0x300000
-            self.data = self.data[:0x300000]
+            self._resize(0x300000)
 
         # Ensure the ROM isn't too small
         elif len(self) < 0x300000:
@@ -90,4 +131,4 @@ class EbRom(Rom):
         """Calculates the MD5 hash of this ROM's data.
         """
 
-        return hashlib.md5(self.data.tostring()).hexdigest()
\ No newline at end of file
+        return hashlib.md5(self.data).hexdigest()
\ No newline at end of file
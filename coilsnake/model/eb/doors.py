@@ -29,12 +29,8 @@ class DestinationDirection(GenericEnum):
     DOWN, UP, RIGHT, LEFT = range(4)
 
 
-def in_destination_bank(offset):
-    return (offset >> 16) == 0x0f
-
-
-def not_in_destination_bank(offset):
-    return not in_destination_bank(offset)
+# Door destinations must be written to this bank
+DESTINATION_BANK = 0x0f
 
 
 class GenericDoor(EqualityMixin, StringRepresentationMixin):
@@ -57,7 +53,7 @@ class GenericDoor(EqualityMixin, StringRepresentationMixin):
         if destination_hash in destination_locations:
             block.write_multi(offset + 3, destination_locations[destination_hash], 2)
         else:
-            destination_offset = block.allocate(data=destination_block, can_write_to=in_destination_bank)
+            destination_offset = block.allocate(data=destination_block, bank=DESTINATION_BANK)
             destination_locations[destination_hash] = destination_offset & 0xffff
             block.write_multi(offset + 3, destination_offset, 2)
 
@@ -1,25 +1,90 @@
 from array import array
-from copy import deepcopy
 
 from PIL import Image
 
-from coilsnake.exceptions.common.exceptions import InvalidArgumentError, OutOfBoundsError, InvalidUserDataError
+from coilsnake.exceptions.common.exceptions import InvalidArgumentError, InvalidUserDataError
 from coilsnake.model.eb.blocks import EbCompressibleBlock
 from coilsnake.model.eb.palettes import EbPalette, EbColor
 from coilsnake.util.common.type import EqualityMixin, StringRepresentationMixin
-from coilsnake.util.eb.graphics import read_2bpp_graphic_from_block, read_4bpp_graphic_from_block, \
-    read_8bpp_graphic_from_block, read_1bpp_graphic_from_block, write_2bpp_graphic_to_block, \
-    write_4bpp_graphic_to_block, write_8bpp_graphic_to_block, write_1bpp_graphic_to_block, hash_tile
+from coilsnake.util.eb.graphics import read_graphic_rows, write_graphic_rows, hash_tile
 
 
 _EB_GRAPHIC_TILESET_SUPPORTED_BPP_FORMATS = frozenset([1, 2, 4, 8])
 
 
+class _EbGraphicTileRow(object):
+    """A view of one row of pixels of a tile in an EbGraphicTileset, which behaves like a list of color indices.
+    Changes made to the row are made directly to the tileset."""
+
+    __slots__ = ["_data"]
+
+    def __init__(self, data):
+        self._data = data
+
+    def __len__(self):
+        return len(self._data)
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return self._data[key].tolist()
+        return self._data[key]
+
+    def __setitem__(self, key, value):
+        if isinstance(key, slice):
+            value = bytes(value)
+        self._data[key] = value
+
+    def reverse(self):
+        self._data[:] = bytes(self._data[::-1])
+
+    def __eq__(self, other):
+        try:
+            return self._data.tolist() == list(other)
+        except TypeError:
+            return False
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    __hash__ = None
+
+    def __repr__(self):
+        return repr(self._data.tolist())
+
+
+class _EbGraphicTileList(object):
+    """A view of the tiles in an EbGraphicTileset, which behaves like a list of tiles."""
+
+    __slots__ = ["_tileset"]
+
+    def __init__(self, tileset):
+        self._tileset = tileset
+
+    def __len__(self):
+        return self._tileset._num_tiles
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self._tileset[i]
+
+    def __getitem__(self, key):
+        return self._tileset[key]
+
+    def __setitem__(self, key, tile):
+        self._tileset.set_tile_data(self._tileset._tile_index(key), self._tileset._tile_to_bytes(tile))
+
+
 class EbGraphicTileset(EqualityMixin):
     """A class representing a set of graphical tiles which adhere to the common EarthBound format.
     A graphic tileset is an ordered collection of graphical tiles. A graphical tile can be thought of as a
     two-dimensional array of numerical values. These numerical values each represent a color as an index in a palette.
-    Palettes themselves are stored separately from graphical tilesets."""
+    Palettes themselves are stored separately from graphical tilesets.
+
+    The pixels of all tiles are stored contiguously in a single bytearray, one byte per pixel, tile after tile and
+    row after row. The tiles attribute and indexing into the tileset return views of this buffer."""
 
     def __init__(self, num_tiles, tile_width=8, tile_height=8):
         """Creates a new EbGraphicTileset.
@@ -43,10 +108,27 @@ class EbGraphicTileset(EqualityMixin):
                 tile_height))
         self.tile_height = tile_height
 
-        self.tiles = []
+        self._tile_size = tile_width * tile_height
+        self._data = bytearray(self._tile_size * num_tiles)
+        # The number of tiles currently in the tileset, which is what len(self.tiles) returns. Every byte of _data
+        # past the last of these tiles is kept zeroed so that tilesets can be compared by their buffers.
+        self._num_tiles = 0
         self._num_tiles_used = 0
         self._used_tiles = dict()
 
+    @property
+    def tiles(self):
+        return _EbGraphicTileList(self)
+
+    @tiles.setter
+    def tiles(self, tiles):
+        if len(tiles) > self.num_tiles_maximum:
+            raise InvalidArgumentError("Couldn't set {} tiles in EbGraphicTileset of {} tiles".format(
+                len(tiles), self.num_tiles_maximum))
+        data = b"".join([self._tile_to_bytes(tile) for tile in tiles])
+        self._data[:] = data + bytes(len(self._data) - len(data))
+        self._num_tiles = len(tiles)
+
     def from_block(self, block, offset=0, bpp=2):
         """Reads in a tileset from the specified offset in the block.
         :param bpp: The number of bits used to represent each pixel by the block representation."""
@@ -56,25 +138,31 @@ class EbGraphicTileset(EqualityMixin):
             raise NotImplementedError(("Don't know how to read graphical tile data of width[{}], height[{}], "
                                       "and bpp[{}]").format(self.tile_width, self.tile_height, bpp))
 
-        self._num_tiles_used = 0
         self._used_tiles = dict()
-        self.tiles = [[[0 for x in range(self.tile_width)] for y in range(self.tile_height)]
-                      for n in range(self.num_tiles_maximum)]
-        for tile in self.tiles:
-            try:
-                if bpp == 2:
-                    offset += read_2bpp_graphic_from_block(source=block, target=tile, offset=offset)
-                elif bpp == 4:
-                    offset += read_4bpp_graphic_from_block(source=block, target=tile, offset=offset)
-                elif bpp == 8:
-                    offset += read_8bpp_graphic_from_block(source=block, target=tile, offset=offset)
-                else:  # bpp == 1
-                    for x in range(0, self.tile_width, 8):
-                        offset += read_1bpp_graphic_from_block(source=block, target=tile, offset=offset,
-                                                               x=x, height=self.tile_height)
-                self._num_tiles_used += 1
-            except OutOfBoundsError:
-                break  # Stop if we begin to read past the end of the block
+
+        tile_size = self._tile_block_size(bpp)
+        size = max(0, min(block.size - offset, tile_size * self.num_tiles_maximum))
+        self._num_tiles_used = size // tile_size
+        # If the block ends partway through a tile, read the rest of that tile as if it were zeroes
+        num_tiles_read = (size + tile_size - 1) // tile_size
+        data = bytes(block[offset:offset + size].data) if size > 0 else b""
+        rows = read_graphic_rows(data + bytes(num_tiles_read * tile_size - size), bpp)
+
+        if bpp == 1:
+            # Each tile is stored as a series of 8-pixel wide columns
+            num_columns = self.tile_width // 8
+            data = b"".join([row
+                             for tile_offset in range(0, len(rows), num_columns * self.tile_height)
+                             for y in range(self.tile_height)
+                             for row in rows[tile_offset + y:tile_offset + num_columns * self.tile_height:
+                                             self.tile_height]])
+        elif self.tile_width == 8:
+            data = b"".join(rows)
+        else:
+            padding = bytes(self.tile_width - 8)
+            data = b"".join([row + padding for row in rows])
+        self._data[:] = data + bytes(len(self._data) - len(data))
+        self._num_tiles = self.num_tiles_maximum
 
     def to_block(self, block, offset=0, bpp=2):
         """Writes this tileset to the specified offset in the block.
@@ -85,17 +173,25 @@ class EbGraphicTileset(EqualityMixin):
             raise NotImplementedError("Don't know how to write image data of width[{}], height[{}], and bpp[{}]"
                                       .format(self.tile_width, self.tile_height, bpp))
 
-        for tile in self.tiles:
-            if bpp == 2:
-                offset += write_2bpp_graphic_to_block(source=tile, target=block, offset=offset)
-            elif bpp == 4:
-                offset += write_4bpp_graphic_to_block(source=tile, target=block, offset=offset)
-            elif bpp == 8:
-                offset += write_8bpp_graphic_to_block(source=tile, target=block, offset=offset)
-            else:  # bpp == 1
-                for x in range(0, self.tile_width, 8):
-                    offset += write_1bpp_graphic_to_block(source=tile, target=block, offset=offset,
-                                                          x=x, height=self.tile_height)
+        tiles_data = self._data
+        end = self._num_tiles * self._tile_size
+        if bpp == 1:
+            rows = [tiles_data[row_offset + x:row_offset + x + 8]
+                    for tile_offset in range(0, end, self._tile_size)
+                    for x in range(0, self.tile_width, 8)
+                    for row_offset in range(tile_offset, tile_offset + self._tile_size, self.tile_width)]
+        else:
+            rows = [tiles_data[row_offset:row_offset + 8] for row_offset in range(0, end, self.tile_width)]
+        data = write_graphic_rows(rows, bpp)
+        if data:
+            block[offset:offset + len(data)] = data
+
+    def _tile_block_size(self, bpp):
+        if bpp == 1:
+            return self.tile_height * (self.tile_width // 8)
+        else:
+            # Only the leftmost 8 pixels of each tile are stored for formats other than 1bpp
+            return 8 * bpp
 
     def block_size(self, bpp=2):
         """Returns the size required to represent this tileset in a block.
@@ -112,20 +208,18 @@ class EbGraphicTileset(EqualityMixin):
         :param palette: the known arrangement which describes how the image is rendered"""
         image_data = image.load()
         already_read_tiles = set()
-        self.tiles = [[[0 for x in range(self.tile_width)] for y in range(self.tile_height)]
-                      for n in range(self.num_tiles_maximum)]
+        self._data[:] = bytes(len(self._data))
+        self._num_tiles = self.num_tiles_maximum
         for y in range(arrangement.height):
             for x in range(arrangement.width):
-                arrangement_item = arrangement[x, y]
-                if arrangement_item.tile not in already_read_tiles:
-                    tile = self.tiles[arrangement_item.tile]
+                tile_id = arrangement[x, y].tile
+                if tile_id not in already_read_tiles:
                     image_x = x * self.tile_width
                     image_y = y * self.tile_height
-                    for tile_y, tile_row in enumerate(tile):
-                        for tile_x in range(self.tile_width):
-                            tile_row[tile_x] = image_data[image_x + tile_x, image_y] % palette.subpalette_length
-                        image_y += 1
-                    already_read_tiles.add(arrangement_item.tile)
+                    self.set_tile_data(tile_id, bytes([
+                        image_data[image_x + tile_x, image_y + tile_y] % palette.subpalette_length
+                        for tile_y in range(self.tile_height) for tile_x in range(self.tile_width)]))
+                    already_read_tiles.add(tile_id)
 
     def add_tile(self, tile, no_flip=False):
         """Adds a tile into this tileset if the tileset does not already contain it.
@@ -147,10 +241,11 @@ class EbGraphicTileset(EqualityMixin):
             # Error, not enough room for a new tile
             return 0, False, False
 
-        tile_copy = deepcopy(tile)
+        tile_data = self._tile_to_bytes(tile)
         tile_id = self._num_tiles_used
-        self.tiles.append(tile_copy)
+        self._data[tile_id * self._tile_size:(tile_id + 1) * self._tile_size] = tile_data
         self._num_tiles_used += 1
+        self._num_tiles = max(self._num_tiles, self._num_tiles_used)
 
         if no_flip:
             self._used_tiles[tile_hash] = tile_id, False, False
@@ -159,73 +254,163 @@ class EbGraphicTileset(EqualityMixin):
         # The tile will be stored as horizontally flipped
         self._used_tiles[tile_hash] = tile_id, False, True
 
-        tile_copy.reverse()
+        rows = [tile_data[i:i + self.tile_width] for i in range(0, self._tile_size, self.tile_width)]
         # Verically flipped tile
-        self._used_tiles[hash_tile(tile_copy)] = tile_id, True, True
-
-        for row in tile_copy:
-            row.reverse()
+        self._used_tiles[hash_tile(rows[::-1])] = tile_id, True, True
         # Vertically and horizontally flipped tile
-        self._used_tiles[hash_tile(tile_copy)] = tile_id, True, False
-
-        tile_copy.reverse()
-        # Horizontally flipped tile
-        self._used_tiles[hash_tile(tile_copy)] = tile_id, False, False
+        self._used_tiles[hash_tile([row[::-1] for row in rows[::-1]])] = tile_id, True, False
+        # Horizontally flipped tile, which is the one that is actually stored
+        flipped_rows = [row[::-1] for row in rows]
+        self._used_tiles[hash_tile(flipped_rows)] = tile_id, False, False
+        self.set_tile_data(tile_id, b"".join(flipped_rows))
 
         return tile_id, False, True
 
     def clear_tile(self, tile_id, color=0):
-        tile = [[color for x in range(self.tile_width)] for y in range(self.tile_height)]
-        self.tiles[tile_id] = tile
+        self.set_tile_data(self._tile_index(tile_id), bytes([color]) * self._tile_size)
+
+    def get_tile_data(self, tile_id):
+        """Returns the pixels of a tile as a bytes object, row after row."""
+        offset = self._tile_index(tile_id) * self._tile_size
+        return bytes(self._data[offset:offset + self._tile_size])
+
+    def set_tile_data(self, tile_id, data):
+        """Sets the pixels of a tile from a bytes-like object, row after row."""
+        if len(data) != self._tile_size:
+            raise InvalidArgumentError("Couldn't set tile of {} pixels in EbGraphicTileset of {}x{} tiles".format(
+                len(data), self.tile_width, self.tile_height))
+        if tile_id < 0 or tile_id >= self.num_tiles_maximum:
+            raise InvalidArgumentError("Couldn't set tile[{}] in EbGraphicTileset of {} tiles".format(
+                tile_id, self.num_tiles_maximum))
+        offset = tile_id * self._tile_size
+        self._data[offset:offset + self._tile_size] = data
+
+    def _tile_index(self, key):
+        # Raises an IndexError for tiles which are out of range, just as indexing into a list would
+        return range(self._num_tiles)[key]
+
+    def _tile_to_bytes(self, tile):
+        if tile is None:
+            return bytes(self._tile_size)
+        data = b"".join([bytes(row) for row in tile])
+        if len(data) != self._tile_size:
+            raise InvalidArgumentError("Couldn't set tile of {} pixels in EbGraphicTileset of {}x{} tiles".format(
+                len(data), self.tile_width, self.tile_height))
+        return data
 
     def __eq__(self, other):
         return (isinstance(other, self.__class__)
                 and (self.num_tiles_maximum == other.num_tiles_maximum)
                 and (self.tile_width == other.tile_width)
                 and (self.tile_height == other.tile_height)
-                and (self.tiles == other.tiles))
+                and (self._num_tiles == other._num_tiles)
+                and (self._data == other._data))
 
     def __getitem__(self, key):
-        return self.tiles[key]
+        offset = self._tile_index(key) * self._tile_size
+        data = memoryview(self._data)
+        return [_EbGraphicTileRow(data[row_offset:row_offset + self.tile_width])
+                for row_offset in range(offset, offset + self._tile_size, self.tile_width)]
 
 
 class EbTileArrangementItem(EqualityMixin, StringRepresentationMixin):
+    """A single tile in an arrangement. An item is a view of one 16-bit word, which is either its own or one of the
+    words of an EbTileArrangement."""
+
     def __init__(self, tile=0, subpalette=0, is_vertically_flipped=False, is_horizontally_flipped=False,
                  is_priority=False):
+        self._words = array('H', [0])
+        self._index = 0
         self.tile = tile
         self.subpalette = subpalette
         self.is_vertically_flipped = is_vertically_flipped
         self.is_horizontally_flipped = is_horizontally_flipped
         self.is_priority = is_priority
-        self.check_validity()
 
-    def check_validity(self):
-        if self.tile < 0 or self.tile > 0x3ff:
-            raise InvalidArgumentError("Invalid tile[{}]".format(self.tile))
-        if self.subpalette < 0 or self.subpalette > 7:
-            raise InvalidArgumentError("Invalid subpalette[{}]".format(self.subpalette))
+    @classmethod
+    def _view(cls, words, index):
+        item = cls.__new__(cls)
+        item._words = words
+        item._index = index
+        return item
+
+    @property
+    def tile(self):
+        return self._words[self._index] & 0x3ff
+
+    @tile.setter
+    def tile(self, tile):
+        if tile < 0 or tile > 0x3ff:
+            raise InvalidArgumentError("Invalid tile[{}]".format(tile))
+        self._words[self._index] = (self._words[self._index] & 0xfc00) | tile
+
+    @property
+    def subpalette(self):
+        return (self._words[self._index] & 0x1c00) >> 10
+
+    @subpalette.setter
+    def subpalette(self, subpalette):
+        if subpalette < 0 or subpalette > 7:
+            raise InvalidArgumentError("Invalid subpalette[{}]".format(subpalette))
+        self._words[self._index] = (self._words[self._index] & 0xe3ff) | (subpalette << 10)
+
+    @property
+    def is_vertically_flipped(self):
+        return (self._words[self._index] & 0x8000) != 0
+
+    @is_vertically_flipped.setter
+    def is_vertically_flipped(self, value):
+        self._set_flag(0x8000, value)
+
+    @property
+    def is_horizontally_flipped(self):
+        return (self._words[self._index] & 0x4000) != 0
+
+    @is_horizontally_flipped.setter
+    def is_horizontally_flipped(self, value):
+        self._set_flag(0x4000, value)
+
+    @property
+    def is_priority(self):
+        return (self._words[self._index] & 0x2000) != 0
+
+    @is_priority.setter
+    def is_priority(self, value):
+        self._set_flag(0x2000, value)
+
+    def _set_flag(self, mask, value):
+        if value:
+            self._words[self._index] |= mask
+        else:
+            self._words[self._index] &= ~mask & 0xffff
 
     def from_block(self, block, offset=0):
-        data = block.read_multi(offset, 2)
-        self.is_vertically_flipped = (data & 0x8000) != 0
-        self.is_horizontally_flipped = (data & 0x4000) != 0
-        self.is_priority = (data & 0x2000) != 0
-        self.subpalette = (data & 0x1c00) >> 10
-        self.tile = data & 0x3ff
+        self.from_int(block.read_multi(offset, 2))
 
     def to_block(self, block, offset=0):
-        self.check_validity()
-        block.write_multi(offset,
-                          ((self.is_vertically_flipped << 15)
-                           | (self.is_horizontally_flipped << 14)
-                           | (self.is_priority << 13)
-                           | (self.subpalette << 10)
-                           | self.tile),
-                          2)
+        block.write_multi(offset, self.to_int(), 2)
+
+    def from_int(self, data):
+        self._words[self._index] = data & 0xffff
+
+    def to_int(self):
+        return self._words[self._index]
+
+    def __eq__(self, other):
+        return isinstance(other, self.__class__) and self.to_int() == other.to_int()
+
+    def __repr__(self):
+        return "<{}(tile={}, subpalette={}, is_vertically_flipped={}, is_horizontally_flipped={}, is_priority={})>"\
+            .format(self.__class__.__name__, self.tile, self.subpalette, self.is_vertically_flipped,
+                    self.is_horizontally_flipped, self.is_priority)
+
+    __str__ = __repr__
 
 
 class EbTileArrangement(EqualityMixin):
-    """A class representing an image formed by an arrangement of tile-based graphics with a certain palette."""
+    """A class representing an image formed by an arrangement of tile-based graphics with a certain palette.
+    The arrangement is stored as a packed array of 16-bit words in the same format as the block representation, row
+    after row. Indexing into the arrangement returns an EbTileArrangementItem which is a view of one of the words."""
 
     def __init__(self, width, height):
         """Creates a new EbTileArrangement.
@@ -237,45 +422,60 @@ class EbTileArrangement(EqualityMixin):
         if height <= 0:
             raise InvalidArgumentError("Couldn't create EbTileArrangement with invalid height[{}]".format(height))
         self.height = height
-        self.arrangement = [[EbTileArrangementItem() for x in range(self.width)] for y in range(self.height)]
+        self._words = array('H', [0]) * (width * height)
+
+    @property
+    def arrangement(self):
+        return [[EbTileArrangementItem._view(self._words, i) for i in range(offset, offset + self.width)]
+                for offset in range(0, self.width * self.height, self.width)]
 
     def from_block(self, block, offset=0):
-        for row in self.arrangement:
-            for item in row:
-                item.from_block(block, offset)
-                offset += 2
+        self._words[:] = array('H', block.read_multi_list(offset, 2, self.width * self.height))
 
     def to_block(self, block, offset=0):
-        for row in self.arrangement:
-            for item in row:
-                item.to_block(block, offset)
-                offset += 2
+        block.write_multi_list(offset, self._words, 2)
 
     def block_size(self):
-        return 2 * sum([len(x) for x in self.arrangement])
+        return 2 * len(self._words)
 
     def to_image(self, image, tileset, palette, ignore_subpalettes=False):
         palette.to_image(image)
-        image_data = image.load()
-        offset_y = 0
-        for row in self.arrangement:
-            offset_x = 0
-            for item in row:
-                tile = tileset[item.tile]
-                if ignore_subpalettes:
-                    palette_offset = 0
-                else:
-                    palette_offset = item.subpalette*palette.subpalette_length
-                for tile_y in range(tileset.tile_height):
-                    for tile_x in range(tileset.tile_width):
-                        pixel_x, pixel_y = tile_x, tile_y
-                        if item.is_vertically_flipped:
-                            pixel_y = tileset.tile_height - pixel_y - 1
-                        if item.is_horizontally_flipped:
-                            pixel_x = tileset.tile_width - pixel_x - 1
-                        image_data[offset_x + tile_x, offset_y + tile_y] = tile[pixel_y][pixel_x] + palette_offset
-                offset_x += tileset.tile_width
-            offset_y += tileset.tile_height
+        tile_width, tile_height = tileset.tile_width, tileset.tile_height
+
+        # Render each distinct arrangement word once, as a list of rows of pixels with the flips and the subpalette's
+        # offset already applied
+        rendered_tiles = dict()
+        offset_tables = dict()
+        if ignore_subpalettes:
+            word_mask = 0xc3ff
+        else:
+            word_mask = 0xdfff
+        for word in set(self._words):
+            word &= word_mask
+            if word in rendered_tiles:
+                continue
+            tile = tileset.get_tile_data(word & 0x3ff)
+            rows = [tile[i:i + tile_width] for i in range(0, len(tile), tile_width)]
+            if word & 0x8000:
+                rows.reverse()
+            if word & 0x4000:
+                rows = [row[::-1] for row in rows]
+            palette_offset = ((word & 0x1c00) >> 10) * palette.subpalette_length
+            if palette_offset:
+                try:
+                    table = offset_tables[palette_offset]
+                except KeyError:
+                    table = offset_tables[palette_offset] = bytes([(i + palette_offset) & 0xff for i in range(256)])
+                rows = [row.translate(table) for row in rows]
+            rendered_tiles[word] = rows
+
+        data = bytearray()
+        for offset in range(0, self.width * self.height, self.width):
+            row_tiles = [rendered_tiles[word & word_mask] for word in self._words[offset:offset + self.width]]
+            for tile_y in range(tile_height):
+                data += b"".join([rows[tile_y] for rows in row_tiles])
+
+        image.paste(Image.frombytes("P", (self.width * tile_width, self.height * tile_height), bytes(data)), (0, 0))
 
     def image(self, tileset, palette, ignore_subpalettes=False):
         image = Image.new("P", (self.width * tileset.tile_width,
@@ -326,12 +526,8 @@ class EbTileArrangement(EqualityMixin):
                                                                         subpalette_id)
 
                     tile_id, vflip, hflip = tileset.add_tile(tile, no_flip)
-                    arrangement_item = self.arrangement[arrangement_y][arrangement_x]
-                    arrangement_item.tile = tile_id
-                    arrangement_item.subpalette = subpalette_id
-                    arrangement_item.is_vertically_flipped = vflip
-                    arrangement_item.is_horizontally_flipped = hflip
-                    arrangement_item.is_priority = False
+                    self._words[arrangement_y * self.width + arrangement_x] = \
+                        (vflip << 15) | (hflip << 14) | (subpalette_id << 10) | tile_id
 
     def _from_image_with_single_subpalette(self, image, tileset, palette, no_flip=False):
         # Don't need to do any subpalette fitting because there's only one subpalette
@@ -352,19 +548,21 @@ class EbTileArrangement(EqualityMixin):
                         tile_row[tile_x] = image_data[image_x + tile_x, image_tile_y]
 
                 tile_id, vflip, hflip = tileset.add_tile(tile, no_flip)
-                arrangement_item = self.arrangement[arrangement_y][arrangement_x]
-                arrangement_item.tile = tile_id
-                arrangement_item.subpalette = 0
-                arrangement_item.is_vertically_flipped = vflip
-                arrangement_item.is_horizontally_flipped = hflip
-                arrangement_item.is_priority = False
+                self._words[arrangement_y * self.width + arrangement_x] = \
+                    (vflip << 15) | (hflip << 14) | tile_id
 
     def __getitem__(self, key):
         x, y = key
         if x < 0 or y < 0 or x >= self.width or y >= self.height:
             raise InvalidArgumentError("Couldn't get arrangement item[{},{}] from arrangement of size[{}x{}]".format(
                 x, y, self.width, self.height))
-        return self.arrangement[y][x]
+        return EbTileArrangementItem._view(self._words, y * self.width + x)
+
+    def __eq__(self, other):
+        return (isinstance(other, self.__class__)
+                and (self.width == other.width)
+                and (self.height == other.height)
+                and (self._words == other._words))
 
 
 class EbCompressedGraphic(object):
@@ -400,27 +598,33 @@ class EbCompressedGraphic(object):
                 self.palettes[i].from_block(block=block, offset=palette_offset)
 
     def to_block(self, block):
-        with EbCompressibleBlock(self.graphics.block_size(bpp=self.bpp)) as compressed_block:
-            self.graphics.to_block(block=compressed_block, offset=0, bpp=self.bpp)
-            compressed_block.compress()
-            graphics_offset = block.allocate(data=compressed_block)
+        graphics_block = EbCompressibleBlock(self.graphics.block_size(bpp=self.bpp))
+        self.graphics.to_block(block=graphics_block, offset=0, bpp=self.bpp)
+        compressible_blocks = [graphics_block]
 
         if self.arrangement:
-            with EbCompressibleBlock(self.arrangement.block_size()) as compressed_block:
-                self.arrangement.to_block(block=compressed_block, offset=0)
-                compressed_block.compress()
-                arrangement_offset = block.allocate(data=compressed_block)
+            arrangement_block = EbCompressibleBlock(self.arrangement.block_size())
+            self.arrangement.to_block(block=arrangement_block, offset=0)
+            compressible_blocks.append(arrangement_block)
         else:
-            arrangement_offset = None
+            arrangement_block = None
 
-        palette_offsets = []
-        for i, palette in enumerate(self.palettes):
-            with EbCompressibleBlock(palette.block_size()) as compressed_block:
-                palette.to_block(block=compressed_block, offset=0)
-                if self.compressed_palettes:
-                    compressed_block.compress()
-                palette_offset = block.allocate(data=compressed_block)
-                palette_offsets.append(palette_offset)
+        palette_blocks = []
+        for palette in self.palettes:
+            palette_block = EbCompressibleBlock(palette.block_size())
+            palette.to_block(block=palette_block, offset=0)
+            palette_blocks.append(palette_block)
+        if self.compressed_palettes:
+            compressible_blocks += palette_blocks
+
+        EbCompressibleBlock.compress_many(compressible_blocks)
+
+        graphics_offset = block.allocate(data=graphics_block)
+        if arrangement_block:
+            arrangement_offset = block.allocate(data=arrangement_block)
+        else:
+            arrangement_offset = None
+        palette_offsets = [block.allocate(data=palette_block) for palette_block in palette_blocks]
 
         return graphics_offset, arrangement_offset, palette_offsets
 
@@ -533,17 +737,22 @@ class EbTownMap(EbCompressedGraphic):
                                      bpp=self.bpp)
 
     def to_block(self, rom):
-        # Arrangement space is 2048 bytes long since it's 32x32x2 in VRAM
-        with EbCompressibleBlock(size=self.palettes[0].block_size() + 2048 + self.graphics.block_size(bpp=self.bpp)) \
-                as compressed_block:
-            self.palettes[0].to_block(block=compressed_block, offset=0)
-            self.arrangement.to_block(block=compressed_block, offset=self.palettes[0].block_size())
-            self.graphics.to_block(block=compressed_block,
-                                   offset=self.palettes[0].block_size() + 2048,
-                                   bpp=self.bpp)
+        with self.to_uncompressed_block() as compressed_block:
             compressed_block.compress()
             return rom.allocate(data=compressed_block)
 
+    def to_uncompressed_block(self):
+        """Returns an EbCompressibleBlock containing this town map, which has not yet been compressed."""
+        # Arrangement space is 2048 bytes long since it's 32x32x2 in VRAM
+        compressed_block = EbCompressibleBlock(
+            size=self.palettes[0].block_size() + 2048 + self.graphics.block_size(bpp=self.bpp))
+        self.palettes[0].to_block(block=compressed_block, offset=0)
+        self.arrangement.to_block(block=compressed_block, offset=self.palettes[0].block_size())
+        self.graphics.to_block(block=compressed_block,
+                               offset=self.palettes[0].block_size() + 2048,
+                               bpp=self.bpp)
+        return compressed_block
+
     def from_images(self, images, arrangement=None):
         # The game has problems if you try to use color 0 of subpal 1 directly after using color 0 of subpal 0
         self.palettes[0][1, 0].r = 0
@@ -1,8 +1,5 @@
-from functools import partial
-
 from coilsnake.model.common.table import RowTableEntry, LittleEndianIntegerTableEntry
 from coilsnake.model.eb.table import EbPointerTableEntry, EbEventFlagTableEntry
-from coilsnake.util.eb.helper import is_in_bank
 
 
 MapEventSubTableEntry = RowTableEntry.from_schema(
@@ -46,7 +43,7 @@ class MapEventPointerTableEntry(EbPointerTableEntry):
             data_size += 2
             data_size += MapEventSubTableEntry.size * len(sub_entries)
         pointer = block.allocate(size=data_size,
-                                 can_write_to=partial(is_in_bank, cls.bank))
+                                 bank=cls.bank)
         super(MapEventPointerTableEntry, cls).to_block(block, offset, pointer & 0xffff)
 
         for flag, sub_entries in value:
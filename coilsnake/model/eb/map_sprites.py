@@ -1,8 +1,5 @@
-from functools import partial
-
 from coilsnake.model.common.table import LittleEndianIntegerTableEntry, RowTableEntry
 from coilsnake.model.eb.table import EbPointerTableEntry
-from coilsnake.util.eb.helper import is_in_bank
 
 
 SpritePlacementTableEntry = RowTableEntry.from_schema(
@@ -38,7 +35,7 @@ class SpritePlacementPointerTableEntry(EbPointerTableEntry):
             super(SpritePlacementPointerTableEntry, cls).to_block(block, offset, 0)
         else:
             pointer = block.allocate(size=(2 + 4 * len(value)),
-                                     can_write_to=partial(is_in_bank, 0x0f))
+                                     bank=0x0f)
             super(SpritePlacementPointerTableEntry, cls).to_block(block, offset, pointer & 0xffff)
 
             block.write_multi(pointer, len(value), 2)
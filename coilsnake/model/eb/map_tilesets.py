@@ -1,11 +1,8 @@
-from functools import partial
-
 from coilsnake.model.common.table import LittleEndianIntegerTableEntry
 from coilsnake.model.eb.blocks import EbCompressibleBlock
 from coilsnake.model.eb.graphics import EbGraphicTileset
 from coilsnake.model.eb.palettes import EbPalette
 from coilsnake.model.eb.table import EbEventFlagTableEntry
-from coilsnake.util.eb.helper import is_in_bank
 
 
 CHARACTERS = "0123456789abcdefghijklmnopqrstuv"
@@ -56,7 +53,7 @@ class EbMapPalette(EbPalette):
         if self.flag_palette is not None:
             self.flag_palette_pointer = block.allocate(
                 size=self.flag_palette.block_size(),
-                can_write_to=partial(is_in_bank, 0x1a))
+                bank=0x1a)
             self.flag_palette.to_block(block, self.flag_palette_pointer)
 
     def settings_yml_rep(self, include_colors=False):
@@ -104,14 +101,10 @@ class EbTileset(object):
             compressed_block.from_compressed_block(block=block, offset=offset)
             num_arrangements = len(compressed_block) // 32
 
-            j = 0
+            data = compressed_block.read_multi_list(key=0, size=2, count=num_arrangements * 16)
             for i in range(num_arrangements):
-                arrangement = [[0 for x in range(4)] for y in range(4)]
-                for y in range(4):
-                    for x in range(4):
-                        arrangement[y][x] = compressed_block.read_multi(key=j, size=2)
-                        j += 2
-                self.arrangements[i] = arrangement
+                j = i * 16
+                self.arrangements[i] = [data[j:j + 4], data[j + 4:j + 8], data[j + 8:j + 12], data[j + 12:j + 16]]
 
     def collisions_from_block(self, block, offset):
         for i, arrangement in enumerate(self.arrangements):
@@ -120,22 +113,30 @@ class EbTileset(object):
                 self.collisions[i] = block[collision_offset:collision_offset + 16]
 
     def minitiles_to_block(self, block):
-        with EbCompressibleBlock(self.minitiles.block_size(bpp=4)) as compressed_block:
-            self.minitiles.to_block(block=compressed_block, offset=0, bpp=4)
+        with self.minitiles_to_uncompressed_block() as compressed_block:
             compressed_block.compress()
             return block.allocate(data=compressed_block)
 
+    def minitiles_to_uncompressed_block(self):
+        """Returns an EbCompressibleBlock containing the minitiles, which has not yet been compressed."""
+        compressed_block = EbCompressibleBlock(self.minitiles.block_size(bpp=4))
+        self.minitiles.to_block(block=compressed_block, offset=0, bpp=4)
+        return compressed_block
+
     def arrangements_to_block(self, block):
-        with EbCompressibleBlock(1024 * 16 * 2) as compressed_block:
-            i = 0
-            for arrangement in self.arrangements:
-                for y in range(4):
-                    for x in range(4):
-                        compressed_block.write_multi(key=i, item=arrangement[y][x], size=2)
-                        i += 2
+        with self.arrangements_to_uncompressed_block() as compressed_block:
             compressed_block.compress()
             return block.allocate(data=compressed_block)
 
+    def arrangements_to_uncompressed_block(self):
+        """Returns an EbCompressibleBlock containing the arrangements, which has not yet been compressed."""
+        compressed_block = EbCompressibleBlock(1024 * 16 * 2)
+        compressed_block.write_multi_list(key=0,
+                                          items=[item for arrangement in self.arrangements
+                                                 for row in arrangement for item in row],
+                                          size=2)
+        return compressed_block
+
     def add_palette(self, map_tileset, map_palette, palette):
         self.palettes.append((map_tileset, map_palette, palette))
 
@@ -152,22 +153,11 @@ class EbTileset(object):
         if n >= 896:
             return "0000000000000000000000000000000000000000000000000000000000000000"
         else:
-            s = str()
-            tile = self.minitiles[n]
-            for y in range(8):
-                for x in range(8):
-                    s += CHARACTERS[tile[y][x]]
-            return s
+            return "".join([CHARACTERS[x] for x in self.minitiles.get_tile_data(n)])
 
     def minitile_from_string(self, n, string_rep):
         if n < 896:
-            minitile = [[0] * self.minitiles.tile_width for x in range(self.minitiles.tile_height)]
-            i = 0
-            for y in range(8):
-                for x in range(8):
-                    minitile[y][x] = int(string_rep[i], 32)
-                    i += 1
-            self.minitiles.tiles[n] = minitile
+            self.minitiles.set_tile_data(n, bytes([int(x, 32) for x in string_rep[:64]]))
 
     def arrangement_collision_string_rep(self, n):
         arrangement = self.arrangements[n]
@@ -37,18 +37,22 @@ class EbColor(EqualityMixin, StringRepresentationMixin):
         return hash(self.tuple())
 
     def from_block(self, block, offset=0):
+        self.from_int(block.read_multi(offset, 2))
+
+    def to_block(self, block, offset=0):
+        block.write_multi(offset, self.to_int(), 2)
+
+    def from_int(self, bgr):
         self.used = True
-        bgr = block.read_multi(offset, 2) & 0x7FFF
+        bgr &= 0x7FFF
         self.r = (bgr & 0x001f) * 8
         self.g = ((bgr & 0x03e0) >> 5) * 8
         self.b = (bgr >> 10) * 8
 
-    def to_block(self, block, offset=0):
-        block.write_multi(offset,
-                          ((self.r >> 3) & 0x1f)
-                          | (((self.g >> 3) & 0x1f) << 5)
-                          | (((self.b >> 3) & 0x1f) << 10),
-                          2)
+    def to_int(self):
+        return (((self.r >> 3) & 0x1f)
+                | (((self.g >> 3) & 0x1f) << 5)
+                | (((self.b >> 3) & 0x1f) << 10))
 
     def from_tuple(self, rgb):
         self.used = True
@@ -134,16 +138,13 @@ class EbPalette(EqualityMixin):
         return subpalette
 
     def from_block(self, block, offset=0):
+        data = iter(block.read_multi_list(offset, 2, self.num_colors()))
         for subpalette in self.subpalettes:
             for color in subpalette:
-                color.from_block(block, offset)
-                offset += 2
+                color.from_int(next(data))
 
     def to_block(self, block, offset=0):
-        for subpalette in self.subpalettes:
-            for color in subpalette:
-                color.to_block(block, offset)
-                offset += 2
+        block.write_multi_list(offset, [color.to_int() for subpalette in self.subpalettes for color in subpalette], 2)
 
     def from_image(self, image):
         self.from_list(image.getpalette()[0:(self.num_colors() * 3)])
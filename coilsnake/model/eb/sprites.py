@@ -5,7 +5,7 @@ from PIL import Image
 from coilsnake.model.common.table import EnumeratedLittleEndianIntegerTableEntry, RowTableEntry, \
     LittleEndianIntegerTableEntry
 from coilsnake.util.common.helper import grouped
-from coilsnake.util.eb.graphics import read_4bpp_graphic_from_block, write_4bpp_graphic_to_block, hash_tile
+from coilsnake.util.eb.graphics import read_graphic_rows, write_graphic_rows, hash_tile
 from coilsnake.util.eb.pointer import from_snes_address, to_snes_address
 
 
@@ -28,30 +28,24 @@ class EbBattleSprite(object):
             self.height = height
             self.sprite = [array('B', [0] * self.width) for y in range(self.height)]
 
-        for q in range(0, height // 32):
-            for r in range(0, width // 32):
-                for a in range(0, 4):
-                    for j in range(0, 4):
-                        offset += read_4bpp_graphic_from_block(
-                            target=self.sprite,
-                            source=block,
-                            offset=offset,
-                            x=(j + r * 4) * 8,
-                            y=(a + q * 4) * 8
-                        )
+        rows = iter(read_graphic_rows(block[offset:offset + self.block_size()].data, bpp=4))
+        for x, y in self._tile_positions():
+            for row in self.sprite[y:y + 8]:
+                row[x:x + 8] = array('B', next(rows))
 
     def to_block(self, block, offset=0):
-        for q in range(0, self.height // 32):
-            for r in range(0, self.width // 32):
-                for a in range(0, 4):
-                    for j in range(0, 4):
-                        offset += write_4bpp_graphic_to_block(
-                            source=self.sprite,
-                            target=block,
-                            offset=offset,
-                            x=(j + r * 4) * 8,
-                            y=(a + q * 4) * 8
-                        )
+        rows = [row[x:x + 8] for x, y in self._tile_positions() for row in self.sprite[y:y + 8]]
+        if rows:
+            block[offset:offset + self.block_size()] = write_graphic_rows(rows, bpp=4)
+
+    def _tile_positions(self):
+        """Returns the positions of the sprite's 8x8 tiles in the order in which they are stored.
+        The sprite is stored as a series of 32x32 sections, each of which is stored as a series of 8x8 tiles."""
+        return [((j + r * 4) * 8, (a + q * 4) * 8)
+                for q in range(0, self.height // 32)
+                for r in range(0, self.width // 32)
+                for a in range(0, 4)
+                for j in range(0, 4)]
 
     def image(self, palette):
         image = Image.new("P", (self.width, self.height), None)
@@ -102,14 +96,19 @@ class EbRegularSprite(object):
         self.width = width
         self.height = height
         self.data = [array('B', [0] * self.width) for i in range(self.height)]
+        rows = iter(read_graphic_rows(block[offset:offset + self.block_size()].data, bpp=4))
         for i in range(self.height // 8):
             for j in range(self.width // 8):
-                offset += read_4bpp_graphic_from_block(target=self.data, source=block, offset=offset, x=j*8, y=i*8)
+                for row in self.data[i * 8:i * 8 + 8]:
+                    row[j * 8:j * 8 + 8] = array('B', next(rows))
 
     def to_block(self, block, offset=0):
-        for i in range(self.height // 8):
-            for j in range(self.width // 8):
-                offset += write_4bpp_graphic_to_block(source=self.data, target=block, offset=offset, x=j*8, y=i*8)
+        rows = [row[j * 8:j * 8 + 8]
+                for i in range(self.height // 8)
+                for j in range(self.width // 8)
+                for row in self.data[i * 8:i * 8 + 8]]
+        if rows:
+            block[offset:offset + self.block_size()] = write_graphic_rows(rows, bpp=4)
 
     def draw(self, image, x, y):
         image_data = image.load()
@@ -321,7 +320,7 @@ class SpriteGroup(object):
 
         # Find a free area
         offset = rom.allocate(size=sum([x.block_size() for x in unique_sprites.values()]),
-                              can_write_to=(lambda y: (y & 0xf) == 0))
+                              alignment=0x10)
         self.bank = to_snes_address(offset) >> 16
         offset_start = offset & 0xffff
 
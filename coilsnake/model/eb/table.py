@@ -1,5 +1,3 @@
-from functools import partial
-
 import yaml
 
 from coilsnake.exceptions.common.exceptions import InvalidArgumentError, TableEntryInvalidYmlRepresentationError, \
@@ -8,10 +6,11 @@ from coilsnake.model.common.table import LittleEndianIntegerTableEntry, Table, M
     GenericLittleEndianRowTableEntry, TableEntry, LittleEndianHexIntegerTableEntry
 from coilsnake.model.eb.palettes import EbPalette
 from coilsnake.model.eb.pointers import EbPointer
-from coilsnake.util.common.assets import open_asset
-from coilsnake.util.eb.helper import is_in_bank
+from coilsnake.util.common.assets import load_cached_asset
+from coilsnake.util.common.import_profile import setup_step
 from coilsnake.util.eb.pointer import from_snes_address, to_snes_address
-from coilsnake.util.eb.text import standard_text_from_block, standard_text_to_block, standard_text_to_byte_list
+from coilsnake.util.eb.text import standard_text_from_block, standard_text_to_block, standard_text_to_byte_list, \
+    standard_text_from_bytes
 
 
 class EbPointerTableEntry(LittleEndianIntegerTableEntry):
@@ -87,6 +86,10 @@ class EbStandardTextTableEntry(TableEntry):
     def to_block(cls, block, offset, value):
         standard_text_to_block(block, offset, value, cls.size)
 
+    @classmethod
+    def struct_read_codec(cls):
+        return "{}s".format(cls.size), standard_text_from_bytes
+
     @classmethod
     def from_yml_rep(cls, yml_rep):
         if isinstance(yml_rep, int):
@@ -193,7 +196,7 @@ class EbBankPointerToVariableSizeEntryTableEntry(EbPointerToVariableSizeEntryTab
     @classmethod
     def to_block(cls, block, offset, value):
         data_size = cls.data_table_entry.to_block_size(value)
-        data_offset = block.allocate(size=data_size, can_write_to=partial(is_in_bank, cls.bank))
+        data_offset = block.allocate(size=data_size, bank=cls.bank)
         cls.pointer_table_entry.to_block(block, offset, to_snes_address(data_offset))
         cls.data_table_entry.to_block(block, data_offset, value)
 
@@ -209,14 +212,22 @@ class EbRowTableEntry(GenericLittleEndianRowTableEntry):
 
 _EB_SCHEMA_MAP = None
 
-with open_asset("structures", "eb.yml") as f:
-    i = 1
-    for doc in yaml.load_all(f, Loader=yaml.CSafeLoader):
-        if i == 1:
-            i += 1
-        elif i == 2:
-            _EB_SCHEMA_MAP = doc
-            break
+# Row table entry classes which have already been generated from the schema, keyed by (offset, hidden_columns)
+_EB_ROW_TABLE_ENTRY_CLASSES = dict()
+
+
+def _load_eb_schema_map(f):
+    docs = yaml.load_all(f, Loader=yaml.CSafeLoader)
+    next(docs)
+    return next(docs)
+
+
+def _get_eb_schema_map():
+    global _EB_SCHEMA_MAP
+    if _EB_SCHEMA_MAP is None:
+        with setup_step("eb.yml schema"):
+            _EB_SCHEMA_MAP = load_cached_asset(_load_eb_schema_map, "structures", "eb.yml")
+    return _EB_SCHEMA_MAP
 
 
 def eb_table_from_offset(offset, single_column=None, matrix_dimensions=None, hidden_columns=None, num_rows=None,
@@ -225,15 +236,20 @@ def eb_table_from_offset(offset, single_column=None, matrix_dimensions=None, hid
         hidden_columns = []
 
     try:
-        schema_specification = _EB_SCHEMA_MAP[offset]
+        schema_specification = _get_eb_schema_map()[offset]
     except KeyError:
         raise InvalidArgumentError("Could not setup EbTable from unknown offset[{:#x}]".format(offset))
 
     if single_column:
         schema = single_column
     else:
-        schema = EbRowTableEntry.from_schema_specification(schema_specification=schema_specification["entries"],
-                                                           hidden_columns=hidden_columns)
+        key = (offset, frozenset(hidden_columns))
+        try:
+            schema = _EB_ROW_TABLE_ENTRY_CLASSES[key]
+        except KeyError:
+            schema = EbRowTableEntry.from_schema_specification(schema_specification=schema_specification["entries"],
+                                                               hidden_columns=hidden_columns)
+            _EB_ROW_TABLE_ENTRY_CLASSES[key] = schema
 
     if matrix_dimensions:
         matrix_width, matrix_height = matrix_dimensions
@@ -1,6 +1,8 @@
 class GenericModule(object):
     NAME = "Abstract Generic Module"
     FREE_RANGES = []
+    # Whether reading this module from a project sets up state which other modules depend on when they are read
+    PROVIDES_PROJECT_STATE = False
 
     @staticmethod
     def is_compatible_with_romtype(romtype):
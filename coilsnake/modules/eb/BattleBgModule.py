@@ -161,18 +161,25 @@ class BattleBgModule(EbModule):
         # Write graphics and arrangements
         self.graphics_pointer_table.recreate(num_rows=len(self.backgrounds))
         self.arrangement_pointer_table.recreate(num_rows=len(self.backgrounds))
-        for i, (tileset, color_depth, arrangement) in enumerate(self.backgrounds):
-            with EbCompressibleBlock(size=tileset.block_size(bpp=color_depth)) as compressed_block:
-                tileset.to_block(block=compressed_block, offset=0, bpp=color_depth)
-                compressed_block.compress()
-                tileset_offset = rom.allocate(data=compressed_block)
-                self.graphics_pointer_table[i] = [to_snes_address(tileset_offset)]
-
-            with EbCompressibleBlock(size=arrangement.block_size()) as compressed_block:
-                arrangement.to_block(block=compressed_block, offset=0)
-                compressed_block.compress()
-                arrangement_offset = rom.allocate(data=compressed_block)
-                self.arrangement_pointer_table[i] = [to_snes_address(arrangement_offset)]
+        tileset_blocks = []
+        arrangement_blocks = []
+        for tileset, color_depth, arrangement in self.backgrounds:
+            tileset_block = EbCompressibleBlock(size=tileset.block_size(bpp=color_depth))
+            tileset.to_block(block=tileset_block, offset=0, bpp=color_depth)
+            tileset_blocks.append(tileset_block)
+
+            arrangement_block = EbCompressibleBlock(size=arrangement.block_size())
+            arrangement.to_block(block=arrangement_block, offset=0)
+            arrangement_blocks.append(arrangement_block)
+        EbCompressibleBlock.compress_many(tileset_blocks + arrangement_blocks)
+
+        for i, (tileset_block, arrangement_block) in enumerate(zip(tileset_blocks, arrangement_blocks)):
+            tileset_offset = rom.allocate(data=tileset_block)
+            self.graphics_pointer_table[i] = [to_snes_address(tileset_offset)]
+
+            arrangement_offset = rom.allocate(data=arrangement_block)
+            self.arrangement_pointer_table[i] = [to_snes_address(arrangement_offset)]
+        del tileset_blocks, arrangement_blocks
 
         graphics_pointer_table_offset = rom.allocate(size=self.graphics_pointer_table.size)
         self.graphics_pointer_table.to_block(block=rom, offset=graphics_pointer_table_offset)
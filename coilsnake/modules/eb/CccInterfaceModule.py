@@ -10,6 +10,7 @@ log = logging.getLogger(__name__)
 
 class CccInterfaceModule(EbModule):
     NAME = "CCScript Labels"
+    PROVIDES_PROJECT_STATE = True
 
     SUMMARY_RESOURCE_NAME = 'ccscript/summary'
     SUMMARY_RESOURCE_EXTENSION = 'txt'
@@ -1,6 +1,7 @@
 from collections import namedtuple
 import logging
 
+from coilsnake.model.eb.blocks import EbCompressibleBlock
 from coilsnake.model.eb.graphics import EbTileArrangement, EbTownMap, EbCompanyLogo, EbAttractModeLogo, \
     EbGasStationLogo, EbTownMapIcons
 from coilsnake.model.eb.town_maps import TOWN_MAP_NAMES
@@ -129,8 +130,10 @@ class CompressedGraphicsModule(EbModule):
 
     def write_town_maps_to_rom(self, rom):
         log.debug("Writing town maps")
-        for pointer_offset, town_map in zip(TOWN_MAP_POINTER_OFFSETS, self.town_maps):
-            offset = town_map.to_block(rom)
+        compressed_blocks = [town_map.to_uncompressed_block() for town_map in self.town_maps]
+        EbCompressibleBlock.compress_many(compressed_blocks)
+        for pointer_offset, compressed_block in zip(TOWN_MAP_POINTER_OFFSETS, compressed_blocks):
+            offset = rom.allocate(data=compressed_block)
             rom.write_multi(pointer_offset, to_snes_address(offset), size=4)
 
     def read_town_map_icons_from_rom(self, rom):
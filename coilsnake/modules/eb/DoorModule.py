@@ -1,4 +1,4 @@
-from coilsnake.model.eb.doors import door_from_block, door_from_yml_rep, not_in_destination_bank
+from coilsnake.model.eb.doors import door_from_block, door_from_yml_rep, DESTINATION_BANK
 from coilsnake.model.eb.table import eb_table_from_offset
 from coilsnake.modules.eb.EbModule import EbModule
 from coilsnake.util.common.yml import convert_values_to_hex_repr, yml_load, yml_dump
@@ -79,14 +79,14 @@ class DoorModule(EbModule):
         # bank of the EB ROM, and this is one of the few ranges available in that bank.
         rom.deallocate((0x0F0000, 0x0F58EE))
         destination_offsets = dict()
-        empty_area_offset = from_snes_address(rom.allocate(data=[0, 0], can_write_to=not_in_destination_bank))
+        empty_area_offset = from_snes_address(rom.allocate(data=[0, 0], not_bank=DESTINATION_BANK))
         i = 0
         for door_area in self.door_areas:
             if (door_area is None) or (not door_area):
                 self.pointer_table[i] = [empty_area_offset]
             else:
                 num_doors = len(door_area)
-                area_offset = rom.allocate(size=(2 + num_doors * 5), can_write_to=not_in_destination_bank)
+                area_offset = rom.allocate(size=(2 + num_doors * 5), not_bank=DESTINATION_BANK)
                 self.pointer_table[i] = [to_snes_address(area_offset)]
                 rom.write_multi(area_offset, num_doors, 2)
                 area_offset += 2
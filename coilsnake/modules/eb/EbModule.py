@@ -1,3 +1,5 @@
+from concurrent.futures import ThreadPoolExecutor
+import os
 import sys
 
 from coilsnake.modules.common.GenericModule import GenericModule
@@ -50,3 +52,29 @@ def comp(udata):
         return native_comp.comp(udata)
     else:
         return _comp(udata)
+
+
+def decomp_bytes(data, offset):
+    """Decompresses the data at an offset in a bytes-like object, returning the decompressed data as bytes. The
+    returned data is empty if the data could not be decompressed."""
+    return native_comp.decomp_bytes(data, offset)
+
+
+def decomp_bytes_with_size(data, offset):
+    """Same as decomp_bytes, but returns a tuple of the decompressed data and the size in bytes of the compressed data
+    which was read. The size is 0 if the data could not be decompressed."""
+    return native_comp.decomp_bytes_with_size(data, offset)
+
+
+def comp_bytes(data):
+    """Compresses a bytes-like object, returning the compressed data as bytes."""
+    return native_comp.comp_bytes(data)
+
+
+def comp_many(buffers):
+    """Compresses a sequence of bytes-like objects, returning a list of the compressed data in the same order. The
+    native compressor releases the GIL while it works, so the buffers are compressed concurrently."""
+    if len(buffers) <= 1:
+        return [comp_bytes(data) for data in buffers]
+    with ThreadPoolExecutor(max_workers=min(len(buffers), os.cpu_count() or 1)) as executor:
+        return list(executor.map(comp_bytes, buffers))
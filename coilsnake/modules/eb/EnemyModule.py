@@ -99,13 +99,17 @@ class EnemyModule(EbModule):
 
         # Write the sprites
         self.graphics_pointer_table.recreate(num_rows=len(self.battle_sprites))
-        for i, battle_sprite in enumerate(self.battle_sprites):
-            self.graphics_pointer_table[i] = [None, battle_sprite.size()]
-            with EbCompressibleBlock(size=battle_sprite.block_size()) as compressed_block:
-                battle_sprite.to_block(block=compressed_block, offset=0)
-                compressed_block.compress()
-                graphics_offset = rom.allocate(data=compressed_block)
-                self.graphics_pointer_table[i][0] = to_snes_address(graphics_offset)
+        compressed_blocks = []
+        for battle_sprite in self.battle_sprites:
+            compressed_block = EbCompressibleBlock(size=battle_sprite.block_size())
+            battle_sprite.to_block(block=compressed_block, offset=0)
+            compressed_blocks.append(compressed_block)
+        EbCompressibleBlock.compress_many(compressed_blocks)
+
+        for i, (battle_sprite, compressed_block) in enumerate(zip(self.battle_sprites, compressed_blocks)):
+            graphics_offset = rom.allocate(data=compressed_block)
+            self.graphics_pointer_table[i] = [to_snes_address(graphics_offset), battle_sprite.size()]
+        del compressed_blocks
 
         graphics_pointer_table_offset = rom.allocate(size=self.graphics_pointer_table.size)
         self.graphics_pointer_table.to_block(block=rom, offset=graphics_pointer_table_offset)
@@ -1,5 +1,15 @@
+from array import array
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import sys
+import tempfile
+
 import yaml
 
+from coilsnake.exceptions.common.exceptions import InvalidUserDataError
 from coilsnake.model.common.table import EnumeratedLittleEndianIntegerTableEntry, LittleEndianIntegerTableEntry, \
     RowTableEntry
 from coilsnake.model.eb.table import eb_table_from_offset
@@ -7,10 +17,31 @@ from coilsnake.modules.eb.EbModule import EbModule
 from coilsnake.util.common.yml import replace_field_in_yml, yml_load
 from coilsnake.util.eb.pointer import from_snes_address
 
+
+log = logging.getLogger(__name__)
+
 MAP_POINTERS_OFFSET = 0xa1db
 LOCAL_TILESETS_OFFSET = 0x175000
 MAP_HEIGHT = 320
 MAP_WIDTH = 256
+# Map tiles are 10 bits. The low 8 bits are stored in the map's sections, and the high 2 bits of each group of eight
+# rows are packed four rows to a byte, with the last four rows stored this far after the first four.
+MAP_TILE_LIMIT = 0x400
+LOCAL_TILESETS_SECOND_HALF_OFFSET = 0x3000
+
+# Translation tables which extract each of the four pairs of high tile bits from a byte of packed high bits, and which
+# shift a pair of high tile bits into its place in a byte of packed high bits
+_UNPACK_HIGH_BITS = [bytes([(x >> shift) & 3 for x in range(256)]) for shift in (0, 2, 4, 6)]
+_PACK_HIGH_BITS = [bytes([(x & 3) << shift for x in range(256)]) for shift in (0, 2, 4, 6)]
+
+# The directory, relative to the directory of map_tiles.map, in which the binary copy of the map tiles is stored
+MAP_TILES_SIDECAR_DIRECTORY = ".cache"
+# The binary copy of the map tiles starts with a header which identifies the map_tiles.map it was made from: its size,
+# modification time and SHA-1 hash. The header is followed by the map's height and width and then the tiles themselves,
+# as little-endian 16-bit words.
+_MAP_TILES_SIDECAR_MAGIC = b"CSMAPBIN"
+_MAP_TILES_SIDECAR_VERSION = 1
+_MAP_TILES_SIDECAR_HEADER = struct.Struct("<8sIqq20sII")
 
 SECTOR_TILESETS_PALETTES_TABLE_OFFSET = 0xD7A800
 SECTOR_MUSIC_TABLE_OFFSET = 0xDCD637
@@ -80,23 +111,13 @@ class MapModule(EbModule):
         map_ptrs_addr = from_snes_address(rom.read_multi(MAP_POINTERS_OFFSET, 3))
         map_addrs = [from_snes_address(rom.read_multi(map_ptrs_addr + x * 4, 4)) for x in range(8)]
 
-        def read_row_data(row_number):
-            offset = map_addrs[row_number % 8] + ((row_number >> 3) << 8)
-            return rom[offset:offset + MAP_WIDTH].to_list()
-
-        self.tiles = list(map(read_row_data, range(MAP_HEIGHT)))
-        k = LOCAL_TILESETS_OFFSET
-        for i in range(MAP_HEIGHT >> 3):
-            for j in range(MAP_WIDTH):
-                self.tiles[i << 3][j] |= (rom[k] & 3) << 8
-                self.tiles[(i << 3) | 1][j] |= ((rom[k] >> 2) & 3) << 8
-                self.tiles[(i << 3) | 2][j] |= ((rom[k] >> 4) & 3) << 8
-                self.tiles[(i << 3) | 3][j] |= ((rom[k] >> 6) & 3) << 8
-                self.tiles[(i << 3) | 4][j] |= (rom[k + 0x3000] & 3) << 8
-                self.tiles[(i << 3) | 5][j] |= ((rom[k + 0x3000] >> 2) & 3) << 8
-                self.tiles[(i << 3) | 6][j] |= ((rom[k + 0x3000] >> 4) & 3) << 8
-                self.tiles[(i << 3) | 7][j] |= ((rom[k + 0x3000] >> 6) & 3) << 8
-                k += 1
+        self.tiles = []
+        for i in range(MAP_HEIGHT):
+            offset = map_addrs[i % 8] + ((i >> 3) << 8)
+            low_bytes = rom[offset:offset + MAP_WIDTH].to_bytes()
+            offset = _high_bits_offset(i)
+            high_bytes = rom[offset:offset + MAP_WIDTH].to_bytes().translate(_UNPACK_HIGH_BITS[i & 3])
+            self.tiles.append(_map_row_from_bytes(low_bytes, high_bytes))
 
         # Read sector data
         self.sector_tilesets_palettes_table.from_block(rom, from_snes_address(SECTOR_TILESETS_PALETTES_TABLE_OFFSET))
@@ -109,23 +130,18 @@ class MapModule(EbModule):
         map_ptrs_addr = from_snes_address(rom.read_multi(MAP_POINTERS_OFFSET, 3))
         map_addrs = [from_snes_address(rom.read_multi(map_ptrs_addr + x * 4, 4)) for x in range(8)]
 
+        # Each group of four rows' high bits is packed into one row of bytes. The shifted high bits of the rows never
+        # overlap, so ORing the rows together as big integers packs the bits of every byte at once.
+        packed_high_bits = 0
         for i in range(MAP_HEIGHT):
+            low_bytes, high_bytes = _map_row_to_bytes(self.tiles[i])
             offset = map_addrs[i % 8] + ((i >> 3) << 8)
-            rom[offset:offset + MAP_WIDTH] = [x & 0xff for x in self.tiles[i]]
-        k = LOCAL_TILESETS_OFFSET
-        for i in range(MAP_HEIGHT >> 3):
-            for j in range(MAP_WIDTH):
-                c = ((self.tiles[i << 3][j] >> 8)
-                     | ((self.tiles[(i << 3) | 1][j] >> 8) << 2)
-                     | ((self.tiles[(i << 3) | 2][j] >> 8) << 4)
-                     | ((self.tiles[(i << 3) | 3][j] >> 8) << 6))
-                rom[k] = c
-                c = ((self.tiles[(i << 3) | 4][j] >> 8)
-                     | ((self.tiles[(i << 3) | 5][j] >> 8) << 2)
-                     | ((self.tiles[(i << 3) | 6][j] >> 8) << 4)
-                     | ((self.tiles[(i << 3) | 7][j] >> 8) << 6))
-                rom[k + 0x3000] = c
-                k += 1
+            rom[offset:offset + MAP_WIDTH] = low_bytes
+            packed_high_bits |= int.from_bytes(high_bytes.translate(_PACK_HIGH_BITS[i & 3]), "little")
+            if i & 3 == 3:
+                offset = _high_bits_offset(i)
+                rom[offset:offset + MAP_WIDTH] = packed_high_bits.to_bytes(MAP_WIDTH, "little")
+                packed_high_bits = 0
 
         # Write sector data
         self.sector_tilesets_palettes_table.to_block(rom, from_snes_address(SECTOR_TILESETS_PALETTES_TABLE_OFFSET))
@@ -136,12 +152,7 @@ class MapModule(EbModule):
     def write_to_project(self, resource_open):
         # Write map tiles
         with resource_open("map_tiles", "map", True) as f:
-            for row in self.tiles:
-                f.write(hex(row[0])[2:].zfill(3))
-                for tile in row[1:]:
-                    f.write(" ")
-                    f.write(hex(tile)[2:].zfill(3))
-                f.write("\n")
+            f.write("".join([_map_row_to_text(row) + "\n" for row in self.tiles]))
 
         for i in range(self.sector_yml_table.num_rows):
             tileset = self.sector_tilesets_palettes_table[i][0] >> 3
@@ -173,9 +184,22 @@ class MapModule(EbModule):
             self.sector_yml_table.to_yml_file(f)
 
     def read_from_project(self, resource_open):
-        # Read map data
+        # Read map data. The text file is the source of truth, but parsing it is slow, so a binary copy of the tiles is
+        # kept alongside it and used instead for as long as the text file doesn't change.
         with resource_open("map_tiles", "map", True) as f:
-            self.tiles = [[int(x, 16) for x in y.split(" ")] for y in f.readlines()]
+            filename = getattr(f, "name", None)
+            text_identity = _map_tiles_text_identity(filename) if isinstance(filename, str) else None
+            self.tiles = _read_map_tiles_sidecar(filename, text_identity) if text_identity else None
+            if self.tiles is None:
+                self.tiles = [_map_row_from_text(line) for line in f.readlines()]
+                for y, row in enumerate(self.tiles):
+                    if row and (min(row) < 0 or max(row) >= MAP_TILE_LIMIT):
+                        x = next(x for x, tile in enumerate(row) if not 0 <= tile < MAP_TILE_LIMIT)
+                        raise InvalidUserDataError(
+                            "Map tile at ({}, {}) is {:#x}, but map tiles must be less than {:#x}".format(
+                                x, y, row[x], MAP_TILE_LIMIT))
+                if text_identity:
+                    _write_map_tiles_sidecar(filename, text_identity, self.tiles)
 
         # Read sector data
         with resource_open("map_sectors", "yml", True) as f:
@@ -229,3 +253,126 @@ class MapModule(EbModule):
             self.upgrade_project(3, new_version, rom, resource_open_r, resource_open_w, resource_delete)
         else:
             self.upgrade_project(old_version + 1, new_version, rom, resource_open_r, resource_open_w, resource_delete)
+
+
+def _high_bits_offset(row_number):
+    """Returns the offset of the packed high bits of a row of the map."""
+    offset = LOCAL_TILESETS_OFFSET + ((row_number >> 3) << 8)
+    if row_number & 4:
+        offset += LOCAL_TILESETS_SECOND_HALF_OFFSET
+    return offset
+
+
+def _map_row_from_bytes(low_bytes, high_bytes):
+    """Combines a row's low bytes and high bytes into an array of its tiles."""
+    data = bytearray(2 * len(low_bytes))
+    data[0::2] = low_bytes
+    data[1::2] = high_bytes
+    row = array('H', data)
+    if sys.byteorder != "little":
+        row.byteswap()
+    return row
+
+
+def _map_row_to_bytes(row):
+    """Splits a row of tiles into its low bytes and its high bytes."""
+    row = array('H', row)
+    if sys.byteorder != "little":
+        row.byteswap()
+    data = row.tobytes()
+    return data[0::2], data[1::2]
+
+
+def _map_row_from_text(line):
+    """Parses a row of the map_tiles.map file, in which each tile is written in hex and separated by spaces."""
+    line = line.rstrip("\r\n")
+    # When every tile is written with three digits, as they are when CoilSnake writes the file, padding each tile to
+    # four digits lets the entire row be decoded as big-endian words at once
+    if len(line) % 4 == 3 and not line[3::4].strip(" ") and len(line.split()) == (len(line) + 1) // 4:
+        try:
+            row = array('H', bytes.fromhex("0" + line.replace(" ", " 0")))
+        except ValueError:
+            pass
+        else:
+            if sys.byteorder == "little":
+                row.byteswap()
+            return row
+    return [int(x, 16) for x in line.split(" ")]
+
+
+def _map_row_to_text(row):
+    """Formats a row of the map_tiles.map file, in which each tile is written as three hex digits."""
+    row = array('H', row)
+    if max(row, default=0) >= 0x1000:
+        return " ".join(["{:03x}".format(tile) for tile in row])
+    # Encoding the tiles as big-endian words gives four hex digits per tile, the first of which is always 0 here
+    if sys.byteorder == "little":
+        row.byteswap()
+    return row.tobytes().hex(" ", 2)[1:].replace(" 0", " ")
+
+
+def map_tiles_sidecar_filename(filename):
+    """Returns the filename of the binary copy of the tiles in a map_tiles.map file."""
+    return os.path.join(os.path.dirname(filename), MAP_TILES_SIDECAR_DIRECTORY, os.path.basename(filename) + ".bin")
+
+
+def _map_tiles_text_identity(filename):
+    """Returns the size, modification time and SHA-1 hash of a map_tiles.map file, or None if it can't be read."""
+    try:
+        stat = os.stat(filename)
+        with open(filename, "rb") as f:
+            digest = hashlib.sha1(f.read()).digest()
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns, digest
+
+
+def _read_map_tiles_sidecar(filename, text_identity):
+    """Returns the tiles in the binary copy of a map_tiles.map file, or None if there is no binary copy or if it was
+    made from a different version of the text file."""
+    try:
+        with open(map_tiles_sidecar_filename(filename), "rb") as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                if len(data) < _MAP_TILES_SIDECAR_HEADER.size:
+                    return None
+                magic, version, size, mtime, digest, height, width = _MAP_TILES_SIDECAR_HEADER.unpack_from(data)
+                if (magic, version, (size, mtime, digest)) != \
+                        (_MAP_TILES_SIDECAR_MAGIC, _MAP_TILES_SIDECAR_VERSION, text_identity) or \
+                        len(data) != _MAP_TILES_SIDECAR_HEADER.size + 2 * height * width:
+                    return None
+                tiles = array('H')
+                tiles.frombytes(data[_MAP_TILES_SIDECAR_HEADER.size:])
+    except (OSError, ValueError):
+        # mmap raises ValueError for empty files
+        return None
+
+    if sys.byteorder != "little":
+        tiles.byteswap()
+    return [tiles[i:i + width] for i in range(0, height * width, width)]
+
+
+def _write_map_tiles_sidecar(filename, text_identity, tiles):
+    """Writes the binary copy of the tiles in a map_tiles.map file. Only maps whose rows all have the same width are
+    copied."""
+    width = len(tiles[0]) if tiles else 0
+    if any([len(row) != width for row in tiles]):
+        return
+
+    data = array('H')
+    for row in tiles:
+        data.extend(array('H', row))
+    if sys.byteorder != "little":
+        data.byteswap()
+
+    sidecar_filename = map_tiles_sidecar_filename(filename)
+    try:
+        os.makedirs(os.path.dirname(sidecar_filename), exist_ok=True)
+        # Write to a temporary file first so that an interrupted write never leaves a partial binary copy
+        fd, temp_filename = tempfile.mkstemp(dir=os.path.dirname(sidecar_filename), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(_MAP_TILES_SIDECAR_HEADER.pack(_MAP_TILES_SIDECAR_MAGIC, _MAP_TILES_SIDECAR_VERSION,
+                                                   *text_identity, len(tiles), width))
+            f.write(data.tobytes())
+        os.replace(temp_filename, sidecar_filename)
+    except OSError as e:
+        log.debug("Could not write binary map tiles[{}]: {}".format(sidecar_filename, e))
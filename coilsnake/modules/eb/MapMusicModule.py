@@ -1,10 +1,7 @@
-from functools import partial
-
 from coilsnake.model.eb.map_music import MapMusicTableEntry
 from coilsnake.model.eb.table import eb_table_from_offset, EbBankPointerToVariableSizeEntryTableEntry, \
     EbPointerTableEntry
 from coilsnake.modules.eb.EbModule import EbModule
-from coilsnake.util.eb.helper import not_in_bank
 from coilsnake.util.eb.pointer import from_snes_address, to_snes_address
 
 
@@ -30,7 +27,7 @@ class MapMusicModule(EbModule):
     def write_to_rom(self, rom):
         rom.deallocate((0xf58ef, 0xf61e5))
 
-        pointer_table_offset = rom.allocate(size=self.pointer_table.size, can_write_to=partial(not_in_bank, 0x0f))
+        pointer_table_offset = rom.allocate(size=self.pointer_table.size, not_bank=0x0f)
         self.pointer_table.to_block(rom, pointer_table_offset)
         rom.write_multi(MAP_MUSIC_ASM_POINTER_OFFSET, to_snes_address(pointer_table_offset), 3)
 
@@ -1,9 +1,6 @@
-from functools import partial
-
 from coilsnake.model.eb.map_sprites import SpritePlacementPointerTableEntry
 from coilsnake.model.eb.table import eb_table_from_offset
 from coilsnake.modules.eb.EbModule import EbModule
-from coilsnake.util.eb.helper import not_in_bank
 from coilsnake.util.eb.pointer import from_snes_address, to_snes_address
 
 
@@ -28,7 +25,7 @@ class MapSpriteModule(EbModule):
         rom.deallocate((0xf61e7, 0xf8984))
 
         pointer_table_offset = rom.allocate(size=self.table.size,
-                                            can_write_to=partial(not_in_bank, 0x0f))
+                                            not_bank=0x0f)
         self.table.to_block(rom, pointer_table_offset)
         rom.write_multi(self.POINTER_TABLE_POINTER_OFFSET, to_snes_address(pointer_table_offset), 3)
 
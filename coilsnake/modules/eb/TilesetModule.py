@@ -1,14 +1,13 @@
 from array import array
-from functools import partial
 import logging
 from zlib import crc32
 
 from coilsnake.model.common.blocks import Block
+from coilsnake.model.eb.blocks import EbCompressibleBlock
 from coilsnake.model.eb.map_tilesets import EbMapPalette, EbTileset
 from coilsnake.model.eb.table import eb_table_from_offset
 from coilsnake.modules.eb.EbModule import EbModule
 from coilsnake.util.common.yml import convert_values_to_hex_repr, yml_load, yml_dump
-from coilsnake.util.eb.helper import is_in_bank, not_in_bank
 from coilsnake.util.eb.pointer import from_snes_address, to_snes_address
 
 
@@ -91,12 +90,12 @@ class TilesetModule(EbModule):
                         collision_offset = collision_offsets[collision_hash]
                     except KeyError:
                         collision_offset = rom.allocate(data=collision,
-                                                        can_write_to=partial(is_in_bank, 0x18)) & 0xffff
+                                                        bank=0x18) & 0xffff
                         collision_offsets[collision_hash] = collision_offset
 
                     collision_table.write_multi(key=j, item=collision_offset, size=2)
                     j += 2
-                collision_table_offset = rom.allocate(data=collision_table, can_write_to=partial(not_in_bank, 0x18))
+                collision_table_offset = rom.allocate(data=collision_table, not_bank=0x18)
                 self.collisions_pointer_table[tileset_id] = [to_snes_address(collision_table_offset)]
 
         self.collisions_pointer_table.to_block(block=rom, offset=from_snes_address(COLLISIONS_POINTER_TABLE_OFFSET))
@@ -135,7 +134,7 @@ class TilesetModule(EbModule):
 
         # Write the standard palettes
         # Allocate space for the standard palettes contiguously
-        palette_offset = rom.allocate(size=0xc0 * number_of_palettes, can_write_to=partial(is_in_bank, 0x1a))
+        palette_offset = rom.allocate(size=0xc0 * number_of_palettes, bank=0x1a)
         for map_tileset_id in range(32):
             self.palette_pointer_table[map_tileset_id] = [to_snes_address(palette_offset)]
 
@@ -146,10 +145,16 @@ class TilesetModule(EbModule):
         self.map_tileset_table.to_block(block=rom, offset=from_snes_address(MAP_TILESET_TABLE_OFFSET))
         self.palette_pointer_table.to_block(block=rom, offset=from_snes_address(PALETTE_POINTER_TABLE_OFFSET))
 
-        for tileset_id, tileset in enumerate(self.tilesets):
+        # Compress all the tilesets at once, then allocate them in order
+        minitiles_blocks = [tileset.minitiles_to_uncompressed_block() for tileset in self.tilesets]
+        arrangements_blocks = [tileset.arrangements_to_uncompressed_block() for tileset in self.tilesets]
+        EbCompressibleBlock.compress_many(minitiles_blocks + arrangements_blocks)
+
+        for tileset_id, (minitiles_block, arrangements_block) in enumerate(zip(minitiles_blocks, arrangements_blocks)):
             log.debug("Writing tileset #{}".format(tileset_id))
-            self.graphics_pointer_table[tileset_id] = [to_snes_address(tileset.minitiles_to_block(rom))]
-            self.arrangements_pointer_table[tileset_id] = [to_snes_address(tileset.arrangements_to_block(rom))]
+            self.graphics_pointer_table[tileset_id] = [to_snes_address(rom.allocate(data=minitiles_block))]
+            self.arrangements_pointer_table[tileset_id] = [to_snes_address(rom.allocate(data=arrangements_block))]
+        del minitiles_blocks, arrangements_blocks
 
         self.graphics_pointer_table.to_block(block=rom, offset=from_snes_address(GRAPHICS_POINTER_TABLE_OFFSET))
         self.arrangements_pointer_table.to_block(block=rom, offset=from_snes_address(ARRANGEMENTS_POINTER_TABLE_OFFSET))
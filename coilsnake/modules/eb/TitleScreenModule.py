@@ -152,8 +152,8 @@ class TitleScreenModule(EbModule):
             # The decompressed data is smaller than the expected value,
             # so it is extended with black entries.
             self._decompress_block(rom, block, BG_PALETTE_POINTER)
-            block.from_array(
-                block.to_array() + [0]*(BG_SUBPALETTE_LENGTH*2 - len(block))
+            block.from_list(
+                block.to_list() + [0]*(BG_SUBPALETTE_LENGTH*2 - len(block))
             )
             self.bg_palette.from_block(block=block, offset=0)
 
@@ -2,18 +2,41 @@
 import argparse
 import logging
 
-from coilsnake.ui.common import compile_project, decompile_rom, upgrade_project, decompile_script, patch_rom, expand, add_header, strip_header, setup_logging
-from coilsnake.model.common.blocks import Rom
-from coilsnake.ui.information import coilsnake_about
+from coilsnake.util.common.import_profile import ImportProfiler
 
 
 logger = logging.getLogger(__name__)
 
 
 def main():
-    parser = argparse.ArgumentParser()
+    # Look for --import-profile before anything else is imported, so that every import can be profiled
+    import_profile_parser = argparse.ArgumentParser(add_help=False)
+    import_profile_parser.add_argument("--import-profile", help="report how long each module took to import",
+                                       action="store_true")
+    import_profiler = None
+    if import_profile_parser.parse_known_args()[0].import_profile:
+        import_profiler = ImportProfiler()
+        import_profiler.start()
+
+    try:
+        _main(import_profile_parser)
+    finally:
+        if import_profiler is not None:
+            import_profiler.stop()
+            import_profiler.write_report()
+
+
+def _main(import_profile_parser):
+    from coilsnake.ui.common import setup_logging
+    from coilsnake.model.common.blocks import ALLOCATION_STRATEGIES, ALLOCATION_STRATEGY_FIRST_FIT
+    from coilsnake.util.eb.compression_cache import DEFAULT_MAX_SIZE as DEFAULT_COMPRESSION_CACHE_SIZE
+
+    parser = argparse.ArgumentParser(parents=[import_profile_parser])
     parser.add_argument("--verbose", help="increase output verbosity", action="store_true")
     parser.add_argument("--quiet", help="silence all output", action="store_true")
+    parser.add_argument("--profile", help="profile each module's phases, and write each module's cProfile stats and a "
+                                          "trace which can be loaded in Chrome's trace viewer to a directory",
+                        metavar="DIRECTORY")
     subparsers = parser.add_subparsers(dest="action")
     subparsers.required = True
 
@@ -21,11 +44,32 @@ def main():
     compile_parser.add_argument("project_directory")
     compile_parser.add_argument("base_rom")
     compile_parser.add_argument("output_rom")
+    compile_parser.add_argument("--jobs", help="number of modules to read from the project in parallel", type=int,
+                                default=1)
+    compile_parser.add_argument("--allocation-strategy", help="how to choose where data is placed in the ROM's free space",
+                                choices=ALLOCATION_STRATEGIES, default=ALLOCATION_STRATEGY_FIRST_FIT)
+    compile_parser.add_argument("--mmap", help="memory-map the output rom instead of reading it into memory",
+                                action="store_true")
+    compile_parser.add_argument("--compression-cache", help="directory in which to cache compressed data between "
+                                                            "compiles, by default inside the project directory",
+                                metavar="DIRECTORY")
+    compile_parser.add_argument("--compression-cache-size", help="maximum size of the compression cache in megabytes, "
+                                                                 "or 0 to disable it",
+                                type=int, default=DEFAULT_COMPRESSION_CACHE_SIZE // (1024 * 1024))
+    compile_parser.add_argument("--incremental", help="only recompile the modules whose project files have changed "
+                                                      "since the last incremental compile",
+                                action="store_true")
+    compile_parser.add_argument("--space-map", help="directory to write a map of which module allocated each part of "
+                                                    "the rom's free space to, as JSON and as an image of each bank",
+                                metavar="DIRECTORY")
     compile_parser.set_defaults(func=_compile)
 
     decompile_parser = subparsers.add_parser("decompile", help="decompile from rom to project")
     decompile_parser.add_argument("rom")
     decompile_parser.add_argument("project_directory")
+    decompile_parser.add_argument("--jobs", help="number of modules to decompile in parallel", type=int, default=1)
+    decompile_parser.add_argument("--incremental", help="leave project files whose contents would not change untouched",
+                                  action="store_true")
     decompile_parser.set_defaults(func=_decompile)
 
     upgrade_parser = subparsers.add_parser("upgrade",
@@ -71,29 +115,59 @@ def main():
 
     setup_logging(quiet=args.quiet, verbose=args.verbose)
 
-    args.func(args)
+    if args.profile:
+        from coilsnake.util.common.profile import ModuleProfiler
+
+        profiler = ModuleProfiler(output_directory=args.profile)
+        profiler.start()
+        try:
+            args.func(args)
+        finally:
+            profiler.stop()
+            profiler.write_report()
+    else:
+        args.func(args)
 
 
 def _compile(args):
+    from coilsnake.ui.common import compile_project
+
     compile_project(project_path=args.project_directory,
                     base_rom_filename=args.base_rom,
-                    output_rom_filename=args.output_rom)
+                    output_rom_filename=args.output_rom,
+                    jobs=args.jobs,
+                    allocation_strategy=args.allocation_strategy,
+                    mmap_rom=args.mmap,
+                    compression_cache_path=args.compression_cache,
+                    compression_cache_size=args.compression_cache_size * 1024 * 1024,
+                    incremental=args.incremental,
+                    space_map_path=args.space_map)
 
 
 def _decompile(args):
+    from coilsnake.ui.common import decompile_rom
+
     decompile_rom(rom_filename=args.rom,
-                  project_path=args.project_directory)
+                  project_path=args.project_directory,
+                  jobs=args.jobs,
+                  incremental=args.incremental)
 
 
 def _upgrade(args):
+    from coilsnake.ui.common import upgrade_project
+
     upgrade_project(base_rom_filename=args.base_rom,
                     project_path=args.project_directory)
 
 def _scriptdump(args):
+    from coilsnake.ui.common import decompile_script
+
     decompile_script(rom_filename=args.rom_filename, 
                      project_path=args.project_directory)
 
 def _patchrom(args):
+    from coilsnake.ui.common import patch_rom
+
     if args.headered == "true":
         header = True
     else:
@@ -104,6 +178,8 @@ def _patchrom(args):
               headered=header)
 
 def _expand(args):
+    from coilsnake.ui.common import expand
+
     if args.exhi == "true":
         exval = True
     else:
@@ -118,6 +194,8 @@ def _expand(args):
         print("Error: This ROM is already expanded.")
 
 def _addheader(args):
+    from coilsnake.ui.common import add_header
+
     returntest = add_header(romfile=args.rom)
     if returntest:
         print("Header Addition Successful: Your ROM was given a header.")
@@ -125,6 +203,8 @@ def _addheader(args):
         print("Error: Invalid ROM.")
 
 def _stripheader(args):
+    from coilsnake.ui.common import strip_header
+
     returntest = strip_header(romfile=args.rom)
     if returntest:
         print("Header Removal Successful: Your ROM's header was removed.")
@@ -133,4 +213,6 @@ def _stripheader(args):
 
 
 def _version(args):
+    from coilsnake.ui.information import coilsnake_about
+
     print(coilsnake_about())
@@ -1,26 +1,36 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
 import logging
+import multiprocessing
 import os
+import pickle
 from shutil import copyfile
 import time
 import sys
-from ccscript import ccc
-
-from CCScriptWriter.CCScriptWriter import CCScriptWriter
 
 from coilsnake.model.common.ips import IpsPatch
-from coilsnake.model.eb.blocks import EbRom
+from coilsnake.model.eb.blocks import EbRom, EbCompressibleBlock
 from coilsnake.model.eb.ebp import EbpPatch
 from coilsnake.util.common.project import FORMAT_VERSION, PROJECT_FILENAME, get_version_name
 from coilsnake.exceptions.common.exceptions import CoilSnakeError, CCScriptCompilationError
-from coilsnake.model.common.blocks import Rom, ROM_TYPE_NAME_UNKNOWN
+from coilsnake.model.common.blocks import Rom, ROM_TYPE_NAME_UNKNOWN, ALLOCATION_STRATEGY_FIRST_FIT, \
+    check_can_add_header, detect_rom_type
 from coilsnake.ui.formatter import CoilSnakeFormatter
 from coilsnake.util.common.project import Project
 from coilsnake.util.common.assets import open_asset, ccscript_library_path
+from coilsnake.util.common.incremental import IncrementalCompileCache
+from coilsnake.util.common.profile import is_profiling, profile_phase
+from coilsnake.util.common.type import pickle_dumps
+from coilsnake.util.eb.compression_cache import CompressionCache, DEFAULT_MAX_SIZE as DEFAULT_COMPRESSION_CACHE_SIZE
 
 
 log = logging.getLogger(__name__)
 
+# The default location of the compression cache, relative to the project directory
+COMPRESSION_CACHE_DIRECTORY = os.path.join(".cache", "compression")
+# The location of the incremental compile records, relative to the project directory
+INCREMENTAL_CACHE_DIRECTORY = os.path.join(".cache", "incremental")
+
 
 def setup_logging(quiet=False, verbose=False, stream=None):
     # Disable the weird "STREAM" logging messages in Pillow 3.0.0
@@ -73,7 +83,7 @@ def upgrade_project(project_path, base_rom_filename, progress_bar=None):
     for module_name, module_class in compatible_modules:
         log.info("Upgrading {}...".format(module_class.NAME))
         start_time = time.time()
-        with module_class() as module:
+        with module_class() as module, profile_phase(module_name, "upgrade_project"):
             module.upgrade_project(project.version, FORMAT_VERSION, rom,
                                    lambda x, y, astext=False : project.get_resource(module_name, x, y, 'rt' if astext else 'rb', 'utf-8' if astext else None),
                                    lambda x, y, astext=False: 
@@ -92,7 +102,10 @@ def upgrade_project(project_path, base_rom_filename, progress_bar=None):
     log.info("Upgraded {} in {:.2f}s".format(project_path, time.time() - upgrade_start_time))
 
 
-def compile_project(project_path, base_rom_filename, output_rom_filename, ccscript_offset=None, progress_bar=None):
+def compile_project(project_path, base_rom_filename, output_rom_filename, ccscript_offset=None, progress_bar=None,
+                    jobs=1, allocation_strategy=ALLOCATION_STRATEGY_FIRST_FIT, mmap_rom=False,
+                    compression_cache_path=None, compression_cache_size=DEFAULT_COMPRESSION_CACHE_SIZE,
+                    incremental=False, space_map_path=None):
     if not os.path.isdir(project_path):
         raise RuntimeError("Project directory \"" + project_path + "\" is not a directory.")
     if not os.path.isfile(base_rom_filename):
@@ -115,6 +128,9 @@ def compile_project(project_path, base_rom_filename, output_rom_filename, ccscri
                         if x.lower().endswith('.ccs')]
 
     if script_filenames:
+        # CCScript is only imported when there are scripts to compile, since importing it is slow
+        from ccscript import ccc
+
         log.info("Compiling CCScript")
         if not ccscript_offset:
             ccscript_offset = "F10000"
@@ -134,7 +150,10 @@ def compile_project(project_path, base_rom_filename, output_rom_filename, ccscri
             raise CCScriptCompilationError("CCScript compilation failed with output:\n" + ccc_log)
 
     rom = Rom()
-    rom.from_file(output_rom_filename)
+    # Only memory-map the output ROM when it is a copy of the base ROM, so that a failed compile can't leave the base ROM
+    # partially written
+    rom.from_file(output_rom_filename, mapped=(mmap_rom and base_rom_filename != output_rom_filename))
+    rom.allocation_strategy = allocation_strategy
     check_if_types_match(project=project, rom=rom)
 
     compatible_modules = [(name, clazz) for name, clazz in modules if clazz.is_compatible_with_romtype(rom.type)]
@@ -143,34 +162,193 @@ def compile_project(project_path, base_rom_filename, output_rom_filename, ccscri
     log.info("Compiling Project {}".format(project_path))
     compile_start_time = time.time()
 
+    # Every allocation is attributed to the module which made it, so that the space map can show who uses what
+    if space_map_path:
+        from coilsnake.util.common.space_map import AllocationJournal
+
+        allocation_journal = rom.allocation_journal = AllocationJournal(rom)
+    else:
+        allocation_journal = None
+
+    initial_unallocated_ranges = list(rom.unallocated_ranges)
     for module_name, module_class in modules:
         if module_class.is_compatible_with_romtype(rom.type):
+            if allocation_journal:
+                allocation_journal.owner = module_name
             for free_range in module_class.FREE_RANGES:
                 rom.deallocate(free_range)
 
-    for module_name, module_class in modules:
-        if not module_class.is_compatible_with_romtype(rom.type):
-            continue
+    # Compressed data is cached between compiles so that assets which haven't changed don't need to be recompressed
+    if compression_cache_size > 0:
+        compression_cache = CompressionCache(
+            path=compression_cache_path or os.path.join(project_path, COMPRESSION_CACHE_DIRECTORY),
+            max_size=compression_cache_size)
+    else:
+        compression_cache = None
+    EbCompressibleBlock.compression_cache = compression_cache
 
-        log.info("Compiling {}...".format(module_class.NAME))
-        start_time = time.time()
-        with module_class() as module:
-            module.read_from_project(lambda x, y, astext=False : project.get_resource(module_name, x, y, 'rt' if astext else 'rb', 'utf-8' if astext else None))
-            if progress_bar:
-                progress_bar.tick(tick_amount)
-            module.write_to_rom(rom)
-            if progress_bar:
-                progress_bar.tick(tick_amount)
-        log.info("Finished compiling {} in {:.2f}s".format(module_class.NAME, time.time() - start_time))
+    try:
+        # Modules whose inputs haven't changed since the last compile replay what they wrote to the ROM back then
+        if incremental:
+            incremental_cache = IncrementalCompileCache(path=os.path.join(project_path, INCREMENTAL_CACHE_DIRECTORY),
+                                                        project=project)
+            incremental_cache.begin(rom, allocation_strategy, [module_name for module_name, _ in compatible_modules])
+            first_out_of_date_index = incremental_cache.first_out_of_date_index(compatible_modules)
+        else:
+            incremental_cache = None
+            first_out_of_date_index = 0
+
+        jobs = _jobs_for_profiling(jobs)
+        if jobs > 1 and "fork" in multiprocessing.get_all_start_methods():
+            # Reading from the project doesn't touch the ROM, so it is done for all modules concurrently. Writing to the
+            # ROM is still done in module order so that the ROM's allocation stays deterministic.
+            read_modules = _read_modules_from_project_in_parallel(
+                [(module_name, module_class) for i, (module_name, module_class) in enumerate(compatible_modules)
+                 if i >= first_out_of_date_index or module_class.PROVIDES_PROJECT_STATE],
+                project, jobs, progress_bar, tick_amount)
+        else:
+            read_modules = dict()
+
+        for module_name, module_class in compatible_modules:
+            log.info("Compiling {}...".format(module_class.NAME))
+            start_time = time.time()
+            module, read_time, resources = read_modules.pop(module_name, (None, 0, None))
+            was_read = module is not None
+            if incremental_cache:
+                record = incremental_cache.get_up_to_date_record(module_name, module_class)
+            else:
+                record = None
+
+            if module is None and (record is None or module_class.PROVIDES_PROJECT_STATE):
+                # Modules which provide project state are always read, since other modules depend on that state
+                module = module_class()
+                resources = _read_module_from_project(module_name, module, project)
+                if progress_bar:
+                    progress_bar.tick(tick_amount)
+                was_read = True
+
+            if allocation_journal:
+                allocation_journal.owner = module_name
+
+            if record is not None:
+                old_unallocated_ranges = rom.unallocated_ranges
+                with profile_phase(module_name, "replay"):
+                    incremental_cache.replay(record, rom)
+                if allocation_journal:
+                    allocation_journal.record_replay(old_unallocated_ranges, rom.unallocated_ranges)
+                if progress_bar:
+                    progress_bar.tick(tick_amount if was_read else 2 * tick_amount)
+                log.info("Replayed {} from the previous compile in {:.2f}s".format(
+                    module_class.NAME, read_time + time.time() - start_time))
+                continue
+
+            with module:
+                if incremental_cache:
+                    recorder = incremental_cache.recorder(module_name, module_class, rom)
+                with profile_phase(module_name, "write_to_rom"):
+                    module.write_to_rom(rom)
+                if incremental_cache:
+                    recorder.finish(rom, resources)
+                if progress_bar:
+                    progress_bar.tick(tick_amount)
+            log.info("Finished compiling {} in {:.2f}s".format(module_class.NAME, read_time + time.time() - start_time))
+    finally:
+        # The compression cache is a class attribute, so it must be detached even when a module fails to compile, or
+        # else it would be used by whatever runs next in the same process, such as the next compile in the GUI
+        EbCompressibleBlock.compression_cache = None
+        if compression_cache is not None:
+            compression_cache.trim()
+            log.debug("Compression cache had {} hits and {} misses".format(compression_cache.hits,
+                                                                            compression_cache.misses))
+
+        # The space map is also written when a module fails to compile, since it shows why the ROM ran out of space
+        if allocation_journal:
+            allocation_journal.write_space_map(space_map_path)
+            log.info("Wrote space map to {}".format(space_map_path))
 
     log.debug("Saving ROM")
     rom.to_file(output_rom_filename)
 
+    log_unallocated_space_report(rom, initial_unallocated_ranges)
+
     log.info("Compiled to {} in {:.2f}s, finished at {}".format(
         output_rom_filename, time.time() - compile_start_time, datetime.now().strftime('%I:%M:%S %p')))
 
 
-def decompile_rom(rom_filename, project_path, progress_bar=None):
+def log_unallocated_space_report(rom, initial_unallocated_ranges=()):
+    """Logs how much of each bank's allocatable space is still unallocated.
+    :param initial_unallocated_ranges: the ROM's unallocated ranges from before it was compiled to"""
+    unallocated_space = rom.get_unallocated_space_by_bank()
+    log.info("Unallocated space remaining by bank:")
+    for bank, allocatable_size in sorted(rom.get_allocatable_space_by_bank(initial_unallocated_ranges).items()):
+        free_size, num_ranges, largest_size = unallocated_space.get(bank, (0, 0, 0))
+        log.info("  Bank {:#04x}: {} of {} allocatable bytes free in {} range{}, largest is {} bytes "
+                 "({:.1%} used, {:.0%} fragmented)".format(
+                     bank, free_size, allocatable_size, num_ranges, "" if num_ranges == 1 else "s", largest_size,
+                     1 - free_size / allocatable_size, (1 - largest_size / free_size) if free_size else 0))
+
+
+def _jobs_for_profiling(jobs):
+    """Returns the number of jobs to use, which is always 1 while profiling, since only the modules which are handled
+    by this process can be profiled."""
+    if jobs > 1 and is_profiling():
+        log.warning("Handling one module at a time, since modules are being profiled")
+        return 1
+    return jobs
+
+
+def _read_module_from_project(module_name, module, project):
+    """Reads a module from the project, returning a list of (resource_name, extension) tuples for each resource which
+    the module opened."""
+    resources = []
+
+    def resource_open(x, y, astext=False):
+        f = project.get_resource(module_name, x, y, 'rt' if astext else 'rb', 'utf-8' if astext else None)
+        resources.append((x, y))
+        return f
+
+    with profile_phase(module_name, "read_from_project"):
+        module.read_from_project(resource_open)
+    return resources
+
+
+def _read_modules_from_project_in_parallel(modules, project, jobs, progress_bar=None, tick_amount=0):
+    read_modules = dict()
+
+    # Some modules set up state while reading from the project which other modules depend on, so read these first in
+    # this process. The worker processes are forked afterwards, so they inherit that state.
+    for module_name, module_class in modules:
+        if module_class.PROVIDES_PROJECT_STATE:
+            start_time = time.time()
+            module = module_class()
+            resources = _read_module_from_project(module_name, module, project)
+            read_modules[module_name] = (module, time.time() - start_time, resources)
+            if progress_bar:
+                progress_bar.tick(tick_amount)
+
+    with ProcessPoolExecutor(max_workers=jobs, mp_context=multiprocessing.get_context("fork")) as executor:
+        futures = [(module_name, executor.submit(_read_module_from_project_in_worker, module_name, module_class,
+                                                 project))
+                   for module_name, module_class in modules
+                   if not module_class.PROVIDES_PROJECT_STATE]
+
+        for module_name, future in futures:
+            pickled_module, elapsed_time, resources = future.result()
+            read_modules[module_name] = (pickle.loads(pickled_module), elapsed_time, resources)
+            if progress_bar:
+                progress_bar.tick(tick_amount)
+
+    return read_modules
+
+
+def _read_module_from_project_in_worker(module_name, module_class, project):
+    start_time = time.time()
+    module = module_class()
+    resources = _read_module_from_project(module_name, module, project)
+    return pickle_dumps(module), time.time() - start_time, resources
+
+
+def decompile_rom(rom_filename, project_path, progress_bar=None, jobs=1, incremental=False):
     if not os.path.isfile(rom_filename):
         raise RuntimeError("Rom \"" + rom_filename + "\" is not a file.")
 
@@ -179,8 +357,11 @@ def decompile_rom(rom_filename, project_path, progress_bar=None):
     rom = Rom()
     rom.from_file(rom_filename)
 
+    project_filename = os.path.join(project_path, PROJECT_FILENAME)
     project = Project()
-    project.load(os.path.join(project_path, PROJECT_FILENAME), rom.type)
+    project.load(project_filename, rom.type)
+    # Only rewrite the files in the project whose contents actually changed
+    project.skip_unchanged_resources = incremental
 
     compatible_modules = [(name, clazz) for name, clazz in modules if clazz.is_compatible_with_romtype(rom.type)]
     tick_amount = 1.0/(2*len(compatible_modules))
@@ -188,30 +369,92 @@ def decompile_rom(rom_filename, project_path, progress_bar=None):
     log.info("Decompiling ROM {}".format(rom_filename))
     decompile_start_time = time.time()
 
-    for module_name, module_class in compatible_modules:
-        if not module_class.is_compatible_with_romtype(rom.type):
-            continue
+    jobs = _jobs_for_profiling(jobs)
+    if jobs > 1:
+        # Every module only reads from the ROM and writes its own resources, so the modules can be decompiled
+        # independently of each other. Each worker maps the ROM read-only, so that the workers share a single copy
+        # of it, and loads its own copy of the project. The resources which each module wrote are merged back into
+        # this process's project afterwards.
+        del rom
+        with ProcessPoolExecutor(max_workers=jobs,
+                                 initializer=_init_decompile_worker,
+                                 initargs=(rom_filename, project_filename, incremental)) as executor:
+            log.info("Decompiling {} modules with {} jobs...".format(len(compatible_modules), jobs))
+            futures = [executor.submit(_decompile_module_in_worker, module_name, module_class)
+                       for module_name, module_class in compatible_modules]
+
+            # Progress is logged as modules finish, since modules only start once a worker is free to run them
+            for num_finished, future in enumerate(as_completed(futures), 1):
+                module_name, elapsed_time, resources, num_written, num_unchanged = future.result()
+                project.num_written_resources += num_written
+                project.num_unchanged_resources += num_unchanged
+                if progress_bar:
+                    progress_bar.tick(2 * tick_amount)
+                log.info("Finished decompiling {} in {:.2f}s ({}/{})".format(
+                    dict(compatible_modules)[module_name].NAME, elapsed_time, num_finished, len(compatible_modules)))
+
+        # Merge in module order so that the project is the same regardless of which worker finished first
+        for future in futures:
+            module_name, elapsed_time, resources, _, _ = future.result()
+            if resources is not None:
+                project.set_resources(module_name, resources)
+    else:
+        for module_name, module_class in compatible_modules:
+            log.info("Decompiling {}...".format(module_class.NAME))
+            start_time = time.time()
+            _decompile_module(module_name, module_class, rom, project, progress_bar, tick_amount)
+            log.info("Finished decompiling {} in {:.2f}s".format(module_class.NAME, time.time() - start_time))
 
-        log.info("Decompiling {}...".format(module_class.NAME))
-        start_time = time.time()
-        with module_class() as module:
+    log.debug("Saving Project")
+    project.write(project_filename)
+
+    if incremental:
+        log.info("Rewrote {} project files, and left {} unchanged project files untouched".format(
+            project.num_written_resources, project.num_unchanged_resources))
+    log.info("Decompiled to {} in {:.2f}s".format(project_path, time.time() - decompile_start_time))
+
+
+def _decompile_module(module_name, module_class, rom, project, progress_bar=None, tick_amount=0):
+    with module_class() as module:
+        with profile_phase(module_name, "read_from_rom"):
             module.read_from_rom(rom)
-            if progress_bar:
-                progress_bar.tick(tick_amount)
+        if progress_bar:
+            progress_bar.tick(tick_amount)
+        with profile_phase(module_name, "write_to_project"):
             module.write_to_project(
-                lambda x, y, astext=False: 
-                    project.get_resource(module_name, x, y, 
-                        'wt' if astext else 'wb', 
-                        'utf-8' if astext else None, 
+                lambda x, y, astext=False:
+                    project.get_resource(module_name, x, y,
+                        'wt' if astext else 'wb',
+                        'utf-8' if astext else None,
                         '\n' if astext else None))
-            if progress_bar:
-                progress_bar.tick(tick_amount)
-        log.info("Finished decompiling {} in {:.2f}s".format(module_class.NAME, time.time() - start_time))
+        if progress_bar:
+            progress_bar.tick(tick_amount)
 
-    log.debug("Saving Project")
-    project.write(os.path.join(project_path, PROJECT_FILENAME))
 
-    log.info("Decompiled to {} in {:.2f}s".format(project_path, time.time() - decompile_start_time))
+# The ROM and project used by a decompilation worker process, set up once per process by _init_decompile_worker
+_worker_rom = None
+_worker_project = None
+
+
+def _init_decompile_worker(rom_filename, project_filename, incremental=False):
+    global _worker_rom, _worker_project
+
+    _worker_rom = Rom()
+    _worker_rom.from_file(rom_filename, mapped=True, read_only=True)
+
+    _worker_project = Project()
+    _worker_project.load(project_filename, _worker_rom.type)
+    _worker_project.skip_unchanged_resources = incremental
+
+
+def _decompile_module_in_worker(module_name, module_class):
+    start_time = time.time()
+    num_written = _worker_project.num_written_resources
+    num_unchanged = _worker_project.num_unchanged_resources
+    _decompile_module(module_name, module_class, _worker_rom, _worker_project)
+    return (module_name, time.time() - start_time, _worker_project.get_resources(module_name),
+            _worker_project.num_written_resources - num_written,
+            _worker_project.num_unchanged_resources - num_unchanged)
 
 
 def decompile_script(rom_filename, project_path, progress_bar=None):
@@ -231,6 +474,8 @@ def decompile_script(rom_filename, project_path, progress_bar=None):
 
     start_time = time.time()
 
+    from CCScriptWriter.CCScriptWriter import CCScriptWriter
+
     rom_file = open(rom_filename, "rb")
     try:
         ccsw = CCScriptWriter(rom_file, project_ccscript_path, False)
@@ -314,8 +559,11 @@ def expand(romfile, ex=False):
 
 def add_header(romfile):
     if romfile:
+        # Check the ROM before mapping it, since mapping a ROM which already has a header removes the header from the
+        # file, and a ROM which can't have a header added to it must be left untouched
+        check_can_add_header(detect_rom_type(romfile))
         with Rom() as rom:
-            rom.from_file(romfile)
+            rom.from_file(romfile, mapped=True)
             rom.add_header()
             rom.to_file(romfile)
         return True
@@ -325,7 +573,7 @@ def add_header(romfile):
 def strip_header(romfile):
     if romfile:
         with Rom() as rom:
-            rom.from_file(romfile)
+            rom.from_file(romfile, mapped=True)
             rom.to_file(romfile)
         return True
     else:
@@ -1,9 +1,21 @@
+import hashlib
+import logging
 import os
+import pickle
+import re
 import sys
+import tempfile
 
 from coilsnake.root import ASSET_PATH
 
 
+log = logging.getLogger(__name__)
+
+# The directory in which load_cached_asset stores assets which have already been parsed
+ASSET_CACHE_PATH = os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+                                "coilsnake")
+
+
 def asset_path(path):
     return os.path.join(ASSET_PATH, os.path.join(*path))
 
@@ -12,5 +24,48 @@ def open_asset(*path):
     return open(asset_path(path), 'r')
 
 
+def load_cached_asset(load, *path):
+    """Returns the result of load(f) for an asset, where f is the asset opened with open_asset. The result is pickled
+    to the asset cache, keyed by a hash of the asset's contents and of load's code, so that the asset doesn't need to be
+    parsed again the next time it is loaded unless either of them has changed. Older cache entries for the asset are
+    removed when a new one is written.
+    :param load: a function which parses the opened asset into picklable data
+    :param path: the path of the asset"""
+    with open(asset_path(path), "rb") as f:
+        key = hashlib.sha1(f.read())
+    key.update(repr((load.__module__, load.__qualname__, pickle.HIGHEST_PROTOCOL)).encode("utf-8"))
+    key.update(load.__code__.co_code)
+    cache_filename = os.path.join(ASSET_CACHE_PATH, "{}.{}.pickle".format(path[-1], key.hexdigest()))
+
+    try:
+        with open(cache_filename, "rb") as f:
+            return pickle.load(f)
+    except (IOError, OSError, pickle.UnpicklingError, EOFError):
+        pass
+
+    with open_asset(*path) as f:
+        data = load(f)
+
+    try:
+        os.makedirs(ASSET_CACHE_PATH, exist_ok=True)
+        # Write to a temporary file first so that an interrupted write never leaves a partial entry in the cache
+        fd, temp_filename = tempfile.mkstemp(dir=ASSET_CACHE_PATH, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_filename, cache_filename)
+        _remove_stale_cache_entries(path[-1], cache_filename)
+    except (IOError, OSError) as e:
+        log.debug("Could not write to asset cache[{}]: {}".format(ASSET_CACHE_PATH, e))
+
+    return data
+
+
+def _remove_stale_cache_entries(asset_name, cache_filename):
+    stale_filename_regex = re.compile(r"^{}\.[0-9a-f]{{40}}\.pickle$".format(re.escape(asset_name)))
+    for filename in os.listdir(ASSET_CACHE_PATH):
+        if stale_filename_regex.match(filename) and os.path.join(ASSET_CACHE_PATH, filename) != cache_filename:
+            os.remove(os.path.join(ASSET_CACHE_PATH, filename))
+
+
 def ccscript_library_path():
-    return asset_path(["mobile-sprout", "lib"])
\ No newline at end of file
+    return asset_path(["mobile-sprout", "lib"])
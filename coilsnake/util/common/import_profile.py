@@ -0,0 +1,120 @@
+from contextlib import contextmanager
+import sys
+import time
+
+
+# The ImportProfiler which is currently recording, if any
+_active_profiler = None
+
+
+@contextmanager
+def setup_step(name):
+    """Times a one-off setup step, such as loading a data file the first time it is needed, so that it is included in
+    the report of the active ImportProfiler, if there is one."""
+    profiler = _active_profiler
+    if profiler is None:
+        yield
+        return
+
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        profiler.setup_steps.append((name, time.perf_counter() - start_time))
+
+
+class _TimingLoader(object):
+    """Wraps a module's loader so that the time spent executing the module is recorded."""
+
+    def __init__(self, profiler, loader):
+        self._profiler = profiler
+        self._loader = loader
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        # Restore the real loader so that the module never sees this wrapper
+        module.__loader__ = self._loader
+        if module.__spec__ is not None:
+            module.__spec__.loader = self._loader
+        self._profiler._exec_module(self._loader, module)
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+
+class ImportProfiler(object):
+    """Records how long each module takes to import, and how long each setup step takes, while it is started.
+    Like python -X importtime, each import's time is split into the time spent in the module itself and the cumulative
+    time including the imports it triggered."""
+
+    def __init__(self):
+        self.imports = []
+        self.setup_steps = []
+        self._stack = []
+        self._finding = set()
+
+    def start(self):
+        global _active_profiler
+        _active_profiler = self
+        sys.meta_path.insert(0, self)
+
+    def stop(self):
+        global _active_profiler
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+        if _active_profiler is self:
+            _active_profiler = None
+
+    def find_spec(self, fullname, path, target=None):
+        if fullname in self._finding:
+            return None
+
+        # Let the rest of the import machinery find the module, then wrap its loader
+        self._finding.add(fullname)
+        try:
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, "find_spec"):
+                    continue
+                spec = finder.find_spec(fullname, path, target)
+                if spec is not None:
+                    break
+            else:
+                return None
+        finally:
+            self._finding.discard(fullname)
+
+        if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+            spec.loader = _TimingLoader(self, spec.loader)
+        return spec
+
+    def _exec_module(self, loader, module):
+        self._stack.append(0.0)
+        start_time = time.perf_counter()
+        try:
+            loader.exec_module(module)
+        finally:
+            cumulative_time = time.perf_counter() - start_time
+            children_time = self._stack.pop()
+            if self._stack:
+                self._stack[-1] += cumulative_time
+            self.imports.append((module.__name__, cumulative_time - children_time, cumulative_time))
+
+    def write_report(self, f=None, limit=30):
+        """Writes a report of the slowest imports and setup steps.
+        :param f: the stream to write to, which is stderr by default
+        :param limit: the maximum number of imports to list"""
+        if f is None:
+            f = sys.stderr
+
+        f.write("Imported {} modules in {:.1f}ms\n".format(
+            len(self.imports), 1000 * sum([self_time for _, self_time, _ in self.imports])))
+        f.write("{:>10} {:>10}  {}\n".format("self (ms)", "total (ms)", "module"))
+        for name, self_time, cumulative_time in sorted(self.imports, key=lambda x: x[2], reverse=True)[:limit]:
+            f.write("{:>10.1f} {:>10.1f}  {}\n".format(1000 * self_time, 1000 * cumulative_time, name))
+
+        if self.setup_steps:
+            f.write("Setup steps:\n")
+            for name, elapsed_time in self.setup_steps:
+                f.write("{:>10.1f} {:>10}  {}\n".format(1000 * elapsed_time, "", name))
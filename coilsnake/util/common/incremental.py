@@ -0,0 +1,228 @@
+import hashlib
+import inspect
+import logging
+import os
+import pickle
+import tempfile
+
+from coilsnake.util.common.project import FORMAT_VERSION
+
+
+log = logging.getLogger(__name__)
+
+# Bump this whenever the format of the records changes, or whenever modules' output changes in a way which isn't
+# reflected by FORMAT_VERSION, so that records from older versions of CoilSnake are never replayed
+RECORD_VERSION = 1
+
+# The ROM is compared in pages of this size to find which parts of it a module wrote to
+PAGE_SIZE = 0x400
+
+
+def _file_digest(filename):
+    try:
+        with open(filename, "rb") as f:
+            return hashlib.sha1(f.read()).hexdigest()
+    except (IOError, OSError):
+        return None
+
+
+def _module_source_digest(module_class):
+    try:
+        return _file_digest(inspect.getsourcefile(module_class))
+    except TypeError:
+        return None
+
+
+def _directory_digest(path):
+    """Returns a digest of the names and contents of every file in a directory and its subdirectories, other than
+    compiled Python bytecode."""
+    digest = hashlib.sha1()
+    for directory, subdirectories, filenames in os.walk(path):
+        subdirectories[:] = sorted([x for x in subdirectories if x != "__pycache__"])
+        for filename in sorted(filenames):
+            if filename.endswith((".pyc", ".pyo")):
+                continue
+            full_filename = os.path.join(directory, filename)
+            digest.update(repr(os.path.relpath(full_filename, path)).encode("utf-8"))
+            digest.update(repr(_file_digest(full_filename)).encode("utf-8"))
+    return digest.hexdigest()
+
+
+# The digest of the coilsnake package, which is only computed once it is first needed
+_coilsnake_digest = None
+
+
+def coilsnake_digest():
+    """Returns a digest of the entire coilsnake package, including its assets and native extensions. Any change to the
+    code or data which modules share, such as the table and graphics models or the compressor, can change what the
+    modules write to the ROM, so records made by any other version of the package are never replayed."""
+    global _coilsnake_digest
+    if _coilsnake_digest is None:
+        import coilsnake
+
+        _coilsnake_digest = _directory_digest(os.path.dirname(os.path.abspath(coilsnake.__file__)))
+    return _coilsnake_digest
+
+
+class IncrementalCompileCache(object):
+    """An on-disk record of what each module did to the ROM when it was last compiled, so that modules whose inputs
+    haven't changed can replay their writes instead of being read from the project and written to the ROM again.
+
+    A module's inputs are the project resources which it opened, and the state of the ROM before it was written to. The
+    ROM's state is tracked as a hash which is chained from module to module: it starts as a hash of the ROM's data and
+    unallocated ranges, and each module mixes in what it wrote and allocated. So a module whose resources changed is
+    compiled again, along with every module after it whose starting ROM state turns out to be different."""
+
+    def __init__(self, path, project, code_digest=None):
+        """Creates a new IncrementalCompileCache.
+        :param path: the directory in which to store the records, which is created if it doesn't exist
+        :param project: the Project being compiled
+        :param code_digest: a digest of the code which compiles the modules, which defaults to a digest of the entire
+                            coilsnake package"""
+        self.path = path
+        self.project = project
+        self.code_digest = code_digest if code_digest is not None else coilsnake_digest()
+        self.state = None
+        self._records = dict()
+        self._resource_digests = dict()
+
+    def begin(self, rom, *args):
+        """Sets the initial ROM state, before any modules have been compiled.
+        :param rom: the ROM which is about to be compiled to
+        :param args: any other values which affect every module's output, such as the allocation strategy"""
+        state_hash = hashlib.sha1(repr((RECORD_VERSION, FORMAT_VERSION, self.code_digest, len(rom), args))
+                                  .encode("utf-8"))
+        state_hash.update(rom.data)
+        state_hash.update(repr(rom.unallocated_ranges).encode("utf-8"))
+        self.state = state_hash.hexdigest()
+
+    def _record_filename(self, module_name):
+        return os.path.join(self.path, module_name + ".pickle")
+
+    def _resource_digest(self, module_name, resource_name, extension):
+        filename = self.project.get_resource_filename(module_name, resource_name, extension)
+        if filename not in self._resource_digests:
+            self._resource_digests[filename] = _file_digest(filename)
+        return self._resource_digests[filename]
+
+    def _load_record(self, module_name):
+        if module_name not in self._records:
+            try:
+                with open(self._record_filename(module_name), "rb") as f:
+                    self._records[module_name] = pickle.load(f)
+            except (IOError, OSError, pickle.UnpicklingError, EOFError):
+                self._records[module_name] = None
+        return self._records[module_name]
+
+    def _is_record_up_to_date(self, module_name, module_class, record):
+        return (record is not None
+                and record["source"] == _module_source_digest(module_class)
+                and all([self._resource_digest(module_name, resource_name, extension) == digest
+                         for resource_name, extension, digest in record["resources"]]))
+
+    def get_up_to_date_record(self, module_name, module_class):
+        """Returns the record of a module's last compilation if it can be replayed onto the ROM in its current state,
+        or None if the module needs to be compiled again."""
+        if self.state is None:
+            return None
+        record = self._load_record(module_name)
+        if record is not None and record["input_state"] == self.state \
+                and self._is_record_up_to_date(module_name, module_class, record):
+            return record
+        return None
+
+    def first_out_of_date_index(self, modules):
+        """Returns the index of the first module in a list of (module_name, module_class) pairs which will need to be
+        compiled again, assuming that the modules before it are replayed, or len(modules) if no modules will be."""
+        state = self.state
+        for i, (module_name, module_class) in enumerate(modules):
+            record = self._load_record(module_name)
+            if state is None or record is None or record["input_state"] != state \
+                    or not self._is_record_up_to_date(module_name, module_class, record):
+                return i
+            state = record["output_state"]
+        return len(modules)
+
+    def replay(self, record, rom):
+        """Applies a module's recorded writes and allocations to the ROM."""
+        for offset, data in record["writes"]:
+            rom[offset:offset + len(data)] = data
+        rom.unallocated_ranges = list(record["unallocated_ranges"])
+        rom.deallocated_ranges.extend(record.get("deallocated_ranges", []))
+        self.state = record["output_state"]
+
+    def recorder(self, module_name, module_class, rom):
+        """Returns an IncrementalCompileRecorder which records a module being compiled. It must be created before the
+        module is written to the ROM."""
+        return IncrementalCompileRecorder(self, module_name, module_class, rom)
+
+    def _save_record(self, module_name, record):
+        self._records[module_name] = record
+        try:
+            os.makedirs(self.path, exist_ok=True)
+            # Write to a temporary file first so that an interrupted write never leaves a partial record
+            fd, temp_filename = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(record, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_filename, self._record_filename(module_name))
+        except (IOError, OSError) as e:
+            log.debug("Could not write incremental compile record[{}]: {}".format(module_name, e))
+
+
+class IncrementalCompileRecorder(object):
+    def __init__(self, cache, module_name, module_class, rom):
+        self.cache = cache
+        self.module_name = module_name
+        self.module_class = module_class
+        self.input_state = cache.state
+        self.original_data = bytes(rom.data)
+        self.num_deallocated_ranges = len(rom.deallocated_ranges)
+
+    def finish(self, rom, resources):
+        """Records what the module wrote to the ROM, and advances the cache's ROM state past it.
+        :param rom: the ROM, after the module was written to it
+        :param resources: a list of (resource_name, extension) tuples for each resource which the module opened"""
+        cache = self.cache
+        if self.input_state is None or len(rom) != len(self.original_data):
+            # The ROM's state can't be followed once it has been resized, so don't record anything from here on
+            cache.state = None
+            return
+
+        writes = []
+        data = memoryview(rom.data)
+        original_data = memoryview(self.original_data)
+        write_begin = None
+        for offset in range(0, len(original_data), PAGE_SIZE):
+            page_changed = data[offset:offset + PAGE_SIZE] != original_data[offset:offset + PAGE_SIZE]
+            if page_changed and write_begin is None:
+                write_begin = offset
+            elif not page_changed and write_begin is not None:
+                writes.append((write_begin, bytes(data[write_begin:offset])))
+                write_begin = None
+        if write_begin is not None:
+            writes.append((write_begin, bytes(data[write_begin:])))
+        data.release()
+
+        resource_digests = [(resource_name, extension,
+                             cache._resource_digest(self.module_name, resource_name, extension))
+                            for resource_name, extension in sorted(set(resources))]
+
+        state_hash = hashlib.sha1(repr((self.input_state, self.module_name, rom.unallocated_ranges)).encode("utf-8"))
+        for offset, write_data in writes:
+            state_hash.update(repr((offset, len(write_data))).encode("utf-8"))
+            state_hash.update(write_data)
+        if self.module_class.PROVIDES_PROJECT_STATE:
+            # Other modules depend on what this module read from the project, not just on what it wrote to the ROM
+            state_hash.update(repr(resource_digests).encode("utf-8"))
+        output_state = state_hash.hexdigest()
+
+        cache._save_record(self.module_name, {
+            "source": _module_source_digest(self.module_class),
+            "input_state": self.input_state,
+            "resources": resource_digests,
+            "writes": writes,
+            "unallocated_ranges": list(rom.unallocated_ranges),
+            "deallocated_ranges": rom.deallocated_ranges[self.num_deallocated_ranges:],
+            "output_state": output_state
+        })
+        cache.state = output_state
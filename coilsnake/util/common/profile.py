@@ -0,0 +1,190 @@
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+
+# The names of the counters which modules' phases are profiled with
+COUNTER_ALLOCATE_CALLS = "allocate_calls"
+COUNTER_ALLOCATED_BYTES = "allocated_bytes"
+COUNTER_COMPRESSION_CALLS = "compression_calls"
+COUNTER_COMPRESSED_BYTES = "compressed_bytes"
+COUNTER_DECOMPRESSION_CALLS = "decompression_calls"
+
+# The file in a ModuleProfiler's output directory which its trace is written to
+TRACE_FILENAME = "trace.json"
+
+# The ModuleProfiler which is currently recording, if any
+_active_profiler = None
+
+
+def is_profiling():
+    return _active_profiler is not None
+
+
+def count(name, amount=1):
+    """Adds an amount to one of the counters of the phase which the active ModuleProfiler is recording, if any."""
+    profiler = _active_profiler
+    if profiler is not None and profiler._counters is not None:
+        profiler._counters[name] += amount
+
+
+@contextmanager
+def profile_phase(module_name, phase_name):
+    """Records one phase of a module, such as its read_from_rom, with the active ModuleProfiler, if there is one."""
+    profiler = _active_profiler
+    if profiler is None:
+        yield
+        return
+
+    with profiler.phase(module_name, phase_name):
+        yield
+
+
+class ModuleProfiler(object):
+    """Records how long each phase of each module takes, along with the phase's counters and the peak amount of memory
+    which it allocated, while it is started.
+    If the profiler has an output directory, each module is also profiled with cProfile, and when the profiler is
+    stopped each module's cProfile stats and a trace of all of the phases, which can be loaded in Chrome's trace viewer,
+    are written to the output directory."""
+
+    def __init__(self, output_directory=None, trace_memory=True):
+        """:param output_directory: the directory to write cProfile stats and the trace to, if any
+        :param trace_memory: whether to record the peak memory of each phase with tracemalloc, which slows everything
+                             down considerably"""
+        self.output_directory = output_directory
+        self.trace_memory = trace_memory
+        # A list of dicts describing each phase which was recorded, in the order the phases began
+        self.phases = []
+        self._counters = None
+        self._module_profiles = OrderedDict()
+        self._started_tracemalloc = False
+        self._start_time = None
+
+    def start(self):
+        global _active_profiler
+        _active_profiler = self
+        self._start_time = time.perf_counter()
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+
+    def stop(self):
+        global _active_profiler
+        if _active_profiler is self:
+            _active_profiler = None
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+        if self.output_directory:
+            os.makedirs(self.output_directory, exist_ok=True)
+            for module_name, profile in self._module_profiles.items():
+                profile.dump_stats(os.path.join(self.output_directory, "{}.prof".format(module_name)))
+            self.write_trace(os.path.join(self.output_directory, TRACE_FILENAME))
+
+    @contextmanager
+    def phase(self, module_name, phase_name):
+        if self._counters is not None:
+            # Phases don't nest, so a phase within a phase is recorded as part of the outer phase
+            yield
+            return
+
+        if self.output_directory:
+            try:
+                profile = self._module_profiles[module_name]
+            except KeyError:
+                # cProfile is only imported when it's needed, since this module is imported along with every Block
+                import cProfile
+                profile = self._module_profiles[module_name] = cProfile.Profile()
+        else:
+            profile = None
+
+        if self.trace_memory and tracemalloc.is_tracing():
+            if hasattr(tracemalloc, "reset_peak"):
+                tracemalloc.reset_peak()
+            start_memory = tracemalloc.get_traced_memory()[0]
+        else:
+            start_memory = None
+
+        self._counters = Counter()
+        start_time = time.perf_counter()
+        if profile is not None:
+            profile.enable()
+        try:
+            yield
+        finally:
+            if profile is not None:
+                profile.disable()
+            end_time = time.perf_counter()
+
+            if start_memory is not None:
+                peak_memory = max(tracemalloc.get_traced_memory()[1] - start_memory, 0)
+            else:
+                peak_memory = None
+
+            self.phases.append({"module": module_name,
+                                "phase": phase_name,
+                                "start": start_time - self._start_time,
+                                "duration": end_time - start_time,
+                                "peak_memory": peak_memory,
+                                "counters": dict(self._counters)})
+            self._counters = None
+
+    def write_trace(self, filename):
+        """Writes a trace of the recorded phases in the Trace Event Format, which Chrome's trace viewer can load."""
+        events = []
+        for phase in self.phases:
+            args = dict(phase["counters"])
+            if phase["peak_memory"] is not None:
+                args["peak_memory"] = phase["peak_memory"]
+            events.append({"name": phase["phase"],
+                           "cat": phase["module"],
+                           "ph": "X",
+                           "ts": int(phase["start"] * 1000000),
+                           "dur": int(phase["duration"] * 1000000),
+                           "pid": os.getpid(),
+                           "tid": 0,
+                           "args": args})
+
+        # Enclose each module's phases in an event for the module as a whole
+        module_spans = OrderedDict()
+        for phase in self.phases:
+            begin, end = module_spans.get(phase["module"], (phase["start"], phase["start"] + phase["duration"]))
+            module_spans[phase["module"]] = (min(begin, phase["start"]), max(end, phase["start"] + phase["duration"]))
+        for module_name, (begin, end) in module_spans.items():
+            events.append({"name": module_name,
+                           "cat": "module",
+                           "ph": "X",
+                           "ts": int(begin * 1000000),
+                           "dur": int((end - begin) * 1000000),
+                           "pid": os.getpid(),
+                           "tid": 0})
+
+        with open(filename, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+    def write_report(self, f=None):
+        """Writes a table of each recorded phase's time, counters and peak memory.
+        :param f: the stream to write to, which is stderr by default"""
+        if f is None:
+            f = sys.stderr
+
+        module_width = max([len("module")] + [len(phase["module"]) for phase in self.phases])
+        f.write("{:<{}} {:<18} {:>10} {:>9} {:>11} {:>9} {:>11} {:>11}\n".format(
+            "module", module_width, "phase", "time (ms)", "allocs", "alloc bytes", "compress", "decompress",
+            "peak (KiB)"))
+        for phase in self.phases:
+            counters = phase["counters"]
+            f.write("{:<{}} {:<18} {:>10.1f} {:>9} {:>11} {:>9} {:>11} {:>11}\n".format(
+                phase["module"], module_width, phase["phase"], 1000 * phase["duration"],
+                counters.get(COUNTER_ALLOCATE_CALLS, 0),
+                counters.get(COUNTER_ALLOCATED_BYTES, 0),
+                counters.get(COUNTER_COMPRESSION_CALLS, 0),
+                counters.get(COUNTER_DECOMPRESSION_CALLS, 0),
+                "-" if phase["peak_memory"] is None else phase["peak_memory"] // 1024))
+        f.write("{:<{}} {:<18} {:>10.1f}\n".format("total", module_width, "",
+                                                  1000 * sum([x["duration"] for x in self.phases])))
@@ -1,3 +1,4 @@
+import io
 import logging
 
 import os
@@ -38,11 +39,49 @@ def get_version_name(version):
         return "Unknown Version"
 
 
+def _write_file_if_changed(filename, data):
+    """Writes data to a file unless the file already contains exactly that data, in which case the file is left
+    untouched. Returns whether the file was written to."""
+    try:
+        if os.path.getsize(filename) == len(data):
+            with open(filename, "rb") as f:
+                if f.read() == data:
+                    return False
+    except OSError:
+        pass
+
+    with open(filename, "wb") as f:
+        f.write(data)
+    return True
+
+
+class _UnchangedFileSkippingBuffer(io.BytesIO):
+    """A buffer which is written to a file when it is closed, unless the file's contents would be unchanged."""
+
+    def __init__(self, filename, project):
+        super(_UnchangedFileSkippingBuffer, self).__init__()
+        self.name = filename
+        self._project = project
+
+    def close(self):
+        if not self.closed:
+            with self.getbuffer() as data:
+                if _write_file_if_changed(self.name, data):
+                    self._project.num_written_resources += 1
+                else:
+                    self._project.num_unchanged_resources += 1
+        super(_UnchangedFileSkippingBuffer, self).close()
+
+
 class Project(object):
     def __init__(self):
         self.romtype = "Unknown"
         self._resources = {}
         self._dir_name = ""
+        # Whether resources which are opened for writing should be left untouched if their contents don't change
+        self.skip_unchanged_resources = False
+        self.num_written_resources = 0
+        self.num_unchanged_resources = 0
 
     def load(self, f, romtype=None):
         if isinstance(f, str):
@@ -69,8 +108,7 @@ class Project(object):
                 self._resources = {}
         except IOError:
             # Project file doesn't exist
-            if not os.path.exists(self._dir_name):
-                os.makedirs(self._dir_name)
+            os.makedirs(self._dir_name, exist_ok=True)
             if romtype is None:
                 self.romtype = "Unknown"
             else:
@@ -82,9 +120,16 @@ class Project(object):
             'romtype': self.romtype,
             'resources': self._resources,
             'version': FORMAT_VERSION}
-        f = open(filename, 'w+')
-        yml_dump(tmp, f)
-        f.close()
+        if self.skip_unchanged_resources:
+            # Encode the data the same way that opening the file in text mode would
+            with io.TextIOWrapper(io.BytesIO()) as f:
+                yml_dump(tmp, f)
+                f.flush()
+                _write_file_if_changed(filename, f.buffer.getvalue())
+        else:
+            f = open(filename, 'w+')
+            yml_dump(tmp, f)
+            f.close()
 
     def get_resource(self, module_name, resource_name, extension="dat", mode="r+", encoding=None, newline=None):
         if module_name not in self._resources:
@@ -92,11 +137,30 @@ class Project(object):
         if resource_name not in self._resources[module_name]:
             self._resources[module_name][resource_name] = resource_name + "." + extension
         fname = os.path.join(self._dir_name, self._resources[module_name][resource_name])
-        if not os.path.exists(os.path.dirname(fname)):
-            os.makedirs(os.path.dirname(fname))
-        f = open(fname, mode, encoding=encoding, newline=newline)
+        # Modules may be decompiled in parallel, so another process may create the same directory at the same time
+        os.makedirs(os.path.dirname(fname), exist_ok=True)
+        if self.skip_unchanged_resources and mode in ("w", "wt", "wb"):
+            f = _UnchangedFileSkippingBuffer(fname, self)
+            if mode != "wb":
+                f = io.TextIOWrapper(f, encoding=encoding, newline=newline)
+        else:
+            f = open(fname, mode, encoding=encoding, newline=newline)
         return f
 
+    def get_resource_filename(self, module_name, resource_name, extension="dat"):
+        """Returns the filename of a resource, without adding the resource to the project if it isn't in it already."""
+        try:
+            relative_filename = self._resources[module_name][resource_name]
+        except KeyError:
+            relative_filename = resource_name + "." + extension
+        return os.path.join(self._dir_name, relative_filename)
+
+    def get_resources(self, module_name):
+        return self._resources.get(module_name)
+
+    def set_resources(self, module_name, resources):
+        self._resources[module_name] = resources
+
     def delete_resource(self, module_name, resource_name):
         if module_name not in self._resources:
             raise CoilSnakeError("No such module {}".format(module_name))
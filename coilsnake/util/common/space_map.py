@@ -0,0 +1,158 @@
+import colorsys
+from collections import OrderedDict
+import json
+import os
+
+from PIL import Image
+
+
+# The file in a space map's directory which the JSON space map is written to
+SPACE_MAP_FILENAME = "space_map.json"
+
+# The owner which the space which isn't part of any free range belongs to
+OWNER_FIXED = "(fixed)"
+# The owner which unallocated space belongs to
+OWNER_UNALLOCATED = "(unallocated)"
+
+_OWNER_COLORS = {OWNER_FIXED: (48, 48, 48), OWNER_UNALLOCATED: (0, 0, 0)}
+
+
+class AllocationJournal(object):
+    """Records each allocation, deallocation and range marked as allocated in an AllocatableBlock, along with the owner
+    which was responsible for it, such as the name of the module which was being compiled.
+    Attach a journal to a block by setting the block's allocation_journal."""
+
+    def __init__(self, block):
+        self.size = block.size
+        # The unallocated ranges which the block had when the journal was created
+        self.initial_unallocated_ranges = list(block.unallocated_ranges)
+        self.owner = None
+        # A list of dicts describing each event, in the order the events happened
+        self.entries = []
+
+    def record_allocate(self, offset, size, bank=None, not_bank=None, alignment=1):
+        """Records an allocation, where offset is None if the allocation failed."""
+        self.entries.append({"owner": self.owner,
+                             "action": "allocate",
+                             "begin": offset,
+                             "end": None if offset is None else offset + size - 1,
+                             "size": size,
+                             "bank": bank,
+                             "not_bank": not_bank,
+                             "alignment": alignment})
+
+    def record_mark_allocated(self, used_range):
+        self._record_range("mark_allocated", used_range)
+
+    def record_deallocate(self, range):
+        self._record_range("deallocate", range)
+
+    def record_replay(self, old_unallocated_ranges, new_unallocated_ranges):
+        """Records the ranges which became allocated when the block's unallocated ranges were replaced wholesale, as
+        when a module's previous compile is replayed."""
+        for used_range in _subtract_ranges(old_unallocated_ranges, new_unallocated_ranges):
+            self._record_range("replay", used_range)
+
+    def _record_range(self, action, range):
+        begin, end = range
+        self.entries.append({"owner": self.owner,
+                             "action": action,
+                             "begin": begin,
+                             "end": end,
+                             "size": end - begin + 1})
+
+    def owners(self):
+        """Returns a bytearray with the index in owner_names() of the owner of each byte of the block, according to
+        the journal."""
+        owner_indexes = dict([(owner, i) for i, owner in enumerate(self.owner_names())])
+        owners = bytearray(self.size)
+        for begin, end in self.initial_unallocated_ranges:
+            owners[begin:end + 1] = bytes([1]) * (end - begin + 1)
+        for entry in self.entries:
+            if entry["begin"] is None:
+                continue
+            elif entry["action"] == "deallocate":
+                owner_index = 1
+            else:
+                owner_index = owner_indexes[entry["owner"]]
+            owners[entry["begin"]:entry["end"] + 1] = bytes([owner_index]) * entry["size"]
+        return owners
+
+    def owner_names(self):
+        names = [OWNER_FIXED, OWNER_UNALLOCATED]
+        for entry in self.entries:
+            if entry["owner"] not in names:
+                names.append(entry["owner"])
+        return names
+
+    def write_space_map(self, directory):
+        """Writes a JSON summary of how the block's space is used, along with the journal itself, and a PNG image for
+        each bank which contains any free range, where each byte of the bank is a pixel colored by its owner."""
+        os.makedirs(directory, exist_ok=True)
+
+        owner_names = self.owner_names()
+        owners = self.owners()
+        colors = [_OWNER_COLORS.get(name) or _owner_color(i - 2, len(owner_names) - 2)
+                  for i, name in enumerate(owner_names)]
+
+        owner_summaries = OrderedDict([(name, OrderedDict([("allocated_bytes", 0),
+                                                           ("allocations", 0),
+                                                           ("failed_allocations", 0),
+                                                           ("freed_bytes", 0)]))
+                                       for name in owner_names[2:]])
+        for entry in self.entries:
+            summary = owner_summaries[entry["owner"]]
+            if entry["action"] == "deallocate":
+                summary["freed_bytes"] += entry["size"]
+            elif entry["begin"] is None:
+                summary["failed_allocations"] += 1
+            else:
+                summary["allocated_bytes"] += entry["size"]
+                summary["allocations"] += 1
+
+        banks = OrderedDict()
+        for bank in range((self.size + 0xffff) >> 16):
+            bank_owners = owners[bank << 16:(bank + 1) << 16]
+            if bank_owners.count(0) == len(bank_owners):
+                continue
+
+            owner_sizes = [(name, bank_owners.count(i)) for i, name in enumerate(owner_names)]
+            banks["{:#04x}".format(bank)] = OrderedDict([(name, size) for name, size in owner_sizes if size])
+
+            image = Image.new("P", (256, 256))
+            image.putpalette([component for color in colors for component in color])
+            image.putdata(bank_owners + bytes(0x10000 - len(bank_owners)))
+            image.save(os.path.join(directory, "bank_{:02x}.png".format(bank)))
+
+        space_map = OrderedDict([("size", self.size),
+                                 ("colors", OrderedDict([(name, "#{:02x}{:02x}{:02x}".format(*color))
+                                                         for name, color in zip(owner_names, colors)])),
+                                 ("owners", owner_summaries),
+                                 ("banks", banks),
+                                 ("journal", self.entries)])
+        with open(os.path.join(directory, SPACE_MAP_FILENAME), "w") as f:
+            json.dump(space_map, f, indent=1)
+
+
+def _owner_color(i, num_owners):
+    # Spread the owners' hues out evenly, and alternate their brightness so that neighboring owners stand out
+    red, green, blue = colorsys.hsv_to_rgb(i / max(num_owners, 1), 0.8, 1.0 if i % 2 == 0 else 0.7)
+    return int(red * 255), int(green * 255), int(blue * 255)
+
+
+def _subtract_ranges(ranges, other_ranges):
+    """Returns the parts of a sorted list of non-overlapping (begin, end) ranges which aren't in another such list."""
+    result = []
+    other_ranges = iter(other_ranges)
+    other = next(other_ranges, None)
+    for begin, end in ranges:
+        while begin <= end:
+            while other is not None and other[1] < begin:
+                other = next(other_ranges, None)
+            if other is None or other[0] > end:
+                result.append((begin, end))
+                break
+            if other[0] > begin:
+                result.append((begin, other[0] - 1))
+            begin = other[1] + 1
+    return result
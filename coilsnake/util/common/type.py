@@ -1,3 +1,8 @@
+import io
+import pickle
+import sys
+
+
 class EqualityMixin(object):
     def __eq__(self, other):
         return (isinstance(other, self.__class__)
@@ -62,4 +67,30 @@ class GenericEnum(object):
 def enum_class_from_name_list(names):
     return type("CustomEnum",
                 (GenericEnum,),
-                dict(zip([str(x).upper() for x in names], range(len(names)))))
\ No newline at end of file
+                dict(zip([str(x).upper() for x in names], range(len(names)))))
+
+
+class DynamicTypePickler(pickle.Pickler):
+    """A Pickler which can also pickle classes that were created at runtime with type(), such as the classes generated
+    for table schemas. Such classes are pickled by value, as their name, bases, and attributes, rather than by
+    reference."""
+
+    def reducer_override(self, obj):
+        if isinstance(obj, type) and not _is_importable_type(obj):
+            return type, (obj.__name__,
+                          obj.__bases__,
+                          dict((k, v) for k, v in vars(obj).items() if k not in ("__dict__", "__weakref__")))
+        return NotImplemented
+
+
+def _is_importable_type(t):
+    obj = sys.modules.get(t.__module__)
+    for name in t.__qualname__.split("."):
+        obj = getattr(obj, name, None)
+    return obj is t
+
+
+def pickle_dumps(obj):
+    f = io.BytesIO()
+    DynamicTypePickler(f, protocol=pickle.HIGHEST_PROTOCOL).dump(obj)
+    return f.getvalue()
@@ -6,7 +6,7 @@ import traceback
 import yaml
 from yaml.scanner import ScannerError
 
-from coilsnake.exceptions.common.exceptions import CoilSnakeUnexpectedError, InvalidYmlFileError
+from coilsnake.exceptions.common.exceptions import CoilSnakeError, CoilSnakeUnexpectedError, InvalidYmlFileError
 from coilsnake.util.common.helper import lower_if_str
 
 
@@ -20,6 +20,95 @@ def convert_values_to_hex_repr(yml_str_rep, key):
                   yml_str_rep)
 
 
+# The number of items which yml_dump_items dumps at a time
+_ITEMS_PER_DUMP = 64
+
+
+class _HexInt(int):
+    """An integer which is dumped in hexadecimal."""
+    pass
+
+
+class _HexIntDumper(yaml.CSafeDumper):
+    pass
+
+
+_HexIntDumper.add_representer(
+    _HexInt, lambda dumper, data: dumper.represent_scalar("tag:yaml.org,2002:int", "{:#x}".format(data)))
+
+
+def _with_hex_values(yml_rep, hex_labels):
+    """Returns a copy of a yml representation in which the non-negative integer values of keys ending with one of the
+    hex_labels, at any depth, are dumped in hexadecimal. These are the values which convert_values_to_hex_repr would
+    convert in the dumped yml."""
+    if isinstance(yml_rep, dict):
+        return dict((key, _HexInt(value) if type(value) is int and value >= 0 and isinstance(key, str)
+                     and key.endswith(hex_labels)
+                     else _with_hex_values(value, hex_labels))
+                    for key, value in yml_rep.items())
+    elif isinstance(yml_rep, list):
+        return [_with_hex_values(x, hex_labels) for x in yml_rep]
+    else:
+        return yml_rep
+
+
+def yml_dump_items(items, f, hex_labels=None, default_flow_style=None):
+    """Writes a mapping to a file one item at a time, so that the whole mapping never needs to be held in memory.
+    The output is the same as that of yml_dump(dict(items)) followed by convert_values_to_hex_repr for each of the
+    hex_labels, as long as the items are in sorted order of their keys.
+    :param items: an iterable of (key, value) tuples, sorted by key
+    :param f: the file to write to
+    :param hex_labels: keys whose integer values should be written in hexadecimal
+    :param default_flow_style: the default_flow_style of the mapping, which must be None or False"""
+    hex_labels = tuple(hex_labels or [])
+
+    def dump(yml_rep, dump_default_flow_style):
+        if not hex_labels:
+            yaml.dump(yml_rep, f, default_flow_style=dump_default_flow_style, Dumper=yaml.CSafeDumper)
+        elif dump_default_flow_style is False:
+            yaml.dump(_with_hex_values(yml_rep, hex_labels), f, default_flow_style=False,
+                      Dumper=_HexIntDumper)
+        else:
+            # Flow style collections are wrapped according to the width of their values, so the values are converted
+            # to hexadecimal after dumping in order to wrap in the same places as they always have
+            yml_str_rep = yaml.dump(yml_rep, default_flow_style=dump_default_flow_style, Dumper=yaml.CSafeDumper)
+            for hex_label in hex_labels:
+                yml_str_rep = convert_values_to_hex_repr(yml_str_rep, hex_label)
+            f.write(yml_str_rep)
+
+    def dump_batch(batch):
+        if default_flow_style is None and not any(isinstance(value, (dict, list)) for _, value in batch):
+            # The mapping is in block style, but a mapping of only scalars would be dumped in flow style
+            dump(dict(batch), False)
+        else:
+            dump(dict(batch), default_flow_style)
+
+    # With a default_flow_style of None, a mapping is only written in block style if it contains a collection, so
+    # items are held back until the first collection is found
+    batch = []
+    is_block_style = default_flow_style is False
+    is_empty = True
+    try:
+        for item in items:
+            batch.append(item)
+            is_block_style = is_block_style or isinstance(item[1], (dict, list))
+            # Dumping a batch of items as a mapping produces the same lines as they would have as part of the whole
+            # mapping, since the items of a block mapping are all written at the same indentation
+            if is_block_style and len(batch) >= _ITEMS_PER_DUMP:
+                dump_batch(batch)
+                batch = []
+                is_empty = False
+
+        if is_block_style and batch:
+            dump_batch(batch)
+        elif is_empty:
+            dump(dict(batch), default_flow_style)
+    except CoilSnakeError:
+        raise
+    except:
+        raise CoilSnakeUnexpectedError(traceback.format_exc())
+
+
 def replace_field_in_yml(resource_name, resource_open_r, resource_open_w, key, new_key=None, value_map=None):
     """Replaces all instances of a key-value pair in a yml resource with a new key and/or value.
     :param resource_name: name of resource to operate on
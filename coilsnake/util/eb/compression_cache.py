@@ -0,0 +1,75 @@
+import hashlib
+import logging
+import os
+import tempfile
+
+
+log = logging.getLogger(__name__)
+
+DEFAULT_MAX_SIZE = 64 * 1024 * 1024
+
+
+class CompressionCache(object):
+    """An on-disk cache of compressed data, keyed by a hash of the uncompressed data.
+    Each entry is stored as its own file in the cache's directory. Entries are evicted in least recently used order,
+    using the files' modification times, whenever trim() is called and the cache is larger than its maximum size."""
+
+    def __init__(self, path, max_size=DEFAULT_MAX_SIZE):
+        """Creates a new CompressionCache.
+        :param path: the directory in which to store the cache, which is created if it doesn't exist
+        :param max_size: the maximum total size in bytes of the cached data"""
+        self.path = path
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+
+    def _entry_filename(self, data):
+        return os.path.join(self.path, hashlib.sha1(data).hexdigest())
+
+    def get(self, data):
+        """Returns the cached compressed form of the uncompressed data, or None if it is not in the cache.
+        :param data: the uncompressed data, as a bytes-like object"""
+        filename = self._entry_filename(data)
+        try:
+            with open(filename, "rb") as f:
+                compressed_data = f.read()
+            # Mark this entry as recently used
+            os.utime(filename)
+        except OSError:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return compressed_data
+
+    def put(self, data, compressed_data):
+        """Adds the compressed form of the uncompressed data to the cache.
+        :param data: the uncompressed data, as a bytes-like object
+        :param compressed_data: the compressed data, as a bytes-like object"""
+        try:
+            os.makedirs(self.path, exist_ok=True)
+            # Write to a temporary file first so that an interrupted write never leaves a partial entry in the cache
+            fd, temp_filename = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(compressed_data)
+            os.replace(temp_filename, self._entry_filename(data))
+        except OSError as e:
+            log.debug("Could not write to compression cache[{}]: {}".format(self.path, e))
+
+    def trim(self):
+        """Removes the least recently used entries from the cache until it is no larger than its maximum size."""
+        try:
+            entries = [entry for entry in os.scandir(self.path) if entry.is_file()]
+        except OSError:
+            return
+
+        entries = [(entry.stat().st_mtime, entry.stat().st_size, entry.path) for entry in entries]
+        size = sum([entry_size for _, entry_size, _ in entries])
+        for _, entry_size, entry_path in sorted(entries):
+            if size <= self.max_size:
+                break
+            try:
+                os.remove(entry_path)
+                size -= entry_size
+            except OSError:
+                pass
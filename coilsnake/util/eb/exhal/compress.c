@@ -196,6 +196,12 @@ void free_offsets(tuple_t *offsets) {
 // unpacked/packed are 65536 byte buffers to read/from write to, 
 // Returns the size of the uncompressed data in bytes or 0 if decompression failed.
 size_t unpack(uint8_t *packed, uint8_t *unpacked) {
+	return unpack_sized(packed, unpacked, NULL);
+}
+
+// Same as unpack(), but also stores the size of the compressed data in bytes (including the end of data byte)
+// in packedsize, if it isn't NULL.
+size_t unpack_sized(uint8_t *packed, uint8_t *unpacked, size_t *packedsize) {
 	// current input/output positions
 	uint32_t  inpos = 0;
 	uint32_t  outpos = 0;
@@ -318,6 +324,8 @@ size_t unpack(uint8_t *packed, uint8_t *unpacked) {
 	printf("\nCompressed size:   %u bytes\n", inpos);
 #endif
 
+	if (packedsize)
+		*packedsize = (size_t)inpos;
 	return (size_t)outpos;
 }
 
@@ -40,6 +40,7 @@ extern "C" {
 
 size_t pack   (uint8_t *unpacked, size_t inputsize, uint8_t *packed, int fast);
 size_t unpack (uint8_t *packed, uint8_t *unpacked);
+size_t unpack_sized (uint8_t *packed, uint8_t *unpacked, size_t *packedsize);
 
 size_t unpack_from_file (FILE *file, size_t offset, uint8_t *unpacked);
 
@@ -129,6 +129,75 @@ def write_8bpp_graphic_to_block(source, target, offset, x=0, y=0):
     return 64
 
 
+# The following functions read and write whole sequences of graphics at once. Instead of handling each pixel one bit at
+# a time, they handle an entire 8-pixel row at once by treating the row as a 64-bit integer with one byte per pixel.
+# _BITPLANE_SPREAD maps each byte of a bitplane to such an integer, with bit 7 (the leftmost pixel) of the bitplane byte
+# spread into the most significant byte of the integer. Combining the spread bitplanes with shifts and ors gives the
+# row's pixel values, which int.to_bytes then splits into individual pixels.
+_BITPLANE_SPREAD = tuple(sum(((b >> j) & 1) << (8 * j) for j in range(8)) for b in range(256))
+# Used to reverse the spreading: masking a row with _BITPLANE_MASK leaves one bit per pixel, and multiplying it by
+# _BITPLANE_GATHER moves the eight bits into the most significant byte of the product.
+_BITPLANE_MASK = 0x0101010101010101
+_BITPLANE_GATHER = 0x0102040810204080
+
+
+def read_graphic_rows(data, bpp):
+    """Reads the rows of pixels from 8-pixel wide graphics stored in a 1, 2, 4, or 8 bits-per-pixel format.
+    :param data: a bytes-like object containing the graphical data, whose length must be a multiple of the size of one
+                 8x8 graphic if bpp is not 1
+    :param bpp: the number of bits per pixel
+    :return: a list of rows, each of which is a bytes object containing the row's 8 pixels. The rows are in the same
+             order as they are stored in, so for bpp other than 1, each group of 8 rows is one 8x8 graphic."""
+    spread = _BITPLANE_SPREAD
+    if bpp == 1:
+        return [spread[b].to_bytes(8, "big") for b in data]
+    elif bpp == 2:
+        return [(spread[data[i]] | (spread[data[i + 1]] << 1)).to_bytes(8, "big")
+                for i in range(0, len(data), 2)]
+    elif bpp == 4:
+        return [(spread[data[i]]
+                 | (spread[data[i + 1]] << 1)
+                 | (spread[data[i + 16]] << 2)
+                 | (spread[data[i + 17]] << 3)).to_bytes(8, "big")
+                for tile_offset in range(0, len(data), 32) for i in range(tile_offset, tile_offset + 16, 2)]
+    elif bpp == 8:
+        return [(spread[data[i]]
+                 | (spread[data[i + 1]] << 1)
+                 | (spread[data[i + 16]] << 2)
+                 | (spread[data[i + 17]] << 3)
+                 | (spread[data[i + 32]] << 4)
+                 | (spread[data[i + 33]] << 5)
+                 | (spread[data[i + 48]] << 6)
+                 | (spread[data[i + 49]] << 7)).to_bytes(8, "big")
+                for tile_offset in range(0, len(data), 64) for i in range(tile_offset, tile_offset + 16, 2)]
+    else:
+        raise NotImplementedError("Don't know how to read graphical data of bpp[{}]".format(bpp))
+
+
+def write_graphic_rows(rows, bpp):
+    """Writes rows of pixels to 8-pixel wide graphics stored in a 1, 2, 4, or 8 bits-per-pixel format. This is the
+    reverse of read_graphic_rows.
+    :param rows: a sequence of rows, each of which is a sequence of 8 pixel values from 0 to 255. For bpp other than 1,
+                 the number of rows must be a multiple of 8.
+    :param bpp: the number of bits per pixel
+    :return: a bytes object containing the graphical data"""
+    mask = _BITPLANE_MASK
+    gather = _BITPLANE_GATHER
+    values = [int.from_bytes(bytes(row), "big") for row in rows]
+    if bpp == 1:
+        return bytes([((value & mask) * gather) >> 56 & 0xff for value in values])
+
+    out = bytearray(len(values) * bpp)
+    i = 0
+    for tile_offset in range(0, len(values), 8):
+        for plane in range(0, bpp, 2):
+            for value in values[tile_offset:tile_offset + 8]:
+                out[i] = (((value >> plane) & mask) * gather) >> 56 & 0xff
+                out[i + 1] = (((value >> (plane + 1)) & mask) * gather) >> 56 & 0xff
+                i += 2
+    return bytes(out)
+
+
 def hash_tile(tile):
     csum = 0
     for col in tile:
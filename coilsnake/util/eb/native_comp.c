@@ -41,8 +41,9 @@ static PyObject* comp(PyObject* self, PyObject* args) {
                 udata[i] = (uint8_t) n;
 	}
 
-	// Allocate a buffer
-	buffer = (uint8_t*) malloc(sizeof(uint8_t) * (size + 1));
+	// Allocate a buffer. The compressed data can be larger than the uncompressed data, so make room for as much
+	// data as pack() can write.
+	buffer = (uint8_t*) malloc(sizeof(uint8_t) * DATA_SIZE);
 	csize = pack(udata, size, buffer, 1);
 	free(udata);
 
@@ -124,9 +125,120 @@ static PyObject* decomp(PyObject* self, PyObject* args) {
         return ulist;
 }
 
+// Compresses any object supporting the buffer protocol, such as bytes, bytearray, array or memoryview.
+// Returns the compressed data as a bytes object.
+static PyObject* comp_bytes(PyObject* self, PyObject* args) {
+        Py_buffer udata;
+        PyObject *result;
+        size_t csize;
+        uint8_t *buffer;
+
+        if (!PyArg_ParseTuple(args, "y*", &udata))
+                return NULL;
+
+        if (udata.len > DATA_SIZE) {
+                PyBuffer_Release(&udata);
+                return PyErr_Format(PyExc_ValueError, "can't compress more than %d bytes (%zd given)", DATA_SIZE,
+                                    udata.len), NULL;
+        }
+
+        buffer = (uint8_t*) malloc(sizeof(uint8_t) * DATA_SIZE);
+        if (!buffer) {
+                PyBuffer_Release(&udata);
+                return PyErr_NoMemory();
+        }
+        // pack() doesn't touch any Python objects, so other threads can run while it works
+        Py_BEGIN_ALLOW_THREADS
+        csize = pack((uint8_t*) udata.buf, (size_t) udata.len, buffer, 1);
+        Py_END_ALLOW_THREADS
+        PyBuffer_Release(&udata);
+
+        if (csize == 0) {
+                free(buffer);
+                return PyErr_Format(PyExc_ValueError, "compressed data would be larger than %d bytes", DATA_SIZE), NULL;
+        }
+
+        result = PyBytes_FromStringAndSize((const char*) buffer, (Py_ssize_t) csize);
+        free(buffer);
+        return result;
+}
+
+// The most compressed data that unpack() can read before it either finishes or gives up, which is when every command
+// is a four byte long backref of a single byte
+#define MAX_PACKED_SIZE (4 * DATA_SIZE + 4)
+
+// Decompresses the data at an offset of any object supporting the buffer protocol, such as bytes, bytearray, array,
+// memoryview or mmap. Returns the decompressed data as a bytes object, which is empty if the data was invalid. If
+// with_size is set, returns a tuple of the decompressed data and the size of the compressed data instead.
+static PyObject* decompress(PyObject* args, int with_size) {
+        Py_buffer cdata;
+        Py_ssize_t offset;
+        PyObject *result;
+        size_t size, packed_size = 0;
+        uint8_t *packed, *padded_packed = NULL, *buffer;
+
+        if (!PyArg_ParseTuple(args, "y*n", &cdata, &offset))
+                return NULL;
+
+        if (offset < 0 || offset >= cdata.len) {
+                PyBuffer_Release(&cdata);
+                return PyErr_Format(PyExc_ValueError, "offset %zd is out of bounds of data of size %zd", offset,
+                                    cdata.len), NULL;
+        }
+
+        packed = (uint8_t*) cdata.buf + offset;
+        if (cdata.len - offset < MAX_PACKED_SIZE) {
+                // unpack() doesn't know where the data ends, so give it zeroes to read past the end instead
+                padded_packed = (uint8_t*) calloc(MAX_PACKED_SIZE, sizeof(uint8_t));
+                if (!padded_packed) {
+                        PyBuffer_Release(&cdata);
+                        return PyErr_NoMemory();
+                }
+                memcpy(padded_packed, packed, cdata.len - offset);
+                packed = padded_packed;
+        }
+
+        // Backrefs in invalid data can refer to up to a run's length before or after the output, so pad it on
+        // both sides
+        buffer = (uint8_t*) calloc(DATA_SIZE + 2 * LONG_RUN_SIZE, sizeof(uint8_t));
+        if (!buffer) {
+                free(padded_packed);
+                PyBuffer_Release(&cdata);
+                return PyErr_NoMemory();
+        }
+        Py_BEGIN_ALLOW_THREADS
+        size = unpack_sized(packed, buffer + LONG_RUN_SIZE, &packed_size);
+        Py_END_ALLOW_THREADS
+        free(padded_packed);
+        PyBuffer_Release(&cdata);
+
+        if (size == 0)
+                packed_size = 0;
+        result = PyBytes_FromStringAndSize((const char*) buffer + LONG_RUN_SIZE, (Py_ssize_t) size);
+        free(buffer);
+        if (result && with_size)
+                // The N format steals the reference to result
+                result = Py_BuildValue("(Nn)", result, (Py_ssize_t) packed_size);
+        return result;
+}
+
+static PyObject* decomp_bytes(PyObject* self, PyObject* args) {
+        return decompress(args, 0);
+}
+
+// Same as decomp_bytes, but returns a tuple of the decompressed data and the size of the compressed data, which is 0
+// if the data was invalid
+static PyObject* decomp_bytes_with_size(PyObject* self, PyObject* args) {
+        return decompress(args, 1);
+}
+
 static PyMethodDef native_comp_methods[] = {
 	{"comp", comp, METH_VARARGS, "C implementation of EB's comp()"},
 	{"decomp", decomp, METH_VARARGS, "C implementation of EB's decomp()"},
+	{"comp_bytes", comp_bytes, METH_VARARGS, "C implementation of EB's comp() for bytes-like objects"},
+	{"decomp_bytes", decomp_bytes, METH_VARARGS, "C implementation of EB's decomp() for bytes-like objects"},
+	{"decomp_bytes_with_size", decomp_bytes_with_size, METH_VARARGS,
+	 "C implementation of EB's decomp() for bytes-like objects, which also returns the size of the compressed data"},
 	{NULL, NULL, 0, NULL}
 };
 
@@ -1,3 +1,6 @@
+import codecs
+
+
 class CharacterSubstitutions(object):
     character_substitutions = dict()
 
@@ -13,6 +16,16 @@ def standard_text_from_block(block, offset, max_length):
     return str
 
 
+# The character which each byte of standard text represents, where bytes which don't represent characters are
+# undefined so that decoding them raises a ValueError
+_STANDARD_TEXT_DECODING_TABLE = "".join([chr(c - 0x30) if c >= 0x30 else "\ufffe" for c in range(0x100)])
+
+
+def standard_text_from_bytes(data):
+    """Decodes standard text in the same way as standard_text_from_block, but from a bytes-like object."""
+    return codecs.charmap_decode(data.split(b"\0", 1)[0], "strict", _STANDARD_TEXT_DECODING_TABLE)[0]
+
+
 def standard_text_to_byte_list(text, max_length):
     # First, substitute all of the characters
     if CharacterSubstitutions.character_substitutions:
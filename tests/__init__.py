@@ -0,0 +1,10 @@
+import atexit
+import shutil
+import tempfile
+
+from coilsnake.util.common import assets
+
+
+# Keep the parsed assets which the tests load out of the user's real asset cache
+assets.ASSET_CACHE_PATH = tempfile.mkdtemp(prefix="coilsnake-test-asset-cache-")
+atexit.register(shutil.rmtree, assets.ASSET_CACHE_PATH, ignore_errors=True)
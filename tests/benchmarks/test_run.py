@@ -0,0 +1,41 @@
+from nose.tools import assert_equal
+
+from benchmarks.run import find_regressions, summarize
+
+
+def test_summarize():
+    summary = summarize({"eb.MapModule": {"read_from_rom": [0.3, 0.1, 0.2],
+                                          "write_to_project": [1.0, 2.0],
+                                          "read_from_project": [0.5],
+                                          "write_to_rom": [0.25, 0.75]},
+                         "eb.FontModule": {"read_from_rom": [0.5],
+                                           "write_to_project": [0.5],
+                                           "read_from_project": [0.5],
+                                           "write_to_rom": [0.5]}})
+
+    assert_equal(summary["modules"]["eb.MapModule"]["read_from_rom"]["min"], 0.1)
+    assert_equal(summary["modules"]["eb.MapModule"]["read_from_rom"]["median"], 0.2)
+    assert_equal(summary["modules"]["eb.MapModule"]["write_to_project"]["median"], 1.5)
+    assert_equal(summary["totals"]["read_from_rom"], 0.6)
+    assert_equal(summary["totals"]["write_to_rom"], 0.75)
+
+
+def test_find_regressions():
+    baseline_summary = summarize({"eb.MapModule": {"read_from_rom": [1.0],
+                                                   "write_to_project": [1.0],
+                                                   "read_from_project": [0.01],
+                                                   "write_to_rom": [1.0]}})
+    summary = summarize({"eb.MapModule": {"read_from_rom": [1.1],
+                                          "write_to_project": [1.5],
+                                          "read_from_project": [0.03],
+                                          "write_to_rom": [0.5]},
+                         "eb.FontModule": {"read_from_rom": [1.0],
+                                           "write_to_project": [1.0],
+                                           "read_from_project": [1.0],
+                                           "write_to_rom": [1.0]}})
+
+    # Small slowdowns, phases which are too fast to time reliably, and modules which aren't in the baseline are ignored
+    assert_equal(find_regressions(summary, baseline_summary, threshold=0.2),
+                 [("eb.MapModule", "write_to_project", 1.0, 1.5)])
+    assert_equal(find_regressions(summary, baseline_summary, threshold=0.05),
+                 [("eb.MapModule", "read_from_rom", 1.0, 1.1), ("eb.MapModule", "write_to_project", 1.0, 1.5)])
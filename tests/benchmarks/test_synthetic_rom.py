@@ -0,0 +1,79 @@
+import os
+import shutil
+import tempfile
+
+from nose.tools import assert_equal
+
+from benchmarks.synthetic_rom import create_synthetic_rom, SYNTHETIC_ROM_SIZE
+from coilsnake.model.common.blocks import Rom
+from coilsnake.modules.eb.FontModule import FontModule
+from coilsnake.modules.eb.SwirlModule import SwirlModule
+from coilsnake.modules.eb.TitleScreenModule import TitleScreenModule
+from coilsnake.ui.common import load_modules
+from coilsnake.util.common.project import Project, PROJECT_FILENAME
+
+
+class TestSyntheticRom(object):
+    @classmethod
+    def setup_class(cls):
+        cls.temporary_directory = tempfile.mkdtemp()
+        cls.rom_filename = os.path.join(cls.temporary_directory, "synthetic.smc")
+        create_synthetic_rom(cls.rom_filename, seed=1)
+
+    @classmethod
+    def teardown_class(cls):
+        shutil.rmtree(cls.temporary_directory)
+
+    def test_create_synthetic_rom(self):
+        rom = Rom()
+        rom.from_file(self.rom_filename)
+        assert_equal(rom.type, "Earthbound")
+        assert_equal(rom.size, SYNTHETIC_ROM_SIZE)
+
+    def test_round_trip(self):
+        rom = Rom()
+        rom.from_file(self.rom_filename)
+
+        for module_class in [TitleScreenModule, SwirlModule, FontModule]:
+            decompiled_project_path = self._decompile_module(module_class, rom, "decompiled")
+
+            # Compile the project into a fresh copy of the ROM, the same way compile_project does
+            compiled_rom = Rom()
+            compiled_rom.from_file(self.rom_filename)
+            for _, clazz in load_modules():
+                if clazz.is_compatible_with_romtype(compiled_rom.type):
+                    for free_range in clazz.FREE_RANGES:
+                        compiled_rom.deallocate(free_range)
+            project = Project()
+            project.load(os.path.join(decompiled_project_path, PROJECT_FILENAME), compiled_rom.type)
+            with module_class() as module:
+                module.read_from_project(
+                    lambda x, y, astext=False: project.get_resource(
+                        "module", x, y, 'rt' if astext else 'rb', 'utf-8' if astext else None))
+                module.write_to_rom(compiled_rom)
+
+            recompiled_project_path = self._decompile_module(module_class, compiled_rom, "recompiled")
+            assert_equal(self._read_files(recompiled_project_path), self._read_files(decompiled_project_path))
+
+    def _decompile_module(self, module_class, rom, name):
+        project_path = os.path.join(self.temporary_directory, module_class.__name__, name)
+        os.makedirs(project_path)
+        project = Project()
+        project.load(os.path.join(project_path, PROJECT_FILENAME), rom.type)
+        with module_class() as module:
+            module.read_from_rom(rom)
+            module.write_to_project(
+                lambda x, y, astext=False: project.get_resource(
+                    "module", x, y, 'wt' if astext else 'wb', 'utf-8' if astext else None, '\n' if astext else None))
+        return project_path
+
+    @staticmethod
+    def _read_files(path):
+        files = {}
+        for directory, _, filenames in os.walk(path):
+            for filename in filenames:
+                if filename == PROJECT_FILENAME:
+                    continue
+                with open(os.path.join(directory, filename), "rb") as f:
+                    files[os.path.relpath(os.path.join(directory, filename), path)] = f.read()
+        return files
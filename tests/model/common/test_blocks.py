@@ -1,10 +1,14 @@
+import gc
 import os
+from shutil import copyfile
+import tempfile
 
 from nose.tools import assert_equal, assert_not_equal, assert_raises, assert_list_equal, assert_false, assert_true, \
     assert_is_instance
 from nose.tools.nontrivial import raises
 
-from coilsnake.model.common.blocks import Block, AllocatableBlock, Rom, ROM_TYPE_NAME_UNKNOWN
+from coilsnake.model.common.blocks import Block, AllocatableBlock, Rom, ROM_TYPE_NAME_UNKNOWN, \
+    ALLOCATION_STRATEGY_FIRST_FIT, ALLOCATION_STRATEGY_BEST_FIT, detect_rom_type
 from tests.coilsnake_test import BaseTestCase, TEST_DATA_DIR
 from coilsnake.exceptions.common.exceptions import FileAccessError, OutOfBoundsError, InvalidArgumentError, \
     CouldNotAllocateError, NotEnoughUnallocatedSpaceError
@@ -29,6 +33,50 @@ class TestBlock(BaseTestCase):
         assert_equal(len(self.block), 1024)
         assert_list_equal(self.block.to_list(), [0] * 1024)
 
+    def test_from_file_mapped(self):
+        with tempfile.TemporaryDirectory() as temporary_directory:
+            filename = os.path.join(temporary_directory, "1kb_rand.bin")
+            copyfile(os.path.join(TEST_DATA_DIR, "binaries", "1kb_rand.bin"), filename)
+
+            self.block.from_file(filename, mapped=True)
+            assert_true(self.block.is_mapped())
+            assert_equal(len(self.block), 1024)
+            assert_equal(self.block[0], 0x25)
+            assert_equal(self.block[0x25c:0x25c + 5].to_list(), [0xa0, 0x0b, 0x71, 0x5d, 0x91])
+
+            view = self.block[0:2]
+            self.block[0:2] = [0xaa, 0xbb]
+            self.block.write_multi(1022, 0xccdd, 2)
+            assert_list_equal(view.to_list(), [0x25, 0x20])
+            self.block.to_file(filename)
+            with open(filename, "rb") as f:
+                data = f.read()
+            assert_equal(data[0:2], b"\xaa\xbb")
+            assert_equal(data[1022:1024], b"\xdd\xcc")
+
+            self.block._resize(1030)
+            self.block[1029] = 0xee
+            self.block.to_file(filename)
+            with open(filename, "rb") as f:
+                assert_equal(f.read()[1022:], b"\xdd\xcc" + b"\x00" * 5 + b"\xee")
+
+            self.block.from_list([0])
+            assert_false(self.block.is_mapped())
+
+    def test_from_file_mapped_read_only(self):
+        with tempfile.TemporaryDirectory() as temporary_directory:
+            filename = os.path.join(temporary_directory, "1kb_rand.bin")
+            copyfile(os.path.join(TEST_DATA_DIR, "binaries", "1kb_rand.bin"), filename)
+
+            self.block.from_file(filename, mapped=True, read_only=True)
+            assert_true(self.block.is_mapped())
+            assert_equal(self.block[0x25c:0x25c + 5].to_list(), [0xa0, 0x0b, 0x71, 0x5d, 0x91])
+            assert_raises(TypeError, self.block.write_multi, 0, 0xaabb, 2)
+            del self.block.data
+
+            with open(filename, "rb") as f:
+                assert_equal(f.read()[0:2], b"\x25\x20")
+
     def test_from_file_unhappy(self):
         # Attempt to load a directory
         assert_raises(FileAccessError, self.block.from_file, TEST_DATA_DIR)
@@ -50,6 +98,17 @@ class TestBlock(BaseTestCase):
         assert_equal(len(self.block), 1)
         assert_list_equal(self.block.to_list(), [69])
 
+    def test_from_bytes(self):
+        self.block.from_bytes(b"\x00\x01\x02")
+        assert_equal(len(self.block), 3)
+        assert_list_equal(self.block.to_list(), [0, 1, 2])
+
+        data = bytearray(b"\x05\x06")
+        self.block.from_bytes(memoryview(data))
+        data[0] = 0
+        assert_equal(len(self.block), 2)
+        assert_list_equal(self.block.to_list(), [5, 6])
+
     def test_getitem(self):
         self.block.from_file(os.path.join(TEST_DATA_DIR, "binaries", "1kb_rand.bin"))
 
@@ -79,6 +138,59 @@ class TestBlock(BaseTestCase):
         assert_raises(InvalidArgumentError, self.block.__getitem__, slice(1024, -1))
         assert_raises(InvalidArgumentError, self.block.__getitem__, slice(1022, 3))
 
+    def test_getitem_slice_view(self):
+        self.block.from_list([0, 1, 2, 3, 4, 5, 6, 7])
+        view = self.block[2:6]
+        view_of_view = view[1:3]
+        assert_true(view.is_view())
+        assert_true(view_of_view.is_view())
+        assert_false(self.block.is_view())
+        assert_list_equal(view_of_view.to_list(), [3, 4])
+
+        # Writing to the original block leaves its existing views unchanged
+        self.block[3] = 0xaa
+        self.block.write_multi(4, 0xbbcc, 2)
+        assert_list_equal(self.block.to_list(), [0, 1, 2, 0xaa, 0xcc, 0xbb, 6, 7])
+        assert_list_equal(view.to_list(), [2, 3, 4, 5])
+        assert_list_equal(view_of_view.to_list(), [3, 4])
+        assert_false(view.is_view())
+        assert_false(view_of_view.is_view())
+
+        # Writing to a view leaves the original block unchanged
+        view = self.block[2:6]
+        view[0] = 0xdd
+        assert_list_equal(view.to_list(), [0xdd, 0xaa, 0xcc, 0xbb])
+        assert_equal(self.block[2], 2)
+
+        from_block = Block()
+        from_block.from_block(self.block, offset=6, size=2)
+        assert_true(from_block.is_view())
+        self.block[6:8] = self.block[0:2]
+        assert_list_equal(self.block.to_list(), [0, 1, 2, 0xaa, 0xcc, 0xbb, 0, 1])
+        assert_list_equal(from_block.to_list(), [6, 7])
+
+    def test_getitem_slice_view_of_collected_view(self):
+        # Views of views are still copied when the original block is written to after the views between them are gone
+        self.block.from_list(list(range(10)))
+        view = self.block[0:8]
+        view_of_view = view[2:6]
+        del view
+        gc.collect()
+        self.block[3] = 0xaa
+        assert_list_equal(view_of_view.to_list(), [2, 3, 4, 5])
+
+        from_block = Block()
+        from_block.from_block(self.block[0:8], 2, 4)
+        gc.collect()
+        self.block[4] = 0xbb
+        assert_list_equal(from_block.to_list(), [2, 0xaa, 4, 5])
+
+        view = self.block[1:9]
+        view._resize(4)
+        view._remove_leading_bytes(1)
+        self.block[2] = 0xcc
+        assert_list_equal(view.to_list(), [2, 0xaa, 0xbb])
+
     def test_setitem(self):
         self.block.from_file(os.path.join(TEST_DATA_DIR, "binaries", "1kb_rand.bin"))
 
@@ -149,6 +261,41 @@ class TestBlock(BaseTestCase):
         assert_raises(OutOfBoundsError, self.block.write_multi, 1, 0, 6)
         assert_raises(OutOfBoundsError, self.block.write_multi, 3, 0, 4)
 
+    def test_read_multi_list(self):
+        self.block.from_list([0x03, 0xa1, 0x44, 0x15, 0x92, 0x65])
+
+        assert_list_equal(self.block.read_multi_list(0, 1, 6), [0x03, 0xa1, 0x44, 0x15, 0x92, 0x65])
+        assert_list_equal(self.block.read_multi_list(0, 2, 3), [0xa103, 0x1544, 0x6592])
+        assert_list_equal(self.block.read_multi_list(1, 2, 2), [0x44a1, 0x9215])
+        assert_list_equal(self.block.read_multi_list(0, 3, 2), [0x44a103, 0x659215])
+        assert_list_equal(self.block.read_multi_list(1, 4, 1), [0x921544a1])
+        assert_list_equal(self.block.read_multi_list(0, 6, 1), [0x659215_44a103])
+        assert_list_equal(self.block.read_multi_list(6, 2, 0), [])
+        assert_list_equal(self.block[1:5].read_multi_list(0, 2, 2), [0x44a1, 0x9215])
+
+        assert_raises(InvalidArgumentError, self.block.read_multi_list, 0, 0, 1)
+        assert_raises(InvalidArgumentError, self.block.read_multi_list, 0, 2, -1)
+        assert_raises(OutOfBoundsError, self.block.read_multi_list, -1, 1, 1)
+        assert_raises(OutOfBoundsError, self.block.read_multi_list, 1, 2, 3)
+        assert_raises(OutOfBoundsError, self.block.read_multi_list, 0, 4, 2)
+
+    def test_write_multi_list(self):
+        self.block.from_list([0x03, 0xa1, 0x44, 0x15, 0x92, 0x65])
+
+        self.block.write_multi_list(0, [], 2)
+        assert_list_equal(self.block.to_list(), [0x03, 0xa1, 0x44, 0x15, 0x92, 0x65])
+        self.block.write_multi_list(1, [0xa1b2, 0x1ffee], 2)
+        assert_list_equal(self.block.to_list(), [0x03, 0xb2, 0xa1, 0xee, 0xff, 0x65])
+        self.block.write_multi_list(0, [0x010203, 0x040506], 3)
+        assert_list_equal(self.block.to_list(), [0x03, 0x02, 0x01, 0x06, 0x05, 0x04])
+        self.block.write_multi_list(2, [0xaabbccdd], 4)
+        assert_list_equal(self.block.to_list(), [0x03, 0x02, 0xdd, 0xcc, 0xbb, 0xaa])
+
+        assert_raises(InvalidArgumentError, self.block.write_multi_list, 0, [0], 0)
+        assert_raises(OutOfBoundsError, self.block.write_multi_list, -1, [0], 1)
+        assert_raises(OutOfBoundsError, self.block.write_multi_list, 3, [0, 0], 2)
+        assert_raises(OutOfBoundsError, self.block.write_multi_list, 0, [0, 0], 4)
+
     def test_len(self):
         self.block.from_list([0x03, 0xa1, 0x44, 0x15, 0x92, 0x65])
         assert_equal(len(self.block), 6)
@@ -156,6 +303,29 @@ class TestBlock(BaseTestCase):
         assert_equal(len(self.block), 0)
 
 
+    def test_data_cache(self):
+        self.block.from_list([0x03, 0xa1, 0x44, 0x15, 0x92, 0x65])
+        self.block.data_cache()["key"] = 1
+        assert_equal(self.block.data_cache(), {"key": 1})
+
+        # Reading doesn't discard the cache
+        self.block.read_multi(0, 2)
+        with self.block[0:2] as view:
+            view.data_cache()["view key"] = 2
+        assert_equal(self.block.data_cache(), {"key": 1})
+
+        self.block[0] = 0x03
+        assert_equal(self.block.data_cache(), {})
+
+        self.block.data_cache()["key"] = 1
+        self.block.write_multi_list(0, [1], 2)
+        assert_equal(self.block.data_cache(), {})
+
+        self.block.data_cache()["key"] = 1
+        self.block.from_list([1])
+        assert_equal(self.block.data_cache(), {})
+
+
 class TestAllocatableBlock(TestBlock):
     def setup(self):
         self.block = AllocatableBlock()
@@ -180,6 +350,24 @@ class TestAllocatableBlock(TestBlock):
         self.block.deallocate((4, 9))
         assert_list_equal(self.block.unallocated_ranges, [(0, 2), (4, 9)])
 
+        # Adjacent and overlapping ranges are merged
+        self.block.deallocate((3, 3))
+        assert_list_equal(self.block.unallocated_ranges, [(0, 9)])
+        self.block.deallocate((2, 5))
+        assert_list_equal(self.block.unallocated_ranges, [(0, 9)])
+
+    def test_deallocate_across_banks(self):
+        self.block.from_list([0] * 0x20010)
+        self.block.deallocate((0x10000, 0x10005))
+        self.block.deallocate((0xfff0, 0xffff))
+        self.block.deallocate((0x10006, 0x1ffff))
+        self.block.deallocate((0x20000, 0x2000f))
+        # Ranges which are adjacent across a bank boundary are not merged
+        assert_list_equal(self.block.unallocated_ranges, [(0xfff0, 0xffff), (0x10000, 0x1ffff), (0x20000, 0x2000f)])
+        # Ranges which already overlap across a bank boundary are merged
+        self.block.deallocate((0xfff8, 0x10008))
+        assert_list_equal(self.block.unallocated_ranges, [(0xfff0, 0x1ffff), (0x20000, 0x2000f)])
+
     def test_mark_allocated(self):
         self.block.from_list([0] * 10)
         assert_raises(InvalidArgumentError, self.block.mark_allocated, (1, 0))
@@ -259,8 +447,9 @@ class TestAllocatableBlock(TestBlock):
         assert_true(self.block.is_unallocated((4, 5)))
         assert_true(self.block.is_unallocated((9, 9)))
         assert_true(self.block.is_unallocated((1, 1)))
+        assert_true(self.block.is_unallocated((1, 4)))
         assert_false(self.block.is_unallocated((0, 1)))
-        assert_false(self.block.is_unallocated((1, 4)))
+        assert_false(self.block.is_unallocated((1, 6)))
         assert_false(self.block.is_unallocated((0, 4)))
         assert_false(self.block.is_unallocated((0, 9)))
         assert_false(self.block.is_unallocated((1, 9)))
@@ -294,8 +483,82 @@ class TestAllocatableBlock(TestBlock):
     def test_allocate_across_ranges(self):
         self.block.from_list([0] * 100)
         self.block.deallocate((0, 5))
-        self.block.deallocate((6, 9))
-        assert_raises(NotEnoughUnallocatedSpaceError, self.block.allocate, None, 10)
+        self.block.deallocate((7, 9))
+        assert_raises(NotEnoughUnallocatedSpaceError, self.block.allocate, None, 9)
+        # Adjacent ranges are merged, so they can be allocated from as a single range
+        self.block.deallocate((6, 6))
+        assert_equal(self.block.allocate(size=10), 0)
+
+        self.block.from_list([0] * 0x20000)
+        self.block.deallocate((0xfff8, 0xffff))
+        self.block.deallocate((0x10000, 0x10007))
+        assert_raises(NotEnoughUnallocatedSpaceError, self.block.allocate, None, 9)
+
+    def test_allocate_in_bank(self):
+        self.block.from_list([0] * 0x30000)
+        self.block.deallocate((0xff00, 0xffff))
+        self.block.deallocate((0x10000, 0x100ff))
+        self.block.deallocate((0x1ff00, 0x1ffff))
+        self.block.deallocate((0x20000, 0x2ffff))
+
+        assert_equal(self.block.allocate(size=0x10, bank=0x1), 0x10000)
+        assert_equal(self.block.allocate(size=0x10, not_bank=0x0), 0x10010)
+        assert_equal(self.block.allocate(size=0x100, not_bank=0x1), 0xff00)
+        # Doesn't fit in the first range in the bank, so the next range in the bank is used
+        assert_equal(self.block.allocate(size=0xf0, bank=0x1), 0x1ff00)
+        assert_equal(self.block.allocate(size=0x20, not_bank=0x2), 0x10020)
+        assert_raises(NotEnoughUnallocatedSpaceError, self.block.allocate, None, 0xc1, None, 0x1)
+        assert_raises(NotEnoughUnallocatedSpaceError, self.block.allocate, None, 1, None, 0x0)
+        assert_equal(self.block.allocate(size=0x10, bank=0x1), 0x10040)
+        assert_equal(self.block.allocate(size=1, bank=0x2), 0x20000)
+
+    def test_allocate_aligned(self):
+        self.block.from_list([0] * 100)
+        self.block.deallocate((3, 0x1f))
+        assert_equal(self.block.allocate(size=16, alignment=0x10), 0x10)
+        assert_list_equal(self.block.unallocated_ranges, [(3, 0xf)])
+        assert_raises(NotEnoughUnallocatedSpaceError, self.block.allocate, None, 2, None, None, None, 0x10)
+        assert_equal(self.block.allocate(size=2, alignment=4), 4)
+        assert_list_equal(self.block.unallocated_ranges, [(3, 3), (6, 0xf)])
+
+    def test_allocate_best_fit(self):
+        self.block.from_list([0] * 100)
+        self.block.deallocate((0, 9))
+        self.block.deallocate((20, 24))
+        self.block.deallocate((30, 35))
+
+        assert_equal(self.block.allocate(size=5, strategy=ALLOCATION_STRATEGY_FIRST_FIT), 0)
+        self.block.deallocate((0, 4))
+        assert_equal(self.block.allocate(size=5, strategy=ALLOCATION_STRATEGY_BEST_FIT), 20)
+        assert_equal(self.block.allocate(size=5, strategy=ALLOCATION_STRATEGY_BEST_FIT), 30)
+        self.block.allocation_strategy = ALLOCATION_STRATEGY_BEST_FIT
+        assert_equal(self.block.allocate(size=1), 35)
+        assert_list_equal(self.block.unallocated_ranges, [(0, 9)])
+        assert_raises(InvalidArgumentError, self.block.allocate, None, 1, None, None, None, 1, "not-a-strategy")
+
+    def test_get_unallocated_space_by_bank(self):
+        self.block.from_list([0] * 0x30000)
+        assert_equal(self.block.get_unallocated_space_by_bank(), dict())
+        self.block.deallocate((0, 3))
+        self.block.deallocate((10, 15))
+        self.block.deallocate((0x20000, 0x2ffff))
+        self.block.unallocated_ranges.insert(2, (0xfffe, 0x10001))
+        assert_equal(self.block.get_unallocated_space_by_bank(),
+                     {0x0: (12, 3, 6), 0x1: (2, 1, 2), 0x2: (0x10000, 1, 0x10000)})
+
+    def test_get_allocatable_space_by_bank(self):
+        self.block.from_list([0] * 0x30000)
+        self.block.unallocated_ranges = [(0x20, 0x2f)]
+        assert_equal(self.block.get_allocatable_space_by_bank(), {0x0: 0x10})
+        assert_equal(self.block.get_allocatable_space_by_bank([(0x20, 0x2f), (0x28, 0x3f)]), {0x0: 0x20})
+
+        # Space which was deallocated and then allocated again is still allocatable
+        self.block.deallocate((0xfff0, 0x1000f))
+        self.block.allocate(size=0x10, bank=0x1)
+        self.block.allocate(size=0x10, bank=0x0)
+        self.block.deallocate((0x20000, 0x2ffff))
+        self.block.allocate(size=0x10000)
+        assert_equal(self.block.get_allocatable_space_by_bank([(0x20, 0x2f)]), {0x0: 0x20, 0x1: 0x10, 0x2: 0x10000})
 
 
 class TestRom(TestAllocatableBlock):
@@ -316,6 +579,19 @@ class TestRom(TestAllocatableBlock):
         self.block.from_file(os.path.join(TEST_DATA_DIR, "roms", "real_EarthBound.smc"))
         assert_equal(self.block.type, "Earthbound")
 
+    def test_detect_rom_type_of_file(self):
+        filename = os.path.join(TEST_DATA_DIR, "roms", "EB_fake_header.smc")
+        with open(filename, "rb") as f:
+            data = f.read()
+        assert_equal(detect_rom_type(filename), "Earthbound")
+        with open(filename, "rb") as f:
+            assert_equal(f.read(), data)
+
+        assert_equal(detect_rom_type(os.path.join(TEST_DATA_DIR, "roms", "EB_fake_noheader.smc")), "Earthbound")
+        assert_equal(detect_rom_type(os.path.join(TEST_DATA_DIR, "binaries", "empty.bin")), ROM_TYPE_NAME_UNKNOWN)
+        assert_equal(detect_rom_type(os.path.join(TEST_DATA_DIR, "binaries", "1kb_null.bin")), ROM_TYPE_NAME_UNKNOWN)
+        assert_raises(FileAccessError, detect_rom_type, os.path.join(TEST_DATA_DIR, "binaries", "missing.bin"))
+
     @raises(NotImplementedError)
     def test_add_header_unknown(self):
         self.block.from_list([0])
@@ -329,6 +605,49 @@ class TestRom(TestAllocatableBlock):
         assert_equal(len(self.block.data), 0x300200)
         assert_equal(self.block[0:0x200].to_list(), [0] * 0x200)
 
+    def test_add_header_eb_mapped(self):
+        with tempfile.TemporaryDirectory() as temporary_directory:
+            filename = os.path.join(temporary_directory, "rom.smc")
+            copyfile(os.path.join(TEST_DATA_DIR, "roms", "EB_fake_header.smc"), filename)
+
+            # The header is removed from the mapped file when it is detected
+            self.block.from_file(filename, mapped=True)
+            assert_equal(self.block.type, "Earthbound")
+            assert_equal(self.block.size, 0x10000)
+            with open(os.path.join(TEST_DATA_DIR, "roms", "EB_fake_noheader.smc"), "rb") as f:
+                assert_equal(self.block.to_list(), list(f.read()))
+
+            self.block.add_header()
+            self.block.to_file(filename)
+            assert_equal(os.path.getsize(filename), 0x10200)
+            assert_equal(self.block[0:0x200].to_list(), [0] * 0x200)
+            del self.block.data
+
+    def test_from_file_mapped_read_only_with_header(self):
+        # The header is removed from a copy of the ROM, since it can't be removed from a file which is mapped read-only
+        self.block.from_file(os.path.join(TEST_DATA_DIR, "roms", "EB_fake_header.smc"), mapped=True, read_only=True)
+        assert_false(self.block.is_mapped())
+        assert_equal(self.block.type, "Earthbound")
+        assert_equal(self.block.size, 0x10000)
+        assert_equal(os.path.getsize(os.path.join(TEST_DATA_DIR, "roms", "EB_fake_header.smc")), 0x10200)
+
+    def test_expand_eb_mapped(self):
+        with tempfile.TemporaryDirectory() as temporary_directory:
+            filename = os.path.join(temporary_directory, "rom.smc")
+            copyfile(os.path.join(TEST_DATA_DIR, "roms", "EB_fake_noheader.smc"), filename)
+            with open(filename, "r+b") as f:
+                f.truncate(0x300000)
+
+            self.block.from_file(filename, mapped=True)
+            assert_equal(self.block.size, 0x300000)
+            self.block.expand(0x600000)
+            self.block.to_file(filename)
+            assert_equal(os.path.getsize(filename), 0x600000)
+            assert_equal(self.block[0xffd5], 0x25)
+            assert_list_equal(self.block[0x300000:0x400000].to_list(), [0] * 0x100000)
+            assert_list_equal(self.block[0x408000:0x410000].to_list(), self.block[0x8000:0x10000].to_list())
+            del self.block.data
+
     @raises(NotImplementedError)
     def test_expand_unknown(self):
         self.block.from_list([0])
@@ -1,11 +1,14 @@
-from nose.tools import assert_dict_equal, assert_list_equal, assert_raises, assert_equal, assert_is_instance
+import pickle
+
+from nose.tools import assert_dict_equal, assert_list_equal, assert_raises, assert_equal, assert_is_instance, \
+    assert_is_none
 from nose.tools.nontrivial import raises
 
 from coilsnake.exceptions.common.exceptions import TableError, \
     TableEntryInvalidYmlRepresentationError, TableEntryMissingDataError, TableSchemaError
 from coilsnake.model.common.blocks import Block
 from coilsnake.model.common.table import Table, GenericLittleEndianRowTableEntry, BitfieldTableEntry
-from coilsnake.util.common.type import GenericEnum
+from coilsnake.util.common.type import GenericEnum, pickle_dumps
 from tests.coilsnake_test import BaseTestCase
 
 
@@ -29,6 +32,16 @@ class GenericTestTable(BaseTestCase):
 
         assert_list_equal(block.to_list(), self.BLOCK_DATA)
 
+    def test_from_block_rows_matches_from_block(self):
+        block = Block()
+        block.from_list(self.BLOCK_DATA)
+        rows = [self.TABLE_SCHEMA.from_block(block, i * self.TABLE_SCHEMA.size)
+                for i in range(len(self.TABLE_VALUES))]
+
+        assert_list_equal(self.TABLE_SCHEMA.from_block_rows(block, 0, len(self.TABLE_VALUES)), rows)
+        # Rows which run past the end of the block can't be read all at once
+        assert_is_none(self.TABLE_SCHEMA.from_block_rows(block, 1, len(self.TABLE_VALUES)))
+
     def test_from_yml_rep(self):
         table = Table(num_rows=len(self.TABLE_VALUES),
                       schema=self.TABLE_SCHEMA)
@@ -56,6 +69,15 @@ class GenericTestTable(BaseTestCase):
             if expected_error_cause:
                 assert_is_instance(e.cause.cause, expected_error_cause)
 
+    def test_pickle(self):
+        table = Table(num_rows=len(self.TABLE_VALUES),
+                      schema=self.TABLE_SCHEMA)
+        table.values = self.TABLE_VALUES
+        unpickled_table = pickle.loads(pickle_dumps(table))
+
+        assert_list_equal(unpickled_table.values, self.TABLE_VALUES)
+        assert_dict_equal(unpickled_table.to_yml_rep(), self.YML_REP)
+
 
 class TestGenericLittleEndianTable(GenericTestTable):
     TABLE_SCHEMA_SPECIFICATION = [
@@ -205,6 +227,17 @@ class TestGenericLittleEndianTable(GenericTestTable):
                      {0: dict(YML_REP[0], **{"Bitfield": [8]})}),
     ]
 
+    def test_to_block_truncates_out_of_range_values(self):
+        # Values which can't be packed are written one at a time, which only writes their low bytes
+        block = Block()
+        block.from_list([0] * len(self.BLOCK_DATA))
+        table = Table(num_rows=len(self.TABLE_VALUES),
+                      schema=self.TABLE_SCHEMA)
+        table.values = [[0x148] + self.TABLE_VALUES[0][1:], self.TABLE_VALUES[1]]
+        table.to_block(block, 0)
+
+        assert_list_equal(block.to_list(), self.BLOCK_DATA)
+
 
 class TestBitfieldTableEntry(BaseTestCase):
     enumeration_class = GenericEnum.create(name="test", values=["a", "b", "c"])
@@ -0,0 +1,53 @@
+from nose.tools import assert_equal, assert_list_equal, assert_raises, assert_is_none
+
+from coilsnake.exceptions.eb.exceptions import InvalidEbCompressedDataError
+from coilsnake.model.common.blocks import Block
+from coilsnake.model.eb.blocks import EbCompressibleBlock
+from coilsnake.modules.eb.EbModule import comp_bytes
+from tests.coilsnake_test import BaseTestCase
+
+
+class TestEbCompressibleBlock(BaseTestCase):
+    def setup(self):
+        self.uncompressed_data = list(range(32)) * 8
+        self.compressed_data = list(comp_bytes(bytes(self.uncompressed_data)))
+        self.block = Block()
+        self.block.from_list([0xaa] * 4 + self.compressed_data + [0xbb] * 4)
+
+    def teardown(self):
+        del self.block
+
+    def test_from_compressed_block(self):
+        with EbCompressibleBlock() as compressed_block:
+            assert_is_none(compressed_block.compressed_size)
+            compressed_block.from_compressed_block(block=self.block, offset=4)
+            assert_list_equal(compressed_block.to_list(), self.uncompressed_data)
+            assert_equal(compressed_block.compressed_size, len(self.compressed_data))
+
+        with EbCompressibleBlock() as compressed_block:
+            assert_raises(InvalidEbCompressedDataError, compressed_block.from_compressed_block, self.block,
+                          4 + len(self.compressed_data))
+
+    def test_from_compressed_block_cache(self):
+        with EbCompressibleBlock() as compressed_block:
+            compressed_block.from_compressed_block(block=self.block, offset=4)
+            compressed_block[0] = 0xff
+        assert_equal(len(self.block.data_cache()), 1)
+
+        # Data read again is read from the cache, and isn't affected by writes to previously returned blocks
+        with EbCompressibleBlock() as compressed_block:
+            compressed_block.from_compressed_block(block=self.block, offset=4)
+            assert_list_equal(compressed_block.to_list(), self.uncompressed_data)
+
+        # Writing to the compressed block discards the cache
+        self.block[4 + len(self.compressed_data) - 1] = 0
+        assert_equal(len(self.block.data_cache()), 0)
+        with EbCompressibleBlock() as compressed_block:
+            assert_raises(InvalidEbCompressedDataError, compressed_block.from_compressed_block, self.block, 4)
+
+    def test_compress(self):
+        with EbCompressibleBlock() as compressed_block:
+            compressed_block.from_list(self.uncompressed_data)
+            compressed_block.compress()
+            assert_list_equal(compressed_block.to_list(), self.compressed_data)
+            assert_equal(compressed_block.compressed_size, len(self.compressed_data))
@@ -551,6 +551,36 @@ class TestEbGraphicTileset(BaseTestCase, TilesetImageTestCase):
         tile2_id, tile2_vflip, tile2_hflip = tileset.add_tile(tile)
         assert_not_equal(tile2_id, tile1_id)
 
+    def test_tile_views(self):
+        tileset = EbGraphicTileset(num_tiles=2, tile_width=8, tile_height=8)
+        tileset.tiles = [None, None]
+        tileset[1][2][3] = 5
+        assert_equal(tileset.tiles[1][2][3], 5)
+        assert_equal(tileset.get_tile_data(1)[2 * 8 + 3], 5)
+
+        tileset.tiles[0] = tileset[1]
+        assert_list_equal(tileset[0], tileset[1])
+        tileset.clear_tile(1, color=3)
+        assert_list_equal(tileset[1], [[3] * 8] * 8)
+        assert_equal(tileset[0][2][3], 5)
+
+        assert_raises(IndexError, tileset.__getitem__, 2)
+        assert_raises(InvalidArgumentError, tileset.set_tile_data, 0, [0] * 63)
+
+    def test_eq(self):
+        tileset = EbGraphicTileset(num_tiles=4, tile_width=8, tile_height=8)
+        tileset2 = EbGraphicTileset(num_tiles=4, tile_width=8, tile_height=8)
+        assert_equal(tileset, tileset2)
+
+        tile = [array('B', [x ^ y for x in range(8)]) for y in range(8)]
+        tileset.add_tile(tile)
+        assert_not_equal(tileset, tileset2)
+        tileset2.add_tile(tile)
+        assert_equal(tileset, tileset2)
+
+        tileset2[0][0][0] = 9
+        assert_not_equal(tileset, tileset2)
+
 
 class TestEbTileArrangementItem(BaseTestCase):
     def test_init(self):
@@ -674,6 +704,26 @@ class TestEbTileArrangement(BaseTestCase, TilesetImageTestCase):
         assert_raises(InvalidArgumentError, arrangement.__getitem__, (1, 2))
         assert_raises(InvalidArgumentError, arrangement.__getitem__, (3, 0))
 
+    def test_item_views(self):
+        arrangement = EbTileArrangement(2, 2)
+        item = arrangement[1, 0]
+        item.tile = 0x3f5
+        item.subpalette = 2
+        item.is_horizontally_flipped = True
+        assert_equal(arrangement[1, 0].to_int(), 0x4000 | (2 << 10) | 0x3f5)
+        assert_equal(arrangement[1, 0], EbTileArrangementItem(tile=0x3f5, subpalette=2, is_horizontally_flipped=True))
+        assert_equal(arrangement[0, 0].to_int(), 0)
+
+        item.is_horizontally_flipped = False
+        assert_equal(arrangement.arrangement[0][1].to_int(), (2 << 10) | 0x3f5)
+        assert_raises(InvalidArgumentError, setattr, item, "tile", 0x400)
+        assert_raises(InvalidArgumentError, setattr, item, "subpalette", 8)
+
+        arrangement2 = EbTileArrangement(2, 2)
+        assert_not_equal(arrangement, arrangement2)
+        arrangement2[1, 0].from_int(item.to_int())
+        assert_equal(arrangement, arrangement2)
+
     def test_from_image_single_subpalette(self):
         palette = EbPalette(1, 2)
         tileset = EbGraphicTileset(num_tiles=6, tile_width=8, tile_height=8)
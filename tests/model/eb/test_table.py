@@ -1,6 +1,10 @@
+from nose.tools import assert_is, assert_is_not, assert_list_equal
+
 from coilsnake.exceptions.common.exceptions import TableEntryInvalidYmlRepresentationError, TableSchemaError
+from coilsnake.model.common.blocks import Block
+from coilsnake.model.common.table import Table
 from coilsnake.model.eb.palettes import EbPalette
-from coilsnake.model.eb.table import EbRowTableEntry
+from coilsnake.model.eb.table import EbRowTableEntry, eb_table_from_offset
 from tests.model.common.test_table import TestGenericLittleEndianTable, GenericTestTable
 
 
@@ -112,4 +116,23 @@ class TestEbTable(GenericTestTable):
                      {0: dict(YML_REP[0], **{"EB Null-Terminated Text": None})}),
                     (0, "EB Null-Terminated Text", TableSchemaError, TableEntryInvalidYmlRepresentationError,
                      {0: dict(YML_REP[0], **{"EB Null-Terminated Text": "2long"})}),
-    ]
\ No newline at end of file
+    ]
+
+    def test_to_block_leaves_bytes_after_text_untouched(self):
+        block = Block()
+        block.from_list([0xff] * len(self.BLOCK_DATA))
+        table = Table(num_rows=len(self.TABLE_VALUES),
+                      schema=self.TABLE_SCHEMA)
+        table.values = self.TABLE_VALUES
+        table.to_block(block, 0)
+
+        expected_block_data = list(self.BLOCK_DATA)
+        # Only the text and its terminator are written, so the byte after "G!" and its terminator is untouched
+        expected_block_data[48] = 0xff
+        assert_list_equal(block.to_list(), expected_block_data)
+
+
+def test_eb_table_from_offset_reuses_schema():
+    table = eb_table_from_offset(0xD00000)
+    assert_is(eb_table_from_offset(0xD00000).schema, table.schema)
+    assert_is_not(eb_table_from_offset(0xD00000, hidden_columns=["Name"]).schema, table.schema)
@@ -1,9 +1,10 @@
 import array
 import os
+import random
 from zlib import crc32
 
 from nose.tools import nottest
-from nose.tools import assert_equal
+from nose.tools import assert_equal, assert_greater
 
 from coilsnake.modules.eb import EbModule
 from coilsnake.model.common.blocks import Rom
@@ -49,6 +50,29 @@ class TestEbModule(BaseTestCase):
         assert_equal(len(reuncompressed_data), len(uncompressed_data))
         assert_equal(reuncompressed_data, uncompressed_data)
 
+    @nottest
+    def test_comp_bytes(self, comp_bytes, decomp_bytes):
+        with open(os.path.join(TEST_DATA_DIR, "binaries", "compressible.bin"), 'rb') as f:
+            uncompressed_data = f.read()
+
+        compressed_data = comp_bytes(array.array('B', uncompressed_data))
+        assert_equal(len(compressed_data), 58)
+        assert_equal(compressed_data, comp_bytes(memoryview(uncompressed_data)))
+
+        data = bytearray(0x100) + compressed_data + bytearray(0x100)
+        assert_equal(decomp_bytes(data, 0x100), uncompressed_data)
+        assert_equal(decomp_bytes(memoryview(data)[0x100:], 0), uncompressed_data)
+
+        # Data which doesn't compress well can be larger when compressed
+        rng = random.Random(0)
+        incompressible_data = bytes([rng.randrange(256) for i in range(4096)])
+        compressed_data = comp_bytes(incompressible_data)
+        assert_greater(len(compressed_data), len(incompressible_data))
+        assert_equal(decomp_bytes(compressed_data, 0), incompressible_data)
+
+        # Data which ends before the end of its compressed data is invalid
+        assert_equal(decomp_bytes(compressed_data[:-1], 0), b"")
+
     @nottest
     def _test_python_comp(self):
         self.test_comp(EbModule._comp, EbModule.decomp)
@@ -67,4 +91,22 @@ class TestEbModule(BaseTestCase):
         self.test_comp(EbModule.comp, EbModule.decomp)
 
     def test_default_decomp(self):
-        self.test_decomp(EbModule.decomp)
\ No newline at end of file
+        self.test_decomp(EbModule.decomp)
+
+    def test_native_comp_bytes(self):
+        self.test_comp_bytes(native_comp.comp_bytes, native_comp.decomp_bytes)
+
+    def test_default_comp_bytes(self):
+        self.test_comp_bytes(EbModule.comp_bytes, EbModule.decomp_bytes)
+
+    def test_comp_many(self):
+        rng = random.Random(0)
+        buffers = [bytes([rng.randrange(4)] * rng.randrange(1, 0x2000)) for i in range(16)]
+        buffers += [bytes([rng.randrange(256) for i in range(0x1000)]), b"\x01"]
+
+        compressed_datas = EbModule.comp_many(buffers)
+        assert_equal(compressed_datas, [EbModule.comp_bytes(data) for data in buffers])
+        assert_equal([EbModule.decomp_bytes(data, 0) for data in compressed_datas], buffers)
+
+        assert_equal(EbModule.comp_many([]), [])
+        assert_equal(EbModule.comp_many(buffers[:1]), [EbModule.comp_bytes(buffers[0])])
@@ -0,0 +1,135 @@
+import io
+import os
+import tempfile
+
+from nose.tools import assert_equal, assert_raises, assert_true
+
+from coilsnake.exceptions.common.exceptions import InvalidUserDataError
+from coilsnake.model.common.blocks import Rom
+from coilsnake.modules.eb.MapModule import MapModule, MAP_HEIGHT, MAP_POINTERS_OFFSET, MAP_WIDTH, \
+    map_tiles_sidecar_filename
+from coilsnake.util.eb.pointer import to_snes_address
+from tests.coilsnake_test import BaseTestCase, TEST_DATA_DIR
+
+
+class TestMapModule(BaseTestCase):
+    def setup(self):
+        self.module = MapModule()
+        self.rom = Rom()
+        self.rom.from_file(os.path.join(TEST_DATA_DIR, "roms", "EB_fake_24mbit.smc"))
+
+        # Point the map at eight separate sections of the ROM, like in EarthBound
+        map_pointers_offset = 0x174000
+        self.rom.write_multi(MAP_POINTERS_OFFSET, to_snes_address(map_pointers_offset), 3)
+        for i in range(8):
+            self.rom.write_multi(map_pointers_offset + i * 4, to_snes_address(0x160000 + i * 0x2800), 4)
+
+    def teardown(self):
+        del self.module
+        del self.rom
+
+    def write_resources(self):
+        resources = {}
+
+        def resource_open(name, extension, astext):
+            f = resources[name] = io.StringIO()
+            f.close = lambda: None
+            return f
+
+        self.module.write_to_project(resource_open)
+        return dict([(name, f.getvalue()) for name, f in resources.items()])
+
+    def write_map_text(self):
+        return self.write_resources()["map_tiles"]
+
+    def read_map_text(self, map_text):
+        resources = self.write_resources()
+        resources["map_tiles"] = map_text
+        self.module.read_from_project(lambda name, extension, astext: io.StringIO(resources[name]))
+
+    def test_read_and_write_to_rom(self):
+        self.module.read_from_rom(self.rom)
+        assert_equal(len(self.module.tiles), MAP_HEIGHT)
+        for row in self.module.tiles:
+            assert_equal(len(row), MAP_WIDTH)
+
+        self.module.tiles[0][0] = 0x3ff
+        self.module.tiles[5][17] = 0x123
+        self.module.tiles[MAP_HEIGHT - 1][MAP_WIDTH - 1] = 0x201
+        self.module.write_to_rom(self.rom)
+
+        tiles = [list(row) for row in self.module.tiles]
+        self.module = MapModule()
+        self.module.read_from_rom(self.rom)
+        assert_equal([list(row) for row in self.module.tiles], tiles)
+
+    def test_write_to_project(self):
+        self.module.read_from_rom(self.rom)
+        self.module.tiles[0][0] = 0x3ff
+        self.module.tiles[0][1] = 0x00a
+        map_text = self.write_map_text()
+
+        lines = map_text.split("\n")
+        assert_equal(len(lines), MAP_HEIGHT + 1)
+        assert_equal(lines[-1], "")
+        assert_equal(lines[0][:8], "3ff 00a ")
+        assert_equal(lines[0], " ".join(["{:03x}".format(x) for x in self.module.tiles[0]]))
+
+    def test_read_from_project(self):
+        self.module.read_from_rom(self.rom)
+        map_text = self.write_map_text()
+        tiles = [list(row) for row in self.module.tiles]
+
+        self.module = MapModule()
+        self.module.read_from_rom(self.rom)
+        self.read_map_text(map_text)
+        assert_equal([list(row) for row in self.module.tiles], tiles)
+
+    def test_read_from_project_unpadded_tiles(self):
+        self.module.read_from_rom(self.rom)
+        self.read_map_text("1 2 3ff\r\n0a 00b 10\n")
+        assert_equal([list(row) for row in self.module.tiles], [[1, 2, 0x3ff], [0xa, 0xb, 0x10]])
+
+    def test_read_from_project_invalid_tile(self):
+        self.module.read_from_rom(self.rom)
+        assert_raises(InvalidUserDataError, self.read_map_text, "001 002 400\n")
+        assert_raises(InvalidUserDataError, self.read_map_text, "001 1002 003\n")
+
+    def test_read_from_project_sidecar(self):
+        self.module.read_from_rom(self.rom)
+        resources = self.write_resources()
+
+        with tempfile.TemporaryDirectory() as temporary_directory:
+            def resource_open(name, extension, astext):
+                if name == "map_tiles":
+                    return open(os.path.join(temporary_directory, "map_tiles.map"), "r", encoding="utf-8")
+                return io.StringIO(resources[name])
+
+            map_filename = os.path.join(temporary_directory, "map_tiles.map")
+            sidecar_filename = map_tiles_sidecar_filename(map_filename)
+            with open(map_filename, "w", encoding="utf-8", newline="\n") as f:
+                f.write(resources["map_tiles"])
+            tiles = [list(row) for row in self.module.tiles]
+
+            # The binary copy is made the first time the map is read
+            self.module = MapModule()
+            self.module.read_from_project(resource_open)
+            assert_true(os.path.isfile(sidecar_filename))
+            assert_equal([list(row) for row in self.module.tiles], tiles)
+
+            # and is used instead of the text file for as long as the text file doesn't change
+            with open(sidecar_filename, "r+b") as f:
+                f.seek(-2, os.SEEK_END)
+                f.write(b"\x23\x01")
+            self.module = MapModule()
+            self.module.read_from_project(resource_open)
+            assert_equal(self.module.tiles[-1][-1], 0x123)
+
+            # but once the text file changes, the map is read from the text file and the binary copy is made again
+            with open(map_filename, "w", encoding="utf-8", newline="\n") as f:
+                f.write("001 002\n3ff 004\n")
+            self.module = MapModule()
+            self.module.read_from_project(resource_open)
+            assert_equal([list(row) for row in self.module.tiles], [[1, 2], [0x3ff, 4]])
+            with open(sidecar_filename, "rb") as f:
+                assert_equal(f.read()[-8:], b"\x01\x00\x02\x00\xff\x03\x04\x00")
@@ -0,0 +1,50 @@
+import os
+
+from nose.tools import assert_equal
+
+from coilsnake.model.common.blocks import Rom
+from coilsnake.model.eb.blocks import EbCompressibleBlock
+from coilsnake.model.eb.palettes import EbColor
+from coilsnake.model.eb.title_screen import TitleScreenLayoutEntry
+from coilsnake.modules.eb.TitleScreenModule import TitleScreenModule, BG_PALETTE_POINTER, BG_SUBPALETTE_LENGTH, \
+    NUM_CHARS
+from coilsnake.util.eb.pointer import write_asm_pointer, to_snes_address
+from tests.coilsnake_test import BaseTestCase, TEST_DATA_DIR
+
+
+class TestTitleScreenModule(BaseTestCase):
+    def setup(self):
+        self.rom = Rom()
+        self.rom.from_file(os.path.join(TEST_DATA_DIR, "roms", "EB_fake_24mbit.smc"))
+        for free_range in TitleScreenModule.FREE_RANGES:
+            self.rom.deallocate(free_range)
+
+        # Write a blank title screen to the ROM, so that every pointer points to valid compressed data
+        with TitleScreenModule() as module:
+            for layout in module.chars_layouts:
+                entry = TitleScreenLayoutEntry()
+                entry.set_final(True)
+                layout.append(entry)
+            module.write_to_rom(self.rom)
+
+    def teardown(self):
+        del self.rom
+
+    def test_read_from_rom_short_bg_palette(self):
+        # Like in EarthBound, the compressed background palette holds fewer colors than the full subpalette
+        num_colors = 16
+        with EbCompressibleBlock(num_colors * 2) as block:
+            for i in range(num_colors):
+                EbColor(r=8 * i, g=8, b=248 - 8 * i).to_block(block=block, offset=i * 2)
+            block.compress()
+            offset = self.rom.allocate(data=block)
+        write_asm_pointer(block=self.rom, offset=BG_PALETTE_POINTER, pointer=to_snes_address(offset))
+
+        with TitleScreenModule() as module:
+            module.read_from_rom(self.rom)
+
+            for i in range(num_colors):
+                assert_equal(module.bg_palette[0, i], EbColor(r=8 * i, g=8, b=248 - 8 * i))
+            for i in range(num_colors, BG_SUBPALETTE_LENGTH):
+                assert_equal(module.bg_palette[0, i], EbColor(r=0, g=0, b=0))
+            assert_equal(len(module.chars_layouts), NUM_CHARS)
@@ -0,0 +1,51 @@
+import os
+import tempfile
+
+from nose.tools import assert_equal
+
+from coilsnake.util.common import assets
+from coilsnake.util.common.assets import load_cached_asset
+
+
+def _load_lines(f):
+    _load_lines.calls += 1
+    return f.read().splitlines()
+
+
+def test_load_cached_asset():
+    original_asset_cache_path = assets.ASSET_CACHE_PATH
+    with tempfile.TemporaryDirectory() as temporary_directory:
+        assets.ASSET_CACHE_PATH = os.path.join(temporary_directory, "cache")
+        try:
+            _load_lines.calls = 0
+            lines = load_cached_asset(_load_lines, "modulelist.txt")
+            assert_equal(_load_lines.calls, 1)
+            assert_equal(len(os.listdir(assets.ASSET_CACHE_PATH)), 1)
+
+            # The second load comes from the cache rather than parsing the asset again
+            assert_equal(load_cached_asset(_load_lines, "modulelist.txt"), lines)
+            assert_equal(_load_lines.calls, 1)
+        finally:
+            assets.ASSET_CACHE_PATH = original_asset_cache_path
+
+
+def _load_reversed_lines(f):
+    return f.read().splitlines()[::-1]
+
+
+def test_load_cached_asset_code_changed():
+    original_asset_cache_path = assets.ASSET_CACHE_PATH
+    original_code = _load_lines.__code__
+    with tempfile.TemporaryDirectory() as temporary_directory:
+        assets.ASSET_CACHE_PATH = os.path.join(temporary_directory, "cache")
+        try:
+            _load_lines.calls = 0
+            lines = load_cached_asset(_load_lines, "modulelist.txt")
+
+            # Changing the loader's code invalidates the cached entry, and the stale entry is removed
+            _load_lines.__code__ = _load_reversed_lines.__code__
+            assert_equal(load_cached_asset(_load_lines, "modulelist.txt"), lines[::-1])
+            assert_equal(len(os.listdir(assets.ASSET_CACHE_PATH)), 1)
+        finally:
+            _load_lines.__code__ = original_code
+            assets.ASSET_CACHE_PATH = original_asset_cache_path
@@ -0,0 +1,52 @@
+import io
+import os
+import sys
+import tempfile
+
+from nose.tools import assert_equal, assert_in, assert_not_in, assert_true
+
+from coilsnake.util.common.import_profile import ImportProfiler, setup_step
+
+
+def test_import_profiler():
+    with tempfile.TemporaryDirectory() as temporary_directory:
+        with open(os.path.join(temporary_directory, "import_profile_test_outer.py"), "w") as f:
+            f.write("import import_profile_test_inner\nVALUE = import_profile_test_inner.VALUE + 1\n")
+        with open(os.path.join(temporary_directory, "import_profile_test_inner.py"), "w") as f:
+            f.write("VALUE = 1\n")
+
+        sys.path.insert(0, temporary_directory)
+        profiler = ImportProfiler()
+        profiler.start()
+        try:
+            import import_profile_test_outer
+            with setup_step("test step"):
+                pass
+        finally:
+            profiler.stop()
+            sys.path.remove(temporary_directory)
+            sys.modules.pop("import_profile_test_outer", None)
+            sys.modules.pop("import_profile_test_inner", None)
+
+    assert_equal(import_profile_test_outer.VALUE, 2)
+    # The module sees its real loader rather than the profiler's wrapper
+    assert_not_in("Timing", type(import_profile_test_outer.__loader__).__name__)
+    assert_not_in(profiler, sys.meta_path)
+
+    imports = dict([(name, (self_time, cumulative_time)) for name, self_time, cumulative_time in profiler.imports])
+    assert_in("import_profile_test_outer", imports)
+    assert_in("import_profile_test_inner", imports)
+    # The outer module's cumulative time includes the time taken to import the inner module
+    assert_true(imports["import_profile_test_outer"][1] >= imports["import_profile_test_inner"][1])
+    assert_equal([name for name, _ in profiler.setup_steps], ["test step"])
+
+    report = io.StringIO()
+    profiler.write_report(report)
+    assert_in("import_profile_test_outer", report.getvalue())
+    assert_in("test step", report.getvalue())
+
+
+def test_setup_step_without_profiler():
+    with setup_step("test step"):
+        value = 1
+    assert_equal(value, 1)
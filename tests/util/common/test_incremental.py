@@ -0,0 +1,150 @@
+import os
+import tempfile
+
+from nose.tools import assert_equal, assert_is_none, assert_is_not_none, assert_not_equal
+
+from coilsnake.model.common.blocks import Rom
+from coilsnake.modules.common.GenericModule import GenericModule
+from coilsnake.util.common.incremental import IncrementalCompileCache, _directory_digest
+from coilsnake.util.common.project import Project, PROJECT_FILENAME
+from tests.coilsnake_test import BaseTestCase
+
+
+class FixedOffsetModule(GenericModule):
+    def read_from_project(self, resource_open):
+        with resource_open("fixed", "txt", True) as f:
+            self.value = int(f.read())
+
+    def write_to_rom(self, rom):
+        rom[0x10] = self.value
+
+
+class AllocatingModule(GenericModule):
+    def read_from_project(self, resource_open):
+        with resource_open("allocating", "txt", True) as f:
+            self.values = [int(x) for x in f.read().split()]
+
+    def write_to_rom(self, rom):
+        offset = rom.allocate(size=len(self.values))
+        rom[offset:offset + len(self.values)] = self.values
+
+
+MODULES = [("test.FixedOffsetModule", FixedOffsetModule), ("test.AllocatingModule", AllocatingModule)]
+
+
+class TestIncrementalCompileCache(BaseTestCase):
+    def setup(self):
+        self.temporary_directory = tempfile.TemporaryDirectory()
+        self.project = Project()
+        self.project.load(os.path.join(self.temporary_directory.name, PROJECT_FILENAME))
+        self.write_resource("test.FixedOffsetModule", "fixed", "5")
+        self.write_resource("test.AllocatingModule", "allocating", "1 2 3")
+
+    def teardown(self):
+        self.temporary_directory.cleanup()
+
+    def write_resource(self, module_name, resource_name, data):
+        with self.project.get_resource(module_name, resource_name, "txt", "wt") as f:
+            f.write(data)
+
+    def compile(self, code_digest=None):
+        """Compiles the modules like compile_project does, returning the ROM and the names of the modules which were
+        replayed."""
+        rom = Rom()
+        rom.from_list([0] * 0x10000)
+        rom.deallocate((0x8000, 0xffff))
+
+        cache = IncrementalCompileCache(os.path.join(self.temporary_directory.name, "cache"), self.project,
+                                        code_digest=code_digest)
+        cache.begin(rom)
+        replayed_module_names = []
+        for module_name, module_class in MODULES:
+            record = cache.get_up_to_date_record(module_name, module_class)
+            if record is not None:
+                cache.replay(record, rom)
+                replayed_module_names.append(module_name)
+            else:
+                resources = []
+
+                def resource_open(x, y, astext=False):
+                    resources.append((x, y))
+                    return self.project.get_resource(module_name, x, y, "rt" if astext else "rb")
+
+                module = module_class()
+                module.read_from_project(resource_open)
+                recorder = cache.recorder(module_name, module_class, rom)
+                module.write_to_rom(rom)
+                recorder.finish(rom, resources)
+        return rom, replayed_module_names
+
+    def test_replay(self):
+        rom, replayed_module_names = self.compile()
+        assert_equal(replayed_module_names, [])
+
+        replayed_rom, replayed_module_names = self.compile()
+        assert_equal(replayed_module_names, ["test.FixedOffsetModule", "test.AllocatingModule"])
+        assert_equal(replayed_rom, rom)
+        assert_equal(replayed_rom.unallocated_ranges, rom.unallocated_ranges)
+        assert_equal(replayed_rom[0x10], 5)
+        assert_equal(replayed_rom[0x8000:0x8003].to_list(), [1, 2, 3])
+
+    def test_changed_resource(self):
+        self.compile()
+        self.write_resource("test.AllocatingModule", "allocating", "4 5 6 7")
+        rom, replayed_module_names = self.compile()
+        assert_equal(replayed_module_names, ["test.FixedOffsetModule"])
+        assert_equal(rom[0x8000:0x8004].to_list(), [4, 5, 6, 7])
+        assert_equal(rom.unallocated_ranges, [(0x8004, 0xffff)])
+
+    def test_changed_earlier_module(self):
+        self.compile()
+        self.write_resource("test.FixedOffsetModule", "fixed", "6")
+
+        cache = IncrementalCompileCache(os.path.join(self.temporary_directory.name, "cache"), self.project)
+        rom = Rom()
+        rom.from_list([0] * 0x10000)
+        rom.deallocate((0x8000, 0xffff))
+        cache.begin(rom)
+        assert_equal(cache.first_out_of_date_index(MODULES), 0)
+
+        # The later module's ROM state changed, so it isn't replayed either
+        rom, replayed_module_names = self.compile()
+        assert_equal(replayed_module_names, [])
+        assert_equal(rom[0x10], 6)
+
+    def test_changed_rom(self):
+        self.compile()
+        cache = IncrementalCompileCache(os.path.join(self.temporary_directory.name, "cache"), self.project)
+        rom = Rom()
+        rom.from_list([1] * 0x10000)
+        rom.deallocate((0x8000, 0xffff))
+        cache.begin(rom)
+        assert_is_none(cache.get_up_to_date_record("test.FixedOffsetModule", FixedOffsetModule))
+
+        rom.from_list([0] * 0x10000)
+        cache.begin(rom)
+        assert_is_not_none(cache.get_up_to_date_record("test.FixedOffsetModule", FixedOffsetModule))
+        assert_equal(cache.first_out_of_date_index(MODULES), len(MODULES))
+
+    def test_changed_code(self):
+        self.compile()
+        rom, replayed_module_names = self.compile(code_digest="other code")
+        assert_equal(replayed_module_names, [])
+        rom, replayed_module_names = self.compile(code_digest="other code")
+        assert_equal(replayed_module_names, ["test.FixedOffsetModule", "test.AllocatingModule"])
+
+    def test_directory_digest(self):
+        path = os.path.join(self.temporary_directory.name, "package")
+        os.makedirs(os.path.join(path, "model", "__pycache__"))
+        with open(os.path.join(path, "model", "table.py"), "w") as f:
+            f.write("a")
+        digest = _directory_digest(path)
+
+        # Compiled bytecode is ignored
+        with open(os.path.join(path, "model", "__pycache__", "table.pyc"), "w") as f:
+            f.write("b")
+        assert_equal(_directory_digest(path), digest)
+
+        with open(os.path.join(path, "model", "table.py"), "w") as f:
+            f.write("c")
+        assert_not_equal(_directory_digest(path), digest)
@@ -0,0 +1,94 @@
+import io
+import json
+import os
+import pstats
+import tempfile
+
+from nose.tools import assert_equal, assert_false, assert_in, assert_is_none, assert_true
+
+from coilsnake.model.common.blocks import AllocatableBlock
+from coilsnake.util.common.profile import ModuleProfiler, COUNTER_ALLOCATE_CALLS, COUNTER_ALLOCATED_BYTES, count, \
+    is_profiling, profile_phase, TRACE_FILENAME
+
+
+def test_module_profiler():
+    block = AllocatableBlock()
+    block.from_list([0] * 0x100)
+    block.deallocate((0, 0xff))
+
+    with tempfile.TemporaryDirectory() as temporary_directory:
+        profiler = ModuleProfiler(output_directory=temporary_directory)
+        profiler.start()
+        try:
+            assert_true(is_profiling())
+            with profile_phase("test.TestModule", "write_to_rom"):
+                block.allocate(size=0x10)
+                block.allocate(data=[1, 2, 3])
+                # A phase within a phase is counted as part of the outer phase
+                with profile_phase("test.TestModule", "read_from_project"):
+                    count("test_counter", 5)
+                data = [0] * 10000
+            del data
+            with profile_phase("test.OtherModule", "read_from_rom"):
+                pass
+        finally:
+            profiler.stop()
+        assert_false(is_profiling())
+
+        assert_equal([(x["module"], x["phase"]) for x in profiler.phases],
+                     [("test.TestModule", "write_to_rom"), ("test.OtherModule", "read_from_rom")])
+        assert_equal(profiler.phases[0]["counters"],
+                     {COUNTER_ALLOCATE_CALLS: 2, COUNTER_ALLOCATED_BYTES: 0x13, "test_counter": 5})
+        assert_equal(profiler.phases[1]["counters"], {})
+        assert_true(profiler.phases[0]["peak_memory"] >= 10000 * 8)
+
+        with open(os.path.join(temporary_directory, TRACE_FILENAME), "r") as f:
+            events = json.load(f)["traceEvents"]
+        assert_equal([(x["cat"], x["name"]) for x in events],
+                     [("test.TestModule", "write_to_rom"), ("test.OtherModule", "read_from_rom"),
+                      ("module", "test.TestModule"), ("module", "test.OtherModule")])
+        assert_equal(events[0]["args"][COUNTER_ALLOCATE_CALLS], 2)
+
+        stats = pstats.Stats(os.path.join(temporary_directory, "test.TestModule.prof"))
+        assert_in("allocate", [function_name for _, _, function_name in stats.stats])
+
+    report = io.StringIO()
+    profiler.write_report(report)
+    assert_in("test.TestModule", report.getvalue())
+    assert_in("write_to_rom", report.getvalue())
+
+
+def test_profile_phase_without_profiler():
+    with profile_phase("test.TestModule", "write_to_rom"):
+        count(COUNTER_ALLOCATE_CALLS)
+        value = 1
+    assert_equal(value, 1)
+    assert_false(is_profiling())
+
+
+def test_module_profiler_without_memory_tracing():
+    profiler = ModuleProfiler(trace_memory=False)
+    profiler.start()
+    try:
+        with profile_phase("test.TestModule", "write_to_rom"):
+            pass
+    finally:
+        profiler.stop()
+    assert_is_none(profiler.phases[0]["peak_memory"])
+
+
+def test_module_profiler_report_aligns_long_module_names():
+    profiler = ModuleProfiler(trace_memory=False)
+    profiler.start()
+    try:
+        for module_name in ["eb.MapModule", "common.LunarIpsCompatibilityModule"]:
+            with profile_phase(module_name, "write_to_rom"):
+                pass
+    finally:
+        profiler.stop()
+
+    report = io.StringIO()
+    profiler.write_report(report)
+    lines = report.getvalue().splitlines()
+    assert_equal(lines[1].index("write_to_rom"), lines[0].index("phase"))
+    assert_equal(lines[2].index("write_to_rom"), lines[0].index("phase"))
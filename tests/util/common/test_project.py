@@ -1,4 +1,5 @@
 import os
+import tempfile
 
 from nose.tools import assert_equal
 
@@ -51,4 +52,54 @@ class TestProject(BaseTestCase):
 
         self.project.load(os.path.join(TEST_DATA_DIR, "projects", "EB.snake"), "NotEarthbound2")
         assert_equal(self.project.romtype, "NotEarthbound2")
-        assert_equal(self.project._resources, {})
\ No newline at end of file
+        assert_equal(self.project._resources, {})
+
+    def test_get_set_resources(self):
+        self.project.load(os.path.join(TEST_DATA_DIR, "projects", "EB.snake"))
+        assert_equal(self.project.get_resources("eb.MapModule"), {"map": "eb.MapModule_map.dat"})
+        assert_equal(self.project.get_resources("eb.DoesNotExist"), None)
+
+        self.project.set_resources("eb.DoesNotExist", {"doors": "map_doors.yml"})
+        assert_equal(self.project.get_resources("eb.DoesNotExist"), {"doors": "map_doors.yml"})
+
+    def test_get_resource_filename(self):
+        self.project.load(os.path.join(TEST_DATA_DIR, "projects", "EB.snake"))
+        assert_equal(self.project.get_resource_filename("eb.MapModule", "map"),
+                     os.path.join(TEST_DATA_DIR, "projects", "eb.MapModule_map.dat"))
+        assert_equal(self.project.get_resource_filename("eb.DoesNotExist", "doors", "yml"),
+                     os.path.join(TEST_DATA_DIR, "projects", "doors.yml"))
+        assert_equal(self.project.get_resources("eb.DoesNotExist"), None)
+
+    def test_skip_unchanged_resources(self):
+        with tempfile.TemporaryDirectory() as temporary_directory:
+            self.project.load(os.path.join(temporary_directory, "Project.snake"))
+            self.project.skip_unchanged_resources = True
+
+            with self.project.get_resource("eb.MapModule", "map", "txt", "wt", "utf-8", "\n") as f:
+                f.write("abc\n")
+            with self.project.get_resource("eb.MapModule", "map_bin", "dat", "wb") as f:
+                f.write(b"\x01\x02")
+            assert_equal(self.project.num_written_resources, 2)
+            assert_equal(self.project.num_unchanged_resources, 0)
+
+            filename = os.path.join(temporary_directory, "map.txt")
+            with open(filename, "rb") as f:
+                assert_equal(f.read(), b"abc\n")
+            os.utime(filename, (0, 0))
+
+            with self.project.get_resource("eb.MapModule", "map", "txt", "wt", "utf-8", "\n") as f:
+                f.write("abc\n")
+            assert_equal(self.project.num_unchanged_resources, 1)
+            assert_equal(os.path.getmtime(filename), 0)
+
+            with self.project.get_resource("eb.MapModule", "map", "txt", "wt", "utf-8", "\n") as f:
+                f.write("abd\n")
+            assert_equal(self.project.num_written_resources, 3)
+            with open(filename, "rb") as f:
+                assert_equal(f.read(), b"abd\n")
+
+            project_filename = os.path.join(temporary_directory, "Project.snake")
+            self.project.write(project_filename)
+            os.utime(project_filename, (0, 0))
+            self.project.write(project_filename)
+            assert_equal(os.path.getmtime(project_filename), 0)
@@ -0,0 +1,75 @@
+import json
+import os
+import tempfile
+
+from nose.tools import assert_equal, assert_raises
+from PIL import Image
+
+from coilsnake.exceptions.common.exceptions import NotEnoughUnallocatedSpaceError
+from coilsnake.model.common.blocks import AllocatableBlock
+from coilsnake.util.common.space_map import AllocationJournal, OWNER_FIXED, OWNER_UNALLOCATED, SPACE_MAP_FILENAME, \
+    _subtract_ranges
+
+
+def test_subtract_ranges():
+    assert_equal(_subtract_ranges([], [(0, 10)]), [])
+    assert_equal(_subtract_ranges([(0, 10)], []), [(0, 10)])
+    assert_equal(_subtract_ranges([(0, 10), (20, 30)], [(0, 10), (20, 30)]), [])
+    assert_equal(_subtract_ranges([(0, 10), (20, 30)], [(2, 3), (5, 22), (29, 29)]),
+                 [(0, 1), (4, 4), (23, 28), (30, 30)])
+
+
+class TestAllocationJournal(object):
+    def setup(self):
+        self.block = AllocatableBlock()
+        self.block.from_list([0] * 0x20000)
+        self.block.deallocate((0x100, 0x1ff))
+        self.journal = self.block.allocation_journal = AllocationJournal(self.block)
+
+    def test_journal(self):
+        self.journal.owner = "test.FirstModule"
+        self.block.deallocate((0x10000, 0x100ff))
+        assert_equal(self.block.allocate(size=0x10), 0x100)
+        assert_equal(self.block.allocate(size=0x20, bank=1), 0x10000)
+
+        self.journal.owner = "test.SecondModule"
+        self.block.mark_allocated((0x110, 0x11f))
+        assert_raises(NotEnoughUnallocatedSpaceError, self.block.allocate, size=0x1000)
+        old_unallocated_ranges = self.block.unallocated_ranges
+        self.block.unallocated_ranges = [(0x120, 0x1ff), (0x10020, 0x100ef)]
+        self.journal.record_replay(old_unallocated_ranges, self.block.unallocated_ranges)
+
+        assert_equal([(x["owner"], x["action"], x["begin"], x["end"]) for x in self.journal.entries],
+                     [("test.FirstModule", "deallocate", 0x10000, 0x100ff),
+                      ("test.FirstModule", "allocate", 0x100, 0x10f),
+                      ("test.FirstModule", "allocate", 0x10000, 0x1001f),
+                      ("test.SecondModule", "mark_allocated", 0x110, 0x11f),
+                      ("test.SecondModule", "allocate", None, None),
+                      ("test.SecondModule", "replay", 0x100f0, 0x100ff)])
+        assert_equal(self.journal.entries[2]["bank"], 1)
+
+        owners = self.journal.owners()
+        assert_equal(self.journal.owner_names(),
+                     [OWNER_FIXED, OWNER_UNALLOCATED, "test.FirstModule", "test.SecondModule"])
+        assert_equal([owners[0xff], owners[0x100], owners[0x110], owners[0x120], owners[0x10000], owners[0x100ff]],
+                     [0, 2, 3, 1, 2, 3])
+
+        with tempfile.TemporaryDirectory() as temporary_directory:
+            self.journal.write_space_map(temporary_directory)
+            with open(os.path.join(temporary_directory, SPACE_MAP_FILENAME), "r") as f:
+                space_map = json.load(f)
+            assert_equal(sorted(os.listdir(temporary_directory)), ["bank_00.png", "bank_01.png", SPACE_MAP_FILENAME])
+            with Image.open(os.path.join(temporary_directory, "bank_01.png")) as image:
+                assert_equal(image.size, (256, 256))
+                assert_equal([image.getpixel((0, 0)), image.getpixel((0x20, 0)), image.getpixel((0xff, 0)),
+                              image.getpixel((0, 1))],
+                             [2, 1, 3, 0])
+
+        assert_equal(space_map["owners"]["test.FirstModule"],
+                     {"allocated_bytes": 0x30, "allocations": 2, "failed_allocations": 0, "freed_bytes": 0x100})
+        assert_equal(space_map["owners"]["test.SecondModule"],
+                     {"allocated_bytes": 0x20, "allocations": 2, "failed_allocations": 1, "freed_bytes": 0})
+        assert_equal(space_map["banks"]["0x00"],
+                     {OWNER_FIXED: 0x10000 - 0x100, OWNER_UNALLOCATED: 0xe0, "test.FirstModule": 0x10,
+                      "test.SecondModule": 0x10})
+        assert_equal(len(space_map["journal"]), 6)
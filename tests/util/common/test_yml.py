@@ -1,8 +1,9 @@
+import io
 import os
 
 from nose.tools import assert_equal
 
-from coilsnake.util.common.yml import replace_field_in_yml, convert_values_to_hex_repr
+from coilsnake.util.common.yml import replace_field_in_yml, convert_values_to_hex_repr, yml_dump, yml_dump_items
 from tests.coilsnake_test import BaseTestCase, TemporaryWritableFileTestCase, TEST_DATA_DIR, assert_files_equal
 
 
@@ -58,4 +59,28 @@ def test_convert_values_to_hex_repr():
     assert_equal(convert_values_to_hex_repr("ABC: 0", "ABC"), "ABC: 0x0")
     assert_equal(convert_values_to_hex_repr("ABC: 55", "ABC"), "ABC: 0x37")
     assert_equal(convert_values_to_hex_repr("ABC: 55", "ABCD"), "ABC: 55")
-    assert_equal(convert_values_to_hex_repr("A:\n  - {ABC: 16}", "ABC"), "A:\n  - {ABC: 0x10}")
\ No newline at end of file
+    assert_equal(convert_values_to_hex_repr("A:\n  - {ABC: 16}", "ABC"), "A:\n  - {ABC: 0x10}")
+
+
+def _assert_yml_dump_items_matches_yml_dump(yml_rep, hex_labels, default_flow_style):
+    expected_yml_str_rep = yml_dump(yml_rep, default_flow_style=default_flow_style)
+    for hex_label in hex_labels:
+        expected_yml_str_rep = convert_values_to_hex_repr(expected_yml_str_rep, hex_label)
+
+    f = io.StringIO()
+    yml_dump_items(sorted(yml_rep.items()), f, hex_labels=hex_labels, default_flow_style=default_flow_style)
+    assert_equal(f.getvalue(), expected_yml_str_rep)
+
+
+def test_yml_dump_items():
+    rows = dict((i, {"Name": "Row {}".format(i),
+                     "Event Flag": i * 17,
+                     "Other Event Flag": i,
+                     "Long Value": "a long value which makes a flow style row wrap onto the next line",
+                     "Flags": [i, i + 1],
+                     "Nested": [{"Event Flag": i}]})
+                for i in range(200))
+    for default_flow_style in [False, None]:
+        for yml_rep in [rows, {0: 1, 1: 2}, {0: 1, 1: [2]}, {}]:
+            _assert_yml_dump_items_matches_yml_dump(yml_rep, [], default_flow_style)
+            _assert_yml_dump_items_matches_yml_dump(yml_rep, ["Event Flag"], default_flow_style)
@@ -0,0 +1,89 @@
+import os
+import tempfile
+from array import array
+
+from nose.tools import assert_equal, assert_is_none, assert_false, assert_true
+
+from coilsnake.model.eb.blocks import EbCompressibleBlock
+from coilsnake.util.eb.compression_cache import CompressionCache
+
+
+def test_get_put():
+    with tempfile.TemporaryDirectory() as temporary_directory:
+        cache = CompressionCache(os.path.join(temporary_directory, "cache"))
+        assert_is_none(cache.get(b"\x01\x02\x03"))
+
+        cache.put(b"\x01\x02\x03", b"\x02\x01\x02\x03\xff")
+        assert_equal(cache.get(b"\x01\x02\x03"), b"\x02\x01\x02\x03\xff")
+        assert_equal(cache.get(array('B', [1, 2, 3])), b"\x02\x01\x02\x03\xff")
+        assert_is_none(cache.get(b"\x01\x02"))
+
+        assert_equal(cache.hits, 2)
+        assert_equal(cache.misses, 2)
+
+        # Entries persist across instances
+        assert_equal(CompressionCache(os.path.join(temporary_directory, "cache")).get(b"\x01\x02\x03"),
+                     b"\x02\x01\x02\x03\xff")
+
+
+def test_trim():
+    with tempfile.TemporaryDirectory() as temporary_directory:
+        cache = CompressionCache(temporary_directory, max_size=250)
+        for i in range(3):
+            cache.put(bytes([i]), bytes(100))
+            os.utime(cache._entry_filename(bytes([i])), (i, i))
+
+        # Using an entry makes it the most recently used
+        cache.get(bytes([0]))
+        cache.trim()
+        assert_true(os.path.exists(cache._entry_filename(bytes([0]))))
+        assert_false(os.path.exists(cache._entry_filename(bytes([1]))))
+        assert_true(os.path.exists(cache._entry_filename(bytes([2]))))
+
+
+def test_compress_with_cache():
+    with tempfile.TemporaryDirectory() as temporary_directory:
+        cache = CompressionCache(temporary_directory)
+        EbCompressibleBlock.compression_cache = cache
+        try:
+            with EbCompressibleBlock() as block:
+                block.from_list([5] * 100)
+                block.compress()
+                compressed_data = block.to_list()
+            assert_equal(cache.misses, 1)
+
+            with EbCompressibleBlock() as block:
+                block.from_list([5] * 100)
+                block.compress()
+                assert_equal(block.to_list(), compressed_data)
+            assert_equal(cache.hits, 1)
+        finally:
+            EbCompressibleBlock.compression_cache = None
+
+        with EbCompressibleBlock() as block:
+            block.from_list([5] * 100)
+            block.compress()
+            assert_equal(block.to_list(), compressed_data)
+
+
+def test_compress_many_with_cache():
+    with tempfile.TemporaryDirectory() as temporary_directory:
+        cache = CompressionCache(temporary_directory)
+        EbCompressibleBlock.compression_cache = cache
+        try:
+            blocks = [EbCompressibleBlock() for i in range(3)]
+            for i, block in enumerate(blocks):
+                block.from_list([i] * 100)
+            EbCompressibleBlock.compress_many(blocks[:2])
+            assert_equal(cache.misses, 2)
+
+            EbCompressibleBlock.compress_many(blocks[2:])
+            compressed_datas = [block.to_list() for block in blocks]
+
+            for i, block in enumerate(blocks):
+                block.from_list([i] * 100)
+            EbCompressibleBlock.compress_many(blocks)
+            assert_equal(cache.hits, 3)
+            assert_equal([block.to_list() for block in blocks], compressed_datas)
+        finally:
+            EbCompressibleBlock.compression_cache = None
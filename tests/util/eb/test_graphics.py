@@ -2,7 +2,8 @@ from nose.tools import assert_list_equal, assert_equal
 
 from coilsnake.model.common.blocks import Block
 from coilsnake.util.eb.graphics import read_1bpp_graphic_from_block, write_1bpp_graphic_to_block, \
-    read_2bpp_graphic_from_block, write_2bpp_graphic_to_block, write_4bpp_graphic_to_block, read_4bpp_graphic_from_block
+    read_2bpp_graphic_from_block, write_2bpp_graphic_to_block, write_4bpp_graphic_to_block, \
+    read_4bpp_graphic_from_block, read_8bpp_graphic_from_block, read_graphic_rows, write_graphic_rows
 
 
 def test_read_1bpp_graphic_from_block():
@@ -481,4 +482,57 @@ def test_write_4bpp_graphic_to_block():
 
                           0b01100000,
                           0b11101110
-                      ])
\ No newline at end of file
+                      ])
+
+
+TEST_4BPP_GRAPHIC_DATA = [0b01010110, 0b00001011, 0b11001110, 0b10010110, 0b01110001, 0b00111011, 0b00001011,
+                          0b10011110, 0b00011000, 0b00000011, 0b10000001, 0b11101011, 0b00000100, 0b01000101,
+                          0b01010110, 0b10001111, 0b00101100, 0b10110000, 0b01010110, 0b10110010, 0b01010000,
+                          0b11000000, 0b00111000, 0b10010111, 0b00101101, 0b11111100, 0b01111101, 0b11101010,
+                          0b10101111, 0b10110111, 0b01100000, 0b11101110]
+TEST_4BPP_GRAPHIC = [[8, 1, 12, 9, 6, 5, 3, 2],
+                     [11, 5, 8, 14, 1, 7, 15, 0],
+                     [8, 13, 3, 7, 2, 0, 2, 3],
+                     [10, 0, 4, 14, 7, 10, 11, 9],
+                     [8, 8, 12, 9, 13, 12, 2, 6],
+                     [11, 14, 14, 4, 14, 4, 10, 7],
+                     [12, 2, 12, 8, 4, 15, 12, 14],
+                     [10, 13, 12, 1, 10, 11, 11, 2]]
+
+
+def test_read_graphic_rows():
+    rows = read_graphic_rows(bytes(TEST_4BPP_GRAPHIC_DATA), bpp=4)
+    assert_list_equal([list(row) for row in rows], TEST_4BPP_GRAPHIC)
+
+    rows = read_graphic_rows(bytes(TEST_4BPP_GRAPHIC_DATA[:16] * 2), bpp=2)
+    assert_list_equal([list(row) for row in rows], [[x & 3 for x in row] for row in TEST_4BPP_GRAPHIC] * 2)
+
+    rows = read_graphic_rows(bytes([0b10000001, 0xff, 0]), bpp=1)
+    assert_list_equal([list(row) for row in rows], [[1, 0, 0, 0, 0, 0, 0, 1], [1] * 8, [0] * 8])
+
+    # Compare against the single graphic reader for every bpp
+    source = Block()
+    source.from_list(list(range(0, 256, 2)) + list(range(255, 0, -2)))
+    for bpp, read_function in [(2, read_2bpp_graphic_from_block),
+                               (4, read_4bpp_graphic_from_block),
+                               (8, read_8bpp_graphic_from_block)]:
+        rows = read_graphic_rows(bytes(source.to_list()), bpp=bpp)
+        for i in range(0, source.size // (bpp * 8)):
+            target = [[0 for x in range(8)] for y in range(8)]
+            read_function(target=target, source=source, offset=i * bpp * 8)
+            assert_list_equal([list(row) for row in rows[i * 8:(i + 1) * 8]], target)
+
+    assert_list_equal(read_graphic_rows(b"", bpp=4), [])
+
+
+def test_write_graphic_rows():
+    assert_list_equal(list(write_graphic_rows(TEST_4BPP_GRAPHIC, bpp=4)), TEST_4BPP_GRAPHIC_DATA)
+
+    data = bytes(range(0, 256, 2)) + bytes(range(255, 0, -2))
+    for bpp in [1, 2, 4, 8]:
+        assert_equal(write_graphic_rows(read_graphic_rows(data, bpp=bpp), bpp=bpp), data)
+
+    # Bits of each pixel beyond the bpp are ignored
+    assert_list_equal(list(write_graphic_rows([[0xff, 2, 0, 0, 0, 0, 0, 1]], bpp=1)), [0b10000001])
+
+    assert_equal(write_graphic_rows([], bpp=2), b"")
@@ -1,8 +1,9 @@
 # coding: utf-8
-from nose.tools import assert_list_equal
+from nose.tools import assert_list_equal, assert_equal
 from nose.tools.nontrivial import raises
 
-from coilsnake.util.eb.text import standard_text_to_block, CharacterSubstitutions, standard_text_to_byte_list
+from coilsnake.util.eb.text import standard_text_to_block, CharacterSubstitutions, standard_text_to_byte_list, \
+    standard_text_from_block, standard_text_from_bytes
 from coilsnake.model.common.blocks import Block
 
 
@@ -18,6 +19,20 @@ def test_standard_text_to_block():
     assert_list_equal(b.to_list(), [132, 149, 163, 164, 0, 0x66, 0x66, 0x66, 0x66, 0x66])
 
 
+def test_standard_text_from_bytes():
+    b = Block()
+    b.from_list([132, 149, 163, 164, 0, 0x66, 0x66])
+    assert_equal(standard_text_from_bytes(bytes(b.to_list())), "Test")
+    assert_equal(standard_text_from_bytes(bytes(b.to_list())), standard_text_from_block(b, 0, 7))
+    assert_equal(standard_text_from_bytes(bytes([132, 149, 163, 164])), "Test")
+    assert_equal(standard_text_from_bytes(b""), "")
+
+
+@raises(ValueError)
+def test_standard_text_from_bytes_invalid():
+    standard_text_from_bytes(bytes([132, 0x10]))
+
+
 @raises(ValueError)
 def test_standard_text_to_block_too_long():
     b = Block()